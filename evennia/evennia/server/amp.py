@@ -27,12 +27,13 @@ try:
     import cPickle as pickle
 except ImportError:
     import pickle
+from django.conf import settings
 from twisted.protocols import amp
-from twisted.internet import protocol
+from twisted.internet import protocol, reactor
 from twisted.internet.defer import Deferred
 from evennia.utils import logger
-from evennia.utils.utils import to_str, variable_from_module
-import zlib  # Used in Compressed class
+from evennia.utils.utils import to_str, variable_from_module, class_from_module
+import zlib  # Used in ZlibCodec class
 
 DUMMYSESSION = namedtuple('DummySession', ['sessid'])(0)
 
@@ -59,6 +60,12 @@ BATCH_TIMEOUT = 0.5  # how often to poll to empty batch queue, in seconds
 _SENDBATCH = defaultdict(list)
 _MSGBUFFER = defaultdict(list)
 
+# if messages from Server to Portal are sent in batches
+_BATCH_SERVER2PORTAL = settings.AMP_BATCH_SERVER2PORTAL
+
+# codec of Compressed arguments, created at first use
+_CODEC = None
+
 
 def get_restart_mode(restart_file):
     """
@@ -198,14 +205,122 @@ class AmpClientFactory(protocol.ReconnectingClientFactory):
         protocol.ReconnectingClientFactory.clientConnectionFailed(self, connector, reason)
 
 
+# Codecs of data sent across the wire
+
+class AmpCodec(object):
+    """
+    Encodes data before it is sent across the wire and decodes it on the
+    other side. This codec sends data as it is. Custom codecs can be set
+    by `settings.AMP_CODEC`, they are created with the compression level
+    and threshold from the settings.
+
+    """
+    def __init__(self, level=0, threshold=0):
+        """
+        Args:
+            level (int, optional): Compression level, 0 is no compression.
+            threshold (int, optional): Data shorter than this number of
+                bytes is not compressed.
+
+        """
+        self.level = level
+        self.threshold = threshold
+
+    def encode(self, data):
+        """
+        Encode data to send.
+
+        Args:
+            data (str): Data to encode.
+
+        Returns:
+            encoded (str): Encoded data.
+
+        """
+        return data
+
+    def decode(self, data):
+        """
+        Decode received data.
+
+        Args:
+            data (str): Data to decode.
+
+        Returns:
+            decoded (str): Decoded data.
+
+        """
+        return data
+
+
+class ZlibCodec(AmpCodec):
+    """
+    Compresses data with zlib. Data shorter than the threshold and all data
+    when the level is 0 is sent uncompressed, so small messages do not
+    pay for compression. Uncompressed data is sent as it is, the same as
+    before codecs were added, so a Portal which survived a reload can still
+    read it. Compressed data begins with a flag, pickles never begin with
+    it (pickle protocol 2 data begins with "\\x80").
+
+    """
+    ZLIB = chr(1)
+
+    def encode(self, data):
+        """
+        Encode data to send.
+
+        Args:
+            data (str): Data to encode.
+
+        Returns:
+            encoded (str): The flag followed by the compressed data if it
+                is long enough, otherwise the data itself.
+
+        """
+        if self.level and len(data) >= self.threshold:
+            return self.ZLIB + zlib.compress(data, self.level)
+        return data
+
+    def decode(self, data):
+        """
+        Decode received data.
+
+        Args:
+            data (str): Data to decode.
+
+        Returns:
+            decoded (str): Decoded data.
+
+        """
+        if data[:1] == self.ZLIB:
+            return zlib.decompress(data[1:])
+        return data
+
+
+def get_codec():
+    """
+    Get the codec of Compressed arguments.
+
+    Returns:
+        codec (AmpCodec): The codec set by `settings.AMP_CODEC`.
+
+    """
+    global _CODEC
+    if _CODEC is None:
+        _CODEC = class_from_module(settings.AMP_CODEC)(level=settings.AMP_COMPRESSION_LEVEL,
+                                                       threshold=settings.AMP_COMPRESSION_THRESHOLD)
+    return _CODEC
+
+
 # AMP Communication Command types
 
 class Compressed(amp.String):
     """
     This is a customn AMP command Argument that both handles too-long
-    sends as well as uses zlib for compression across the wire. The
-    batch-grouping of too-long sends is borrowed from the "mediumbox"
-    recipy at twisted-hacks's ~glyph/+junk/amphacks/mediumbox.
+    sends as well as encodes data with the codec (compressing it if the
+    codec does) across the wire. The batch-grouping of too-long sends is
+    borrowed from the "mediumbox" recipy at twisted-hacks's
+    ~glyph/+junk/amphacks/mediumbox.
 
     """
 
@@ -222,14 +337,14 @@ class Compressed(amp.String):
             if chunk is None:
                 break
             value.write(chunk)
-        objects[name] = value.getvalue()
+        objects[name] = self.fromString(value.getvalue())
 
     def toBox(self, name, strings, objects, proto):
         """
         Convert from data to box. We handled too-long
         batched data and put it together here.
         """
-        value = StringIO(objects[name])
+        value = StringIO(self.toString(objects[name]))
         strings[name] = value.read(AMP_MAXLEN)
         for counter in count(2):
             chunk = value.read(AMP_MAXLEN)
@@ -239,15 +354,15 @@ class Compressed(amp.String):
 
     def toString(self, inObject):
         """
-        Convert to send on the wire, with compression.
+        Convert to send on the wire, with the codec.
         """
-        return zlib.compress(inObject, 9)
+        return get_codec().encode(inObject)
 
     def fromString(self, inString):
         """
-        Convert (decompress) from the wire to Python.
+        Convert (decode) from the wire to Python.
         """
-        return zlib.decompress(inString)
+        return get_codec().decode(inString)
 
 
 class MsgPortal2Server(amp.Command):
@@ -272,6 +387,20 @@ class MsgServer2Portal(amp.Command):
     response = []
 
 
+class MsgServer2PortalBatch(amp.Command):
+    """
+    Messages Server -> Portal
+
+    Sent instead of MsgServer2Portal when `settings.AMP_BATCH_SERVER2PORTAL`
+    is set, carrying all messages sent in one reactor turn.
+
+    """
+    key = "MsgServer2PortalBatch"
+    arguments = [('packed_data', Compressed())]
+    errors = {Exception: 'EXCEPTION'}
+    response = []
+
+
 class AdminPortal2Server(amp.Command):
     """
     Administration Portal -> Server
@@ -356,6 +485,11 @@ class AMPProtocol(amp.AMP):
         self.send_mode = True
         self.send_task = None
 
+        # messages to the Portal waiting for the end of the reactor turn,
+        # a list of (sessid, kwargs)
+        self.server2portal_batch = []
+        self.server2portal_task = None
+
     def connectionMade(self):
         """
         This is called when an AMP connection is (re-)established
@@ -387,7 +521,10 @@ class AMPProtocol(amp.AMP):
         portal will continuously try to reconnect, showing the problem
         that way.
         """
-        pass
+        if self.server2portal_task and self.server2portal_task.active():
+            self.server2portal_task.cancel()
+        self.server2portal_task = None
+        self.server2portal_batch = []
 
     # Error handling
 
@@ -418,9 +555,13 @@ class AMPProtocol(amp.AMP):
 
         Notes:
             Data will be sent across the wire pickled as a tuple
-            (sessid, kwargs).
+            (sessid, kwargs). Batched messages to the Portal are sent
+            first to keep the order of messages.
 
         """
+        if self.server2portal_batch and command is not MsgServer2Portal:
+            self.send_server2portal_batch()
+
         return self.callRemote(command,
                                packed_data=dumps((sessid, kwargs))
                                ).addErrback(self.errback, command.key)
@@ -486,7 +627,59 @@ class AMPProtocol(amp.AMP):
             kwargs (any, optiona): Extra data.
 
         """
-        return self.send_data(MsgServer2Portal, session.sessid, **kwargs)
+        if not _BATCH_SERVER2PORTAL:
+            return self.send_data(MsgServer2Portal, session.sessid, **kwargs)
+
+        # send it at the end of the reactor turn with other messages
+        self.server2portal_batch.append((session.sessid, kwargs))
+        if not self.server2portal_task:
+            self.server2portal_task = reactor.callLater(0, self.send_server2portal_batch)
+
+    @MsgServer2PortalBatch.responder
+    def portal_receive_server2portal_batch(self, packed_data):
+        """
+        Receives a batch of messages arriving to Portal from Server.
+        This method is executed on the Portal.
+
+        Args:
+            packed_data (str): Pickled data, a list of (sessid, kwargs),
+                coming over the wire.
+        """
+        portal_sessionhandler = self.factory.portal.sessions
+        for sessid, kwargs in loads(packed_data):
+            session = portal_sessionhandler.get(sessid, None)
+            if session:
+                try:
+                    portal_sessionhandler.data_out(session, **kwargs)
+                except Exception:
+                    # don't lose the other messages
+                    logger.log_trace()
+        return {}
+
+    def send_server2portal_batch(self):
+        """
+        Send all batched messages to the Portal. Executed on the Server.
+
+        Returns:
+            deferred (Deferred or None): Asynchronous return.
+
+        """
+        if self.server2portal_task and self.server2portal_task.active():
+            self.server2portal_task.cancel()
+        self.server2portal_task = None
+
+        batch = self.server2portal_batch
+        if not batch:
+            return
+        self.server2portal_batch = []
+
+        if len(batch) == 1:
+            sessid, kwargs = batch[0]
+            return self.send_data(MsgServer2Portal, sessid, **kwargs)
+
+        return self.callRemote(MsgServer2PortalBatch,
+                               packed_data=dumps(batch)
+                               ).addErrback(self.errback, MsgServer2PortalBatch.key)
 
     # Server administration from the Portal side
     @AdminPortal2Server.responder
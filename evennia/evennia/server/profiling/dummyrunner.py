@@ -29,14 +29,26 @@ change which actions by adding a path to
 in your settings. See utils.dummyrunner_actions.py
 for instructions on how to define this module.
 
+Clients connect over telnet by default. Set PROTOCOL = "websocket" in
+the dummyrunner settings to connect through the webclient's websocket
+port instead, commands are then sent as webclient "text" messages.
+
+When the runner stops, it prints percentiles of the latency of every
+command (the time until the first message after the command) and, for
+websocket clients, of the server's tick lag (the round trip time of an
+"echo" inputfunc).
+
 """
 from __future__ import print_function
 from __future__ import division
 from builtins import range
 
+import os
 import sys
+import json
 import time
 import random
+from struct import pack
 from argparse import ArgumentParser
 from twisted.conch import telnet
 from twisted.internet import reactor, protocol
@@ -44,6 +56,7 @@ from twisted.internet.task import LoopingCall
 
 from django.conf import settings
 from evennia.utils import mod_import, time_format
+from evennia.utils.txws import mask, make_accept, parse_hybi07_frames, NORMAL, CLOSE, PING
 
 # Load the dummyrunner settings module
 
@@ -70,8 +83,21 @@ CHANCE_OF_ACTION = DUMMYRUNNER_SETTINGS.CHANCE_OF_ACTION
 CHANCE_OF_LOGIN = DUMMYRUNNER_SETTINGS.CHANCE_OF_LOGIN
 # Port to use, if not specified on command line
 TELNET_PORT = DUMMYRUNNER_SETTINGS.TELNET_PORT or settings.TELNET_PORTS[0]
+# Protocol of clients, "telnet" or "websocket".
+PROTOCOL = getattr(DUMMYRUNNER_SETTINGS, "PROTOCOL", "telnet")
+# Websocket port to use, if not specified on command line
+WEBSOCKET_PORT = getattr(DUMMYRUNNER_SETTINGS, "WEBSOCKET_PORT", None) or settings.WEBSOCKET_CLIENT_PORT
+# time between each tick lag probe of a websocket client, in seconds.
+# 0 means no probe.
+TICK_PROBE_INTERVAL = getattr(DUMMYRUNNER_SETTINGS, "TICK_PROBE_INTERVAL", 10)
+# function called with every message a websocket client receives
+RECEIVE = getattr(DUMMYRUNNER_SETTINGS, "RECEIVE", None)
 #
 NLOGGED_IN = 0
+# command name: a list of latencies in seconds
+LATENCIES = {}
+# a list of tick lags in seconds
+TICK_LAGS = []
 
 
 # Messages
@@ -220,6 +246,67 @@ def makeiter(obj):
     """
     return obj if hasattr(obj, '__iter__') else [obj]
 
+
+def command_name(cmd):
+    """
+    Get the name of a command to group its latencies.
+
+    Args:
+        cmd (str): A command string, either a plain command or
+            a JSON command on the form {"cmd": <name>, "args": <args>}.
+
+    Returns:
+        name (str): The command's name.
+
+    """
+    try:
+        data = json.loads(cmd)
+        if isinstance(data, dict) and "cmd" in data:
+            return str(data["cmd"])
+    except ValueError:
+        pass
+    return cmd.split(" ", 1)[0]
+
+
+def percentile(values, percent):
+    """
+    Get a percentile of values.
+
+    Args:
+        values (list): Sorted values.
+        percent (float): The percentile, 0-100.
+
+    Returns:
+        value (float): The value at the percentile.
+
+    """
+    if not values:
+        return 0
+    index = int(round((len(values) - 1) * percent / 100.0))
+    return values[index]
+
+
+def print_report():
+    """
+    Print percentiles of command latencies and tick lags in milliseconds.
+
+    """
+    row = "%-20s %8s %8s %8s %8s %8s"
+    print(row % ("command", "count", "p50", "p90", "p99", "max"))
+
+    def print_row(name, values):
+        values = sorted(values)
+        print(row % (name, len(values),
+                     "%.1f" % (percentile(values, 50) * 1000),
+                     "%.1f" % (percentile(values, 90) * 1000),
+                     "%.1f" % (percentile(values, 99) * 1000),
+                     "%.1f" % (values[-1] * 1000 if values else 0)))
+
+    for name in sorted(LATENCIES):
+        print_row(name, LATENCIES[name])
+    if TICK_LAGS:
+        print_row("(tick lag)", TICK_LAGS)
+
 #------------------------------------------------------------
 # Client classes
 #------------------------------------------------------------
@@ -251,6 +338,7 @@ class DummyClient(telnet.StatefulTelnetProtocol):
         self._logging_out = False
         self._report = ""
         self._cmdlist = []  # already stepping in a cmd definition
+        self._sent = None  # (command name, send time) waiting for a response
         self._login = self.factory.actions[0]
         self._logout = self.factory.actions[1]
         self._actions = self.factory.actions[2:]
@@ -269,12 +357,42 @@ class DummyClient(telnet.StatefulTelnetProtocol):
         if not self._connected and not data.startswith(chr(255)):
             # wait until we actually get text back (not just telnet
             # negotiation)
-            self._connected = True
-            # start client tick
-            d = LoopingCall(self.step)
-            # dissipate exact step by up to +/- 0.5 second
-            timestep = TIMESTEP + (-0.5 + (random.random() * 1.0))
-            d.start(timestep, now=True).addErrback(self.error)
+            self.start_stepping()
+        elif self._connected:
+            self.record_response()
+
+    def start_stepping(self):
+        """
+        Start the client tick.
+
+        """
+        self._connected = True
+        d = LoopingCall(self.step)
+        # dissipate exact step by up to +/- 0.5 second
+        timestep = TIMESTEP + (-0.5 + (random.random() * 1.0))
+        d.start(timestep, now=True).addErrback(self.error)
+
+    def send_command(self, cmd):
+        """
+        Send a command to the server and wait for its response.
+
+        Args:
+            cmd (str): The command to send.
+
+        """
+        self._sent = (command_name(cmd), time.time())
+        self.sendLine(cmd)
+
+    def record_response(self):
+        """
+        Called when data comes in. Records the latency of the last
+        command if this is its first response.
+
+        """
+        if self._sent:
+            name, sent_time = self._sent
+            self._sent = None
+            LATENCIES.setdefault(name, []).append(time.time() - sent_time)
 
     def connectionLost(self, reason):
         """
@@ -348,11 +466,150 @@ class DummyClient(telnet.StatefulTelnetProtocol):
 
         # at this point we always have a list of commands
         if rand < CHANCE_OF_ACTION:
+            cmd = self._cmdlist[0]
+            if callable(cmd):
+                # the command depends on previous responses, None
+                # means it is not ready yet
+                cmd = cmd(self)
+                if cmd is None:
+                    return
+            self._cmdlist.pop(0)
             # send to the game
-            self.sendLine(str(self._cmdlist.pop(0)))
+            self.send_command(str(cmd))
             self.istep += 1
 
 
+class DummyWebsocketClient(DummyClient):
+    """
+    A dummy client connecting through the webclient's websocket. Commands
+    are sent as webclient "text" messages.
+
+    """
+
+    def connectionMade(self):
+        """
+        Called when connection is first established. Starts the
+        websocket handshake.
+
+        """
+        DummyClient.connectionMade(self)
+
+        self._handshaked = False
+        self._buffer = ""
+        self._probe = None  # (probe token, send time)
+        self._last_probe = time.time()
+
+        self._wskey = os.urandom(16).encode("base64").strip()
+        self.transport.write("GET / HTTP/1.1\r\n"
+                             "Host: localhost:%s\r\n"
+                             "Upgrade: websocket\r\n"
+                             "Connection: Upgrade\r\n"
+                             "Origin: http://localhost\r\n"
+                             "Sec-WebSocket-Key: %s\r\n"
+                             "Sec-WebSocket-Version: 13\r\n"
+                             "\r\n" % (WEBSOCKET_PORT, self._wskey))
+
+    def dataReceived(self, data):
+        """
+        Called when data comes in over the protocol.
+
+        Args:
+            data (str): Incoming data.
+
+        """
+        self._buffer += data
+
+        if not self._handshaked:
+            if "\r\n\r\n" not in self._buffer:
+                # wait for the whole response
+                return
+            response, self._buffer = self._buffer.split("\r\n\r\n", 1)
+            if make_accept(self._wskey) not in response:
+                print("client %s(%s) websocket handshake failed:\n%s" % (self.key, self.cid, response))
+                self.transport.loseConnection()
+                return
+            self._handshaked = True
+
+        frames, self._buffer = parse_hybi07_frames(self._buffer)
+        for opcode, payload in frames:
+            if opcode == NORMAL:
+                self.messageReceived(payload)
+            elif opcode == PING:
+                self.sendFrame(payload, opcode=0xa)
+            elif opcode == CLOSE:
+                self.transport.loseConnection()
+                return
+
+    def messageReceived(self, data):
+        """
+        Called when a websocket message comes in.
+
+        Args:
+            data (str): A JSON message on the form [cmdname, args, kwargs].
+
+        """
+        if not self._connected:
+            self.start_stepping()
+
+        if self._probe and self._probe[0] in data:
+            # response of the tick lag probe
+            TICK_LAGS.append(time.time() - self._probe[1])
+            self._probe = None
+            return
+
+        self.record_response()
+
+        if RECEIVE:
+            try:
+                cmdname, args, kwargs = json.loads(data)
+            except ValueError:
+                return
+            for cmd in makeiter(RECEIVE(self, cmdname, args, kwargs) or []):
+                self.send_command(str(cmd))
+
+    def sendFrame(self, data, opcode=0x1):
+        """
+        Send a masked frame, clients must mask all frames they send.
+
+        Args:
+            data (str): Data to send.
+            opcode (int): The frame's opcode.
+
+        """
+        if len(data) > 0xffff:
+            length = chr(0x80 | 0x7f) + pack(">Q", len(data))
+        elif len(data) > 0x7d:
+            length = chr(0x80 | 0x7e) + pack(">H", len(data))
+        else:
+            length = chr(0x80 | len(data))
+        key = os.urandom(4)
+        self.transport.write(chr(0x80 | opcode) + length + key + mask(data, key))
+
+    def sendLine(self, line):
+        """
+        Send a command as a webclient "text" message.
+
+        Args:
+            line (str): The command to send.
+
+        """
+        self.sendFrame(json.dumps(["text", [line], {}]))
+
+    def step(self):
+        """
+        Perform a step, and probe the server's tick lag.
+
+        """
+        now = time.time()
+        if TICK_PROBE_INTERVAL and not self._probe and now - self._last_probe >= TICK_PROBE_INTERVAL:
+            self._last_probe = now
+            token = "tick-probe-%s" % self.counter()
+            self._probe = (token, now)
+            self.sendFrame(json.dumps(["echo", [token], {}]))
+
+        DummyClient.step(self)
+
+
 class DummyFactory(protocol.ClientFactory):
     protocol = DummyClient
 
@@ -392,11 +649,17 @@ def start_all_dummy_clients(nclients):
 
     # setting up all clients (they are automatically started)
     factory = DummyFactory(actions)
+    port = TELNET_PORT
+    if PROTOCOL == "websocket":
+        factory.protocol = DummyWebsocketClient
+        port = WEBSOCKET_PORT
     for i in range(NCLIENTS):
-        reactor.connectTCP("localhost", TELNET_PORT, factory)
+        reactor.connectTCP("localhost", port, factory)
     # start reactor
     reactor.run()
 
+    print_report()
+
 #------------------------------------------------------------
 # Command line interface
 #------------------------------------------------------------
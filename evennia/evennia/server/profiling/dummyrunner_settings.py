@@ -10,6 +10,11 @@ TIMESTEP - time in seconds between each 'tick'
 CHANCE_OF_ACTION - chance 0-1 of action happening
 CHANCE_OF_LOGIN - chance 0-1 of login happening
 TELNET_PORT - port to use, defaults to settings.TELNET_PORT
+PROTOCOL - "telnet" or "websocket", defaults to "telnet"
+WEBSOCKET_PORT - port to use, defaults to settings.WEBSOCKET_CLIENT_PORT
+TICK_PROBE_INTERVAL - time in seconds between tick lag probes of websocket
+                      clients, 0 means no probe
+RECEIVE - optional, see below
 ACTIONS - see below
 
 ACTIONS is a tuple
@@ -49,6 +54,16 @@ TIMESTEP with a chance given by CHANCE_OF_ACTION by in the order given
 (no randomness) and allows for setting up a more complex chain of
 commands (such as creating an account and logging in).
 
+A command in the list can also be a callable taking the client as
+argument. It is called when the command is about to be sent, and returns
+the command string, or None to wait until the next tick. This allows for
+commands which depend on earlier responses.
+
+RECEIVE is an optional function called with (client, cmdname, args, kwargs)
+for every message a websocket client receives. It can save data from the
+server on the client, and can return a command string or a list of command
+strings to send at once.
+
 """
 # Dummy runner settings
 
@@ -69,6 +84,16 @@ CHANCE_OF_LOGIN = 1.0
 # default telnet port of the running server.
 TELNET_PORT = None
 
+# Protocol of the dummy clients, "telnet" or "websocket".
+PROTOCOL = "telnet"
+
+# Which websocket port to connect to. If set to None, uses the
+# webclient's websocket port of the running server.
+WEBSOCKET_PORT = None
+
+# Time between each tick lag probe of a websocket client, in seconds.
+TICK_PROBE_INTERVAL = 10
+
 
 # Setup actions tuple
 
@@ -24,9 +24,12 @@ try:
 except ImportError:
     import unittest
 
+import os
+from mock import Mock, patch
 from django.test.runner import DiscoverRunner
 
 from .deprecations import check_errors
+from . import amp
 
 
 class EvenniaTestSuiteRunner(DiscoverRunner):
@@ -77,3 +80,123 @@ class TestDeprecations(TestCase):
             self.assertRaises(DeprecationWarning, check_errors, MockSettings(setting))
         # test check for WEBSERVER_PORTS having correct value
         self.assertRaises(DeprecationWarning, check_errors, MockSettings("WEBSERVER_PORTS", value=["not a tuple"]))
+
+
+class TestZlibCodec(TestCase):
+    """
+    Class for testing the codecs of AMP data.
+    """
+    short_data = amp.dumps((1, {"text": "short"}))
+    long_data = amp.dumps((1, {"text": "long " * 100}))
+
+    def test_round_trip(self):
+        for level in (0, 1, 9):
+            codec = amp.ZlibCodec(level, 100)
+            for data in (self.short_data, self.long_data):
+                encoded = codec.encode(data)
+                self.assertEqual(codec.decode(encoded), data)
+                if level and len(data) >= 100:
+                    self.assertEqual(encoded[:1], amp.ZlibCodec.ZLIB)
+                    self.assertLess(len(encoded), len(data))
+                else:
+                    self.assertEqual(encoded, data)
+
+    def test_zero_threshold(self):
+        codec = amp.ZlibCodec(6, 0)
+        encoded = codec.encode(self.short_data)
+        self.assertEqual(encoded[:1], amp.ZlibCodec.ZLIB)
+        self.assertEqual(codec.decode(encoded), self.short_data)
+
+    def test_old_peer(self):
+        # data from peers without codecs is not flagged
+        codec = amp.ZlibCodec(6, 0)
+        for data in ((1, {"text": "short"}), (2, {"text": "long " * 100})):
+            self.assertEqual(amp.loads(codec.decode(amp.dumps(data))), data)
+
+
+class TestCompressed(TestCase):
+    """
+    Class for testing the splitting of long data in AMP boxes.
+    """
+    def box_round_trip(self, codec, data):
+        argument = amp.Compressed()
+        strings = {}
+        with patch.object(amp, "_CODEC", codec):
+            argument.toBox("packed_data", strings, {"packed_data": data}, None)
+            objects = {}
+            argument.fromBox("packed_data", strings, objects, None)
+        self.assertEqual(objects["packed_data"], data)
+        for value in strings.values():
+            self.assertLessEqual(len(value), amp.AMP_MAXLEN)
+        return strings
+
+    def test_chunks(self):
+        # random data can not be compressed
+        data = os.urandom(amp.AMP_MAXLEN * 2 + 10)
+        for codec in (amp.AmpCodec(), amp.ZlibCodec(0, 0), amp.ZlibCodec(6, 0)):
+            strings = self.box_round_trip(codec, data)
+            self.assertEqual(sorted(strings), ["packed_data", "packed_data.2", "packed_data.3"])
+
+    def test_compressed_chunks(self):
+        data = amp.dumps((1, {"text": "long " * amp.AMP_MAXLEN}))
+        strings = self.box_round_trip(amp.ZlibCodec(6, 0), data)
+        self.assertEqual(sorted(strings), ["packed_data"])
+        strings = self.box_round_trip(amp.AmpCodec(), data)
+        self.assertGreater(len(strings), 1)
+
+
+class TestServer2PortalBatch(TestCase):
+    """
+    Class for testing messages sent to the Portal in batches.
+    """
+    def setUp(self):
+        self.task = Mock()
+        self.task.active.return_value = True
+        self.patches = [patch.object(amp, "_BATCH_SERVER2PORTAL", True),
+                        patch.object(amp.reactor, "callLater", return_value=self.task)]
+        for item in self.patches:
+            item.start()
+
+        self.protocol = amp.AMPProtocol()
+        self.protocol.callRemote = Mock()
+
+    def tearDown(self):
+        for item in self.patches:
+            item.stop()
+
+    def sent(self):
+        return [(call[0][0], amp.loads(call[1]["packed_data"]))
+                for call in self.protocol.callRemote.call_args_list]
+
+    def test_batch(self):
+        self.protocol.send_MsgServer2Portal(Mock(sessid=1), text="a")
+        self.protocol.send_MsgServer2Portal(Mock(sessid=2), text="b")
+        self.assertEqual(amp.reactor.callLater.call_count, 1)
+        self.assertFalse(self.protocol.callRemote.called)
+
+        self.protocol.send_server2portal_batch()
+        self.assertEqual(self.sent(), [(amp.MsgServer2PortalBatch,
+                                        [(1, {"text": "a"}), (2, {"text": "b"})])])
+
+    def test_single_message(self):
+        self.protocol.send_MsgServer2Portal(Mock(sessid=1), text="a")
+        self.protocol.send_server2portal_batch()
+        self.assertEqual(self.sent(), [(amp.MsgServer2Portal, (1, {"text": "a"}))])
+
+    def test_flush_before_other_command(self):
+        self.protocol.send_MsgServer2Portal(Mock(sessid=1), text="a")
+        self.protocol.send_MsgServer2Portal(Mock(sessid=1), text="b")
+        self.protocol.send_AdminServer2Portal(Mock(sessid=1), operation=amp.SSYNC)
+
+        # pending messages are sent first to keep the order
+        self.assertEqual(self.sent(), [(amp.MsgServer2PortalBatch,
+                                        [(1, {"text": "a"}), (1, {"text": "b"})]),
+                                       (amp.AdminServer2Portal,
+                                        (1, {"operation": amp.SSYNC}))])
+        self.assertTrue(self.task.cancel.called)
+        self.assertEqual(self.protocol.server2portal_batch, [])
+        self.assertIsNone(self.protocol.server2portal_task)
+
+        # nothing is left to send
+        self.protocol.send_server2portal_batch()
+        self.assertEqual(len(self.protocol.callRemote.call_args_list), 2)
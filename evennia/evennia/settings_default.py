@@ -104,6 +104,18 @@ EVENNIA_ADMIN = True
 AMP_HOST = 'localhost'
 AMP_PORT = 4006
 AMP_INTERFACE = '127.0.0.1'
+# The codec encoding data sent between Server and Portal. It is created with
+# the compression level (0-9, 0 is no compression) and threshold (data
+# shorter than this number of bytes is sent uncompressed). Compression only
+# pays off when the Server and Portal run on different machines with a slow
+# network between them, so it is off by default.
+AMP_CODEC = "evennia.server.amp.ZlibCodec"
+AMP_COMPRESSION_LEVEL = 0
+AMP_COMPRESSION_THRESHOLD = 512
+# Send all messages from the Server to the Portal in one reactor turn as one
+# AMP call, instead of one call per message. The Server and Portal must run
+# the same code, so restart (not reload) the game after changing it.
+AMP_BATCH_SERVER2PORTAL = False
 
 
 # Path to the lib directory containing the bulk of the codebase's code.
@@ -6,11 +6,11 @@ from __future__ import print_function
 
 import random
 import traceback
-from twisted.internet import reactor
 from django.conf import settings
 from evennia import DefaultScript
 from evennia.utils import logger
 from muddery.utils import builder, defines
+from muddery.combat.combat_scheduler import COMBAT_SCHEDULER
 
 
 class BaseCombatHandler(DefaultScript):
@@ -72,6 +72,8 @@ class BaseCombatHandler(DefaultScript):
         if self.timer and self.timer.active():
             self.timer.cancel()
 
+        COMBAT_SCHEDULER.remove_combat(self)
+
         for character in self.characters.values():
             # note: the list() call above disconnects list from database
             self._cleanup_character(character)
@@ -110,10 +112,12 @@ class BaseCombatHandler(DefaultScript):
             if character.has_account:
                 self.show_combat(character)
 
+        COMBAT_SCHEDULER.add_combat(self)
+
         self.start_combat()
 
         if self.timeout:
-            self.timer = reactor.callLater(self.timeout, self.at_timeout)
+            self.timer = COMBAT_SCHEDULER.schedule(self.at_timeout, self.timeout)
 
     def at_timeout(self):
         """
@@ -0,0 +1,196 @@
+"""
+Combat scheduler drives all combats' timers with one ticker.
+
+Auto cast skills and combat timeouts are kept in a heap ordered by their due
+time, so there is only one timer in the reactor no matter how many combats
+are running.
+"""
+
+from __future__ import print_function
+
+import time
+import heapq
+from twisted.internet import task
+from django.conf import settings
+from evennia.utils import logger
+
+
+class ScheduledTask(object):
+    """
+    A task in the scheduler.
+    """
+    __slots__ = ("callback", "due", "interval", "cancelled")
+
+    def __init__(self, callback, due, interval):
+        """
+        Args:
+            callback: (function) the function to call
+            due: (number) the time to call the function
+            interval: (number) repeat interval, 0 means call only once
+        """
+        self.callback = callback
+        self.due = due
+        self.interval = interval
+        self.cancelled = False
+
+    def active(self):
+        """
+        If the task will be called.
+        """
+        return not self.cancelled
+
+    def cancel(self):
+        """
+        Cancel the task.
+        """
+        self.cancelled = True
+
+
+class CombatScheduler(object):
+    """
+    Calls combat tasks in ticks.
+    """
+    def __init__(self, tick_interval=None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            tick_interval: (number) time between ticks in seconds
+        """
+        if tick_interval is None:
+            tick_interval = settings.COMBAT_TICK_INTERVAL
+        self.tick_interval = tick_interval
+
+        # heap of (due time, sequence, task)
+        self.heap = []
+        self.sequence = 0
+
+        # running combat handlers
+        self.combats = set()
+
+        self.loop = None
+
+        # metrics
+        self.ticks = 0
+        self.actions_per_tick = 0
+        self.max_actions_per_tick = 0
+        self.tick_overruns = 0
+        self.max_tick_time = 0
+
+    def __del__(self):
+        """
+        Stop the ticker.
+        """
+        if self.loop and self.loop.running:
+            self.loop.stop()
+
+    def schedule(self, callback, delay, interval=0):
+        """
+        Add a task.
+
+        Args:
+            callback: (function) the function to call
+            delay: (number) call the function after this time
+            interval: (number) call the function repeatedly in this interval,
+                      0 means call only once
+
+        Returns:
+            (ScheduledTask) the task, call its cancel() to remove it
+        """
+        scheduled = ScheduledTask(callback, time.time() + delay, interval)
+        self.push(scheduled)
+
+        if not (self.loop and self.loop.running):
+            self.loop = task.LoopingCall(self.tick)
+            self.loop.start(self.tick_interval, now=False)
+
+        return scheduled
+
+    def push(self, scheduled):
+        """
+        Put a task into the heap.
+        """
+        self.sequence += 1
+        heapq.heappush(self.heap, (scheduled.due, self.sequence, scheduled))
+
+    def add_combat(self, combat):
+        """
+        Add a running combat.
+        """
+        self.combats.add(combat)
+
+    def remove_combat(self, combat):
+        """
+        Remove a finished combat.
+        """
+        self.combats.discard(combat)
+
+    def tick(self):
+        """
+        Call all due tasks.
+        """
+        begin = time.time()
+
+        # Take all due tasks out first, tasks added in this tick will be
+        # called in next ticks.
+        due_tasks = []
+        heap = self.heap
+        while heap and heap[0][0] <= begin:
+            due, sequence, scheduled = heapq.heappop(heap)
+            if not scheduled.cancelled:
+                due_tasks.append(scheduled)
+
+        actions = 0
+        for scheduled in due_tasks:
+            if scheduled.cancelled:
+                # cancelled by another task in this tick
+                continue
+
+            if scheduled.interval > 0:
+                scheduled.due += scheduled.interval
+                if scheduled.due <= begin:
+                    # too late, do not call it several times in a tick
+                    scheduled.due = begin + scheduled.interval
+                self.push(scheduled)
+            else:
+                scheduled.cancelled = True
+
+            try:
+                scheduled.callback()
+            except Exception, e:
+                logger.log_tracemsg("Combat task error: %s" % e)
+            actions += 1
+
+        self.ticks += 1
+        self.actions_per_tick = actions
+        if actions > self.max_actions_per_tick:
+            self.max_actions_per_tick = actions
+
+        cost = time.time() - begin
+        if cost > self.max_tick_time:
+            self.max_tick_time = cost
+        if cost > self.tick_interval:
+            self.tick_overruns += 1
+
+        if not heap and self.loop and self.loop.running:
+            # nothing to do
+            self.loop.stop()
+
+    def get_stats(self):
+        """
+        Get the scheduler's metrics.
+
+        Returns:
+            (dict) metrics
+        """
+        return {"active_combats": len(self.combats),
+                "scheduled_tasks": len(self.heap),
+                "ticks": self.ticks,
+                "actions_per_tick": self.actions_per_tick,
+                "max_actions_per_tick": self.max_actions_per_tick,
+                "tick_overruns": self.tick_overruns,
+                "max_tick_time": self.max_tick_time}
+
+
+# main combat scheduler
+COMBAT_SCHEDULER = CombatScheduler()
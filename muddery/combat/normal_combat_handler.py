@@ -86,25 +86,24 @@ class NormalCombatHandler(BaseCombatHandler):
             for character in winners:
                 character.add_exp(exp, combat=True)
 
-        for character in winners:
-            if character.is_typeclass(settings.BASE_PLAYER_CHARACTER_TYPECLASS):
-                # get object list
-                loots = None
-                for loser in losers:
-                    obj_list = loser.loot_handler.get_obj_list(character)
-                    if obj_list:
-                        if not loots:
-                            loots = obj_list
-                        else:
-                            loots.extend(obj_list)
-
-                # give objects to winner
-                if loots:
-                    character.receive_objects(loots, combat=True)
-
-                # call quest handler
-                for loser in losers:
-                    character.quest_handler.at_objective(defines.OBJECTIVE_KILL, loser.get_data_key())
+        players = [character for character in winners
+                   if character.is_typeclass(settings.BASE_PLAYER_CHARACTER_TYPECLASS)]
+
+        # roll all players' loots of a loser at once
+        loots = [[] for character in players]
+        if players:
+            for loser in losers:
+                for i, obj_list in enumerate(loser.loot_handler.get_obj_lists(players)):
+                    loots[i].extend(obj_list)
+
+        for i, character in enumerate(players):
+            # give objects to winner
+            if loots[i]:
+                character.receive_objects(loots[i], combat=True)
+
+            # call quest handler, all kills are counted at once
+            character.quest_handler.at_objectives([(defines.OBJECTIVE_KILL, loser.get_data_key(), 1)
+                                                   for loser in losers])
 
         # losers are killed.
         for character in losers:
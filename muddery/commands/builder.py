@@ -0,0 +1,58 @@
+"""
+Builder commands. They can only be used by builders.
+"""
+
+from evennia import Command
+from muddery.statements.statement_profiler import STATEMENT_PROFILER
+
+
+class CmdStatementProfile(Command):
+    """
+    Profile statement functions and conditions.
+
+    Usage:
+        {"cmd":"statement_profile",
+         "args":<"on", "off", "reset" or "">
+        }
+
+    "on" starts recording, "off" stops recording, "reset" clears recorded
+    data. Recorded data is shown after the action.
+    """
+    key = "statement_profile"
+    locks = "cmd:perm(Builder)"
+    help_category = "Building"
+
+    # number of items to show
+    top = 20
+
+    def func(self):
+        """
+        Control the profiler and show the most costly functions and conditions.
+        """
+        caller = self.caller
+        action = self.args
+
+        if action == "on":
+            STATEMENT_PROFILER.enable()
+        elif action == "off":
+            STATEMENT_PROFILER.disable()
+        elif action == "reset":
+            STATEMENT_PROFILER.reset()
+
+        stats = STATEMENT_PROFILER.get_stats(self.top)
+
+        lines = ["Statement profiler is %s, recorded %.1f seconds." %
+                 ("on" if stats["enabled"] else "off", stats["duration"])]
+        for title, items in (("Functions", stats["functions"]),
+                             ("Conditions", stats["conditions"])):
+            lines.append("%s:" % title)
+            lines.append("%10s %12s %12s %12s  %s" % ("count", "total(ms)", "avg(ms)", "max(ms)", "key"))
+            for item in items:
+                lines.append("%10d %12.3f %12.3f %12.3f  %s" % (item["count"],
+                                                                item["total"] * 1000,
+                                                                item["average"] * 1000,
+                                                                item["max"] * 1000,
+                                                                item["key"]))
+
+        caller.msg({"msg": "\n".join(lines),
+                    "statement_profile": stats})
@@ -13,6 +13,7 @@ To create new commands to populate the cmdset, see
 import traceback
 from evennia import CmdSet
 from evennia import default_cmds
+from muddery.commands import builder
 from muddery.commands import combat
 from muddery.commands import general
 from muddery.commands import player
@@ -62,6 +63,9 @@ class CharacterCmdSet(default_cmds.CharacterCmdSet):
         self.add(general.CmdAction())
         self.add(general.CmdAction())
 
+        # Builder commands.
+        self.add(builder.CmdStatementProfile())
+
         # Add empty login commands to the normal cmdset to
         # avoid showing wrong cmd messages.
         self.add(general.CmdConnect())
@@ -9,6 +9,8 @@ from worlddata.models import honours
 from django.db import transaction
 from django.apps import apps
 from django.conf import settings
+from twisted.internet import task
+from muddery.utils.honour_rankings import HonourRankings
 
 
 class HonoursMapper(object):
@@ -17,40 +19,26 @@ class HonoursMapper(object):
     """
     def __init__(self):
         self.objects = apps.get_model(settings.WORLD_DATA_APP, "honours").objects
-        self.honours = {}
-        self.rankings = []
+        self.rankings = HonourRankings()
+
+        # Changes not written to the database.
+        # character's id: honour, or None if the character is removed
+        self.pending = {}
+        self.loop = None
 
     def reload(self):
         """
         Reload all data.
         """
-        self.honours = {}
-        self.rankings = []
-
-        for record in self.objects.all():
-            self.honours[record.character] = {"honour": record.honour,
-                                              "place": 0,
-                                              "ranking": 0}
-        self.make_rankings()
+        self.flush()
+        self.rankings.load(self.objects.all().values_list("character", "honour"))
 
-    def make_rankings(self):
-        """
-        Calculate all character's rankings.
-        """
-        rankings = sorted(self.honours.items(), lambda x, y: cmp(x[1]["honour"], y[1]["honour"]), reverse=True)
-        # only ranking normal players
-        self.rankings = [item[0] for item in rankings if item[1]["honour"] >= 0]
-        
-        if not self.rankings:
-            return
-        
-        last = self.rankings[0]
-        for i, key in enumerate(self.rankings):
-            self.honours[key]["place"] = i
-            self.honours[key]["ranking"] = i + 1
-            if self.honours[key]["honour"] == self.honours[last]["honour"]:
-                self.honours[key]["ranking"] = self.honours[last]["ranking"]
-            last = key
+        # keep changes which can not be written
+        for key, value in self.pending.iteritems():
+            if value is None:
+                self.rankings.remove(key)
+            else:
+                self.rankings.set(key, value)
             
     def has_info(self, character):
         """
@@ -62,7 +50,7 @@ class HonoursMapper(object):
         Return:
             boolean: has or not.
         """
-        return self.honours.has_key(character.id)
+        return character.id in self.rankings
 
     def get_info(self, character):
         """
@@ -75,7 +63,10 @@ class HonoursMapper(object):
             dict: Character's honour information.
         """
         try:
-            return self.honours[character.id]
+            character_id = character.id
+            return {"honour": self.rankings.get_honour(character_id),
+                    "place": self.rankings.get_place(character_id),
+                    "ranking": self.rankings.get_ranking(character_id)}
         except Exception, e:
             print("Can not get character's honour: %s" % e)
             
@@ -102,7 +93,7 @@ class HonoursMapper(object):
             number: Character's honour.
         """
         try:
-            return self.honours[character_id]["honour"]
+            return self.rankings.get_honour(character_id)
         except Exception, e:
             if default is not None:
                 return default
@@ -120,7 +111,7 @@ class HonoursMapper(object):
             number: Character's ranking.
         """
         try:
-            return self.honours[character.id]["ranking"]
+            return self.rankings.get_ranking(character.id)
         except Exception, e:
             print("Can not get character's ranking: %s" % e)
             
@@ -130,27 +121,17 @@ class HonoursMapper(object):
         """
         if number <= 0:
             return
-        return [id for id in self.rankings[:number]]
+        return self.rankings.get_top(number)
         
     def get_nearest_rankings(self, character, number):
         """
         Get nearest ranking characters.
         """
         character_id = character.id
-        if character_id in self.honours:
-            place = self.honours[character_id]["place"]
-            begin = place - number / 2
-            if begin < 0:
-                begin = 0
-            end = begin + number + 1
-            if end > len(self.rankings):
-                end = len(self.rankings)
-                begin = end - number - 1
-                if begin < 0:
-                    begin = 0
-            return [id for id in self.rankings[begin:end]]
+        if character_id in self.rankings:
+            return self.rankings.get_around(character_id, number)
         else:
-            return [id for id in self.rankings[-number:]]
+            return self.rankings.get_last(number)
 
     def set_honour(self, character, honour):
         """
@@ -160,23 +141,10 @@ class HonoursMapper(object):
             character: character object
             honour: character's honour
         """
-        try:
-            character_id = character.id
-            record = self.objects.filter(character=character_id)
-            if record:
-                record.update(honour = honour)
-                self.honours[character_id]["honour"] = honour
-            else:
-                record = honours()
-                record.character = character_id
-                record.honour = honour
-                record.save()
-                self.honours[character_id] = {"honour": honour,
-                                              "place": 0,
-                                              "ranking": 0}
-            self.make_rankings()
-        except Exception, e:
-            print("Can not set character's honour: %s" % e)
+        character_id = character.id
+        self.rankings.set(character_id, honour)
+        self.pending[character_id] = honour
+        self.write_behind()
 
     def set_honours(self, new_honours):
         """
@@ -185,49 +153,106 @@ class HonoursMapper(object):
         Args:
             new_honours: (dict) {character's id: character's honour}
         """
-        success = False
-        with transaction.atomic():
-            for key, value in new_honours.iteritems():
-                self.objects.filter(character=key).update(honour=value)
-            success = True
-        
-        if success:
-            for key, value in new_honours.iteritems():
-                self.honours[key]["honour"] = value
-            self.make_rankings()
-        else:
-            print("Can not set character's honours")
+        for key, value in new_honours.iteritems():
+            self.rankings.set(key, value)
+            self.pending[key] = value
+        self.write_behind()
             
     def remove_honour(self, character):
         """
         Remove a character's honour.
         """
+        character_id = character.id
+        self.rankings.remove(character_id)
+        self.pending[character_id] = None
+        self.write_behind()
+
+    def write_behind(self):
+        """
+        Write changes at once if changes are not flushed periodically.
+        """
+        if not (self.loop and self.loop.running):
+            self.flush()
+
+    def flush(self):
+        """
+        Write all pending changes to the database in one transaction. If it
+        fails, changes are kept and will be written in the next flush.
+
+        Returns:
+            (boolean) success or not
+        """
+        if not self.pending:
+            return True
+
+        # Take the changes out first, changes made during the flush will be
+        # written in the next flush.
+        pending = self.pending
+        self.pending = {}
+
+        removed = [key for key, value in pending.iteritems() if value is None]
+        changed = dict((key, value) for key, value in pending.iteritems() if value is not None)
+
         try:
-            self.objects.get(character=character.id).delete()
-            del self.honours[character.id]
-            self.make_rankings()
+            with transaction.atomic():
+                if removed:
+                    self.objects.filter(character__in=removed).delete()
+
+                if changed:
+                    exists = set(self.objects.filter(character__in=changed.keys())\
+                                             .values_list("character", flat=True))
+
+                    # one update query per honour value
+                    values = {}
+                    for key in exists:
+                        values.setdefault(changed[key], []).append(key)
+                    for value, keys in values.iteritems():
+                        self.objects.filter(character__in=keys).update(honour=value)
+
+                    new_records = [honours(character=key, honour=value)
+                                   for key, value in changed.iteritems() if key not in exists]
+                    if new_records:
+                        self.objects.bulk_create(new_records)
         except Exception, e:
-            print("Can not remove character's honour: %s" % e)
+            # put changes back, newer changes override them
+            pending.update(self.pending)
+            self.pending = pending
+            logger.log_errmsg("Can not write characters' honours: %s" % e)
+            return False
+
+        return True
+
+    def start_flushing(self, interval):
+        """
+        Flush changes periodically.
+
+        Args:
+            interval: (number) flush interval in seconds, if it is not
+                      positive, changes are written at once.
+        """
+        self.stop_flushing()
+        if interval > 0:
+            self.loop = task.LoopingCall(self.flush)
+            self.loop.start(interval, now=False)
+
+    def stop_flushing(self):
+        """
+        Stop flushing periodically and write all pending changes.
+        """
+        if self.loop and self.loop.running:
+            self.loop.stop()
+        self.loop = None
+        self.flush()
             
     def get_characters(self, character, number):
         """
         Get opponents whose ranking is in the given number.
         """
         character_id = character.id
-        if character_id in self.honours:
-            place = self.honours[character_id]["place"]
-            begin = place - number / 2
-            if begin < 0:
-                begin = 0
-            end = begin + number + 1
-            if end > len(self.rankings):
-                end = len(self.rankings)
-                begin = end - number - 1
-                if begin < 0:
-                    begin = 0
-            return [id for id in self.rankings[begin:end] if id != character_id]
+        if character_id in self.rankings:
+            return [id for id in self.rankings.get_around(character_id, number) if id != character_id]
         else:
-            return [id for id in self.rankings[-number:]]
+            return self.rankings.get_last(number)
         
 
 # main honour handler
@@ -16,12 +16,19 @@ at_server_cold_stop()
 
 """
 
+from django.conf import settings
 from muddery.utils.attributes_info_handler import CHARACTER_ATTRIBUTES_INFO, EQUIPMENT_ATTRIBUTES_INFO, FOOD_ATTRIBUTES_INFO
 from muddery.utils.dialogue_handler import DIALOGUE_HANDLER
 from muddery.utils.object_key_handler import OBJECT_KEY_HANDLER
+from muddery.utils.object_data_handler import OBJECT_DATA_HANDLER
+from muddery.utils.data_key_index import DATA_KEY_INDEX
+from muddery.utils.event_handler import EVENT_INDEX
+from muddery.utils.world_graph import WORLD_GRAPH
+from muddery.utils.loot_handler import LOOT_TABLES
 from muddery.utils.equip_type_handler import EQUIP_TYPE_HANDLER
 from muddery.utils.quest_dependency_handler import QUEST_DEP_HANDLER
 from muddery.utils.localized_strings_handler import LOCALIZED_STRINGS_HANDLER
+from muddery.utils.name_resolver import NAME_RESOLVER
 from muddery.utils.game_settings import GAME_SETTINGS
 from muddery.utils.desc_handler import DESC_HANDLER
 from muddery.dao.honours_mapper import HONOURS_MAPPER
@@ -38,6 +45,22 @@ def at_server_start():
 
     # reload keys
     OBJECT_KEY_HANDLER.reload()
+
+    # reload objects' data
+    OBJECT_DATA_HANDLER.reload()
+
+    # reload objects' data keys
+    DATA_KEY_INDEX.reload()
+
+    # reload events
+    EVENT_INDEX.reload()
+
+    # build the world graph
+    WORLD_GRAPH.reload()
+
+    # clear loot tables
+    LOOT_TABLES.clear()
+    LOOT_TABLES.seed(settings.LOOT_RANDOM_SEED)
     
     # reload attributes
     CHARACTER_ATTRIBUTES_INFO.reload()
@@ -49,6 +72,8 @@ def at_server_start():
     
     # clear dialogues
     DIALOGUE_HANDLER.clear()
+    if settings.PRELOAD_DIALOGUES:
+        DIALOGUE_HANDLER.load_all()
 
     # clear quest dependencies
     QUEST_DEP_HANDLER.clear()
@@ -59,6 +84,9 @@ def at_server_start():
     # reload local strings
     LOCALIZED_STRINGS_HANDLER.reload()
 
+    # reload objects' names, they are localized
+    NAME_RESOLVER.reload()
+
     # localize model fields
     localize_model_fields()
 
@@ -72,13 +100,15 @@ def at_server_start():
     
     # load honours    
     HONOURS_MAPPER.reload()
+    HONOURS_MAPPER.start_flushing(settings.HONOURS_FLUSH_INTERVAL)
 
 def at_server_stop():
     """
     This is called just before the server is shut down, regardless
     of it is for a reload, reset or shutdown.
     """
-    pass
+    # write honours
+    HONOURS_MAPPER.stop_flushing()
 
 
 def at_server_reload_start():
@@ -26,6 +26,7 @@ from __future__ import print_function
 import json
 from evennia.server.serversession import ServerSession as BaseServerSession
 from evennia.utils import logger
+from muddery.utils.message_coalescer import MESSAGE_COALESCER
 
 
 class ServerSession(BaseServerSession):
@@ -42,6 +43,10 @@ class ServerSession(BaseServerSession):
         Send Evennia -> User
         Convert to JSON.
         """
+        # Send messages kept by the message coalescer first, so messages
+        # sent to the session directly do not overtake them.
+        MESSAGE_COALESCER.flush_session(self.sessid)
+
         options = None
         if kwargs.has_key("options"):
             options = kwargs.get("options", None)
@@ -0,0 +1,262 @@
+"""
+AMP benchmark
+
+Compares codecs and batching of messages sent from the Server to the Portal
+through AMP, with mixes of typical Muddery messages. Messages are pickled,
+encoded, put into AMP boxes and serialized like AMPProtocol does, then parsed
+and decoded like the Portal does. Answer boxes are counted too. It reports
+messages per second, CPU time per message and bytes on the wire per message.
+
+Use it to choose AMP_COMPRESSION_LEVEL, AMP_COMPRESSION_THRESHOLD and
+AMP_BATCH_SERVER2PORTAL.
+
+Run it in the game folder, the game's settings are needed:
+
+    python -m muddery.server.profiling.amp_benchmark [messages] [seed]
+
+or in `evennia shell`:
+
+    from muddery.server.profiling import amp_benchmark
+    amp_benchmark.main()
+
+"""
+
+from __future__ import print_function
+
+if __name__ == "__main__":
+    import django
+    django.setup()
+
+import sys
+import json
+import time
+import random
+from twisted.protocols import amp as twisted_amp
+from evennia.server import amp
+from evennia.server.amp import AmpCodec, ZlibCodec, MsgServer2Portal, MsgServer2PortalBatch
+
+
+# number of messages sent in one reactor turn when batching
+BATCH_SIZE = 20
+
+
+def make_look_around():
+    "the appearance of a room"
+    def objects(prefix, number):
+        return [{"dbref": "#%d" % (100 + i),
+                 "name": "%s %d" % (prefix, i),
+                 "key": "%s_%d" % (prefix.lower(), i)} for i in xrange(number)]
+
+    return {"look_around": {"dbref": "#10",
+                            "name": "Village Square",
+                            "desc": "The square is paved with old stones. A well stands in the "
+                                    "middle of it, and villagers come and go around it.",
+                            "exits": objects("Road", 4),
+                            "npcs": objects("Villager", 5),
+                            "things": objects("Box", 3),
+                            "players": objects("Player", 2),
+                            "peaceful": False,
+                            "background": None}}
+
+
+def make_inventory():
+    "a player's inventory"
+    return {"inventory": [{"dbref": "#%d" % (200 + i),
+                           "name": "Item %d" % i,
+                           "number": i % 5 + 1,
+                           "desc": "An item which can be used or sold in shops.",
+                           "icon": "icon_item_%d" % (i % 8)} for i in xrange(30)]}
+
+
+def make_status():
+    "a character's status"
+    names = ("level", "max_exp", "exp", "max_hp", "hp", "attack", "defence")
+    return {"status": dict((name, {"key": name,
+                                   "name": name.upper(),
+                                   "value": index * 10,
+                                   "order": index}) for index, name in enumerate(names))}
+
+
+def make_skill_result():
+    "the result of a skill cast in combat"
+    return {"skill_result": {"skill": "skill_attack",
+                             "caller": "#12",
+                             "target": "#34",
+                             "cast": "Player casts Attack to Wolf.",
+                             "result": "Hit Wolf by 12 points.",
+                             "status": {"#12": {"hp": 88, "max_hp": 100},
+                                        "#34": {"hp": 40, "max_hp": 60}}}}
+
+
+def make_combat_info():
+    "the appearance of a combat"
+    return {"combat_info": {"desc": "",
+                            "timeout": 60,
+                            "characters": [{"dbref": "#%d" % (12 + i),
+                                            "name": "Fighter %d" % i,
+                                            "team": i % 2 + 1,
+                                            "max_hp": 100,
+                                            "hp": 80,
+                                            "icon": None} for i in xrange(4)]},
+            "combat_commands": [{"key": "skill_attack", "name": "Attack", "icon": None},
+                                {"key": "skill_heal", "name": "Heal", "icon": None}]}
+
+
+def make_dialogue():
+    "a dialogue sentence"
+    return {"dialogues_list": [{"npc": "#101",
+                                "dialogue": "dlg_village_well",
+                                "sentence": 0,
+                                "content": "The well has been dry for a month. Could you "
+                                           "find out what happened to it?",
+                                "can_close": True}]}
+
+
+def make_msg():
+    "a short message"
+    return {"msg": "You are not in combat!"}
+
+
+# message mixes: (name, ((weight, message), ...))
+MIXES = (("exploring", ((0.35, make_look_around()),
+                        (0.2, make_dialogue()),
+                        (0.15, make_status()),
+                        (0.1, make_inventory()),
+                        (0.2, make_msg()))),
+         ("fighting", ((0.6, make_skill_result()),
+                       (0.1, make_combat_info()),
+                       (0.2, make_status()),
+                       (0.1, make_msg()))),
+         ("chatting", ((0.9, make_msg()),
+                       (0.1, make_status()))))
+
+
+def make_messages(mix, number, seed):
+    """
+    Make messages to send.
+
+    Args:
+        mix: (tuple) ((weight, message), ...)
+        number: (int) the number of messages
+        seed: (int) random seed
+
+    Returns:
+        (list) a list of (sessid, kwargs)
+    """
+    rand = random.Random(seed)
+    total = sum(weight for weight, message in mix)
+
+    messages = []
+    for i in xrange(number):
+        value = rand.random() * total
+        for weight, message in mix:
+            value -= weight
+            if value <= 0:
+                break
+        kwargs = {"text": ((json.dumps(message),), {"raw": True})}
+        messages.append((rand.randint(1, 100), kwargs))
+    return messages
+
+
+def send(command, data, tag):
+    """
+    Serialize an AMP call and its answer.
+
+    Returns:
+        (str) data on the wire
+    """
+    box = command.makeArguments({"packed_data": data}, None)
+    box[twisted_amp.COMMAND] = command.commandName
+    box[twisted_amp.ASK] = tag
+    answer = twisted_amp.AmpBox({twisted_amp.ANSWER: tag})
+    return box.serialize() + answer.serialize()
+
+
+def receive(command, wire):
+    """
+    Parse an AMP call and its answer.
+
+    Returns:
+        (object) unpickled data
+    """
+    box, answer = twisted_amp.parseString(wire)
+    return amp.loads(command.parseArguments(box, None)["packed_data"])
+
+
+def run(messages, codec, batch_size=1):
+    """
+    Send messages through AMP boxes.
+
+    Args:
+        messages: (list) a list of (sessid, kwargs)
+        codec: (AmpCodec) the codec to use
+        batch_size: (int) the number of messages sent in one AMP call
+
+    Returns:
+        (dict) results
+    """
+    original = amp._CODEC
+    amp._CODEC = codec
+
+    try:
+        wire_bytes = 0
+        calls = 0
+        begin = time.time()
+        begin_cpu = time.clock()
+
+        for start in xrange(0, len(messages), batch_size):
+            batch = messages[start:start + batch_size]
+            tag = str(calls)
+            if len(batch) == 1:
+                command = MsgServer2Portal
+                data = amp.dumps(batch[0])
+            else:
+                command = MsgServer2PortalBatch
+                data = amp.dumps(batch)
+
+            wire = send(command, data, tag)
+            receive(command, wire)
+            wire_bytes += len(wire)
+            calls += 1
+
+        cost = time.time() - begin
+        cost_cpu = time.clock() - begin_cpu
+    finally:
+        amp._CODEC = original
+
+    number = len(messages)
+    return {"messages_per_second": number / cost if cost > 0 else 0,
+            "cpu_per_message": cost_cpu / number if number else 0,
+            "bytes_per_message": float(wire_bytes) / number if number else 0,
+            "calls": calls}
+
+
+def main(number=20000, seed=0):
+    """
+    Run all mixes with all codecs, with and without batching.
+    """
+    codecs = (("raw", AmpCodec()),
+              ("zlib-1/512", ZlibCodec(1, 512)),
+              ("zlib-6/512", ZlibCodec(6, 512)),
+              ("zlib-9/0", ZlibCodec(9, 0)),
+              ("settings", amp.get_codec()))
+
+    print("%10s %12s %6s %10s %12s %10s %8s" % ("mix", "codec", "batch", "msgs/s",
+                                                "cpu(us)/msg", "bytes/msg", "calls"))
+    for mix_name, mix in MIXES:
+        messages = make_messages(mix, number, seed)
+        for codec_name, codec in codecs:
+            for batch_size in (1, BATCH_SIZE):
+                result = run(messages, codec, batch_size)
+                print("%10s %12s %6d %10.0f %12.1f %10.1f %8d" % (mix_name,
+                                                                  codec_name,
+                                                                  batch_size,
+                                                                  result["messages_per_second"],
+                                                                  result["cpu_per_message"] * 1000000,
+                                                                  result["bytes_per_message"],
+                                                                  result["calls"]))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 0)
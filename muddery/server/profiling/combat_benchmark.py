@@ -0,0 +1,425 @@
+"""
+Combat benchmark
+
+A headless combat simulator. It runs combats of the base, normal and honour
+combat handlers between stand-in characters, without clients or reactor
+timers. Skills are cast by the real skill handler, skill AI and statement
+functions, under a seeded random generator and a fake clock, so every run
+casts the same skills. It reports combats per second, skill casts per second,
+retained objects and database queries per combat.
+
+Use it as the regression benchmark of changes to muddery/combat and
+muddery/statements/skill.py.
+
+Run it in the game folder, the game's settings are needed:
+
+    python -m muddery.server.profiling.combat_benchmark [combats] [seed]
+
+or in `evennia shell`:
+
+    from muddery.server.profiling import combat_benchmark
+    combat_benchmark.main()
+
+Notes:
+    Stand-in characters and combat handlers are not saved to the database,
+    honours are kept by an in-memory mapper. Database queries counted are
+    queries made by the combat code itself.
+
+"""
+
+from __future__ import print_function
+
+if __name__ == "__main__":
+    # Game modules can only be imported after the game is initialized.
+    import django
+    django.setup()
+    import evennia
+    evennia._init()
+
+import gc
+import sys
+import time
+import random
+import itertools
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from muddery.ai import choose_skill
+from muddery.combat import base_combat_handler, combat_scheduler
+from muddery.combat.base_combat_handler import BaseCombatHandler
+from muddery.combat.normal_combat_handler import NormalCombatHandler
+from muddery.combat.honour_combat_handler import HonourCombatHandler
+from muddery.combat.combat_scheduler import CombatScheduler, ScheduledTask
+from muddery.statements import skill as skill_functions
+from muddery.statements.statement_handler import STATEMENT_HANDLER
+from muddery.typeclasses import character_skills
+from muddery.typeclasses.character_skills import MudderySkill
+from muddery.utils import honours_handler, skill_handler
+from muddery.utils.skill_handler import SkillHandler
+
+
+# skills of stand-in characters: (key, function, cd)
+SKILLS = (("skill_attack", "hit(10)", 0),
+          ("skill_heavy_attack", "hit(25)", 5),
+          ("skill_heal", "heal(15)", 8))
+
+
+class FakeClock(object):
+    """
+    A clock that only moves when it is advanced. It replaces the time module
+    in combat modules.
+    """
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class Patches(object):
+    """
+    Replaces module attributes and restores them later.
+    """
+    def __init__(self):
+        # a list of (module, name, original value)
+        self.originals = []
+
+    def set(self, module, name, value):
+        self.originals.append((module, name, getattr(module, name)))
+        setattr(module, name, value)
+
+    def restore(self):
+        while self.originals:
+            module, name, value = self.originals.pop()
+            setattr(module, name, value)
+
+
+class SimScheduler(CombatScheduler):
+    """
+    A combat scheduler which is ticked by the simulator instead of a
+    reactor timer.
+    """
+    def schedule(self, callback, delay, interval=0):
+        scheduled = ScheduledTask(callback, combat_scheduler.time.time() + delay, interval)
+        self.push(scheduled)
+        return scheduled
+
+
+class SimHonoursMapper(object):
+    """
+    Keeps honours in memory instead of the database.
+    """
+    def __init__(self):
+        self.honours = {}
+
+    def get_honour(self, character, default=None):
+        return self.honours.get(character.id, default)
+
+    def set_honours(self, new_honours):
+        self.honours.update(new_honours)
+
+
+class SimStats(object):
+    """
+    Counts what happened in combats.
+    """
+    def __init__(self):
+        self.casts = 0
+        self.messages = 0
+        self.deaths = 0
+
+
+class SimNamespace(object):
+    """
+    Stands in for db and ndb attribute handlers, missing attributes are None.
+    """
+    def __getattr__(self, name):
+        return None
+
+
+class SimCmdSet(object):
+    """
+    Stands in for the cmdset handler.
+    """
+    def add(self, cmdset):
+        pass
+
+    def delete(self, cmdset):
+        pass
+
+
+class SimSkill(object):
+    """
+    A skill which is not saved to the database. It casts with MudderySkill's
+    methods.
+    """
+    cast_skill = MudderySkill.__dict__["cast_skill"]
+    check_available = MudderySkill.__dict__["check_available"]
+    is_available = MudderySkill.__dict__["is_available"]
+    is_cooling_down = MudderySkill.__dict__["is_cooling_down"]
+
+    def __init__(self, owner, key, function, cd):
+        self.key = key
+        self.program = STATEMENT_HANDLER.compile_skill(function)
+        self.cd = cd
+        self.passive = False
+        self.message = "%c casts %n to %t."
+
+        self.db = SimNamespace()
+        self.db.owner = owner
+        self.db.cd_finish_time = 0
+
+    def get_data_key(self):
+        return self.key
+
+    def get_name(self):
+        return self.key
+
+
+class SimCharacter(object):
+    """
+    A character which is not saved to the database.
+    """
+    def __init__(self, character_id, stats, max_hp, has_account, gcd, auto_cast_skill_cd):
+        """
+        Args:
+            character_id: (int) the character's id
+            stats: (SimStats) shared counters
+            max_hp: (number) the character's max hp
+            has_account: (boolean) messages of players are generated
+            gcd: (number) global cd
+            auto_cast_skill_cd: (number) auto cast interval
+        """
+        self.id = character_id
+        self.dbref = "#%d" % character_id
+        self.name = "char%d" % character_id
+        self.stats = stats
+
+        self.account = None
+        self.has_account = has_account
+        self.is_temp = False
+        self.location = None
+        self.cmdset = SimCmdSet()
+        self.max_hp = max_hp
+
+        self.ndb = SimNamespace()
+        self.ndb.combat_handler = None
+
+        self.db = SimNamespace()
+        self.db.hp = max_hp
+        self.db.team = None
+        self.db.skills = dict((key, SimSkill(self, key, function, cd)) for key, function, cd in SKILLS)
+
+        self.skill_handler = SkillHandler(self)
+        self.skill_handler.gcd = gcd
+        self.skill_handler.auto_cast_skill_cd = auto_cast_skill_cd
+
+    def msg(self, text):
+        self.stats.messages += 1
+
+    def get_name(self):
+        return self.name
+
+    def is_typeclass(self, typeclass, exact=False):
+        return False
+
+    def set_team(self, team_id):
+        self.db.team = team_id
+
+    def get_team(self):
+        return self.db.team
+
+    def is_alive(self):
+        return round(self.db.hp) > 0
+
+    def is_in_combat(self):
+        return bool(self.ndb.combat_handler)
+
+    def cast_skill(self, skill_key, target):
+        self.skill_handler.cast_skill(skill_key, target)
+
+    def send_skill_result(self, result):
+        self.stats.casts += 1
+        if result and self.ndb.combat_handler:
+            self.ndb.combat_handler.send_skill_result(result)
+
+    def get_combat_commands(self):
+        return []
+
+    def show_status(self):
+        pass
+
+    def show_rankings(self):
+        pass
+
+    def provide_exp(self, killer):
+        return 10
+
+    def add_exp(self, exp, combat=False):
+        pass
+
+    def die(self, killers):
+        self.stats.deaths += 1
+
+
+class HeadlessCombat(object):
+    """
+    Runs a combat handler without saving it to the database.
+    """
+    # shadows the database field
+    desc = ""
+
+    def __init__(self, *args, **kwargs):
+        super(HeadlessCombat, self).__init__(*args, **kwargs)
+
+        # at_script_creation() saves the script, so set its values here
+        self.characters = {}
+        self.finished = False
+        self.timeout = 0
+        self.timer = None
+
+    def __hash__(self):
+        return id(self)
+
+    def __eq__(self, other):
+        return self is other
+
+    def __ne__(self, other):
+        return self is not other
+
+    def stop(self, kill=False):
+        self.at_stop()
+
+
+def headless(handler_class):
+    """
+    Create a headless class of a combat handler.
+    """
+    return type(handler_class)("Headless" + handler_class.__name__,
+                               (HeadlessCombat, handler_class),
+                               {"__module__": __name__})
+
+
+HANDLERS = (("base", headless(BaseCombatHandler)),
+            ("normal", headless(NormalCombatHandler)),
+            ("honour", headless(HonourCombatHandler)))
+
+
+def simulate(handler_class, combats=1000, seed=0, team_size=1, concurrent=100,
+             max_hp=100, timeout=60, tick_interval=0.1, gcd=1.0, auto_cast_skill_cd=1.5):
+    """
+    Run combats.
+
+    Args:
+        handler_class: (class) headless combat handler's class
+        combats: (int) the number of combats
+        seed: (int) random seed
+        team_size: (int) the number of characters in a team
+        concurrent: (int) the max number of running combats
+        max_hp: (number) characters' max hp
+        timeout: (number) combats' timeout
+        tick_interval: (number) the simulated time of a tick
+        gcd: (number) global cd
+        auto_cast_skill_cd: (number) auto cast interval
+
+    Returns:
+        (dict) results
+    """
+    clock = FakeClock()
+    scheduler = SimScheduler(tick_interval)
+    stats = SimStats()
+    ids = itertools.count(1)
+    characters = []
+
+    patches = Patches()
+    patches.set(combat_scheduler, "time", clock)
+    patches.set(skill_handler, "time", clock)
+    patches.set(character_skills, "time", clock)
+    patches.set(base_combat_handler, "COMBAT_SCHEDULER", scheduler)
+    patches.set(skill_handler, "COMBAT_SCHEDULER", scheduler)
+    patches.set(honours_handler, "HONOURS_MAPPER", SimHonoursMapper())
+    rand = random.Random(seed)
+    patches.set(choose_skill, "random", rand)
+    patches.set(skill_functions, "random", rand)
+
+    try:
+        gc.collect()
+        objects = len(gc.get_objects())
+
+        with CaptureQueriesContext(connection) as queries:
+            begin = time.time()
+
+            started = 0
+            ticks = 0
+            while started < combats or scheduler.combats:
+                while started < combats and len(scheduler.combats) < concurrent:
+                    teams = {}
+                    for team in (1, 2):
+                        teams[team] = [SimCharacter(next(ids), stats, max_hp, team == 1,
+                                                    gcd, auto_cast_skill_cd)
+                                       for i in xrange(team_size)]
+
+                    characters.extend(teams[1])
+                    characters.extend(teams[2])
+
+                    combat = handler_class()
+                    combat.set_combat(teams, "", timeout)
+                    for character in combat.characters.values():
+                        character.skill_handler.start_auto_combat_skill()
+                    started += 1
+
+                clock.advance(tick_interval)
+                scheduler.tick()
+                ticks += 1
+
+            cost = time.time() - begin
+
+        # Clear remained tasks of finished combats, and break reference
+        # cycles of skill handlers, objects with __del__ in cycles can not
+        # be collected.
+        scheduler.heap = []
+        for character in characters:
+            character.skill_handler.stop_auto_combat_skill()
+            character.skill_handler.owner = None
+            character.skill_handler.skills = {}
+            character.skill_handler = None
+        del characters[:]
+        gc.collect()
+        objects = len(gc.get_objects()) - objects
+    finally:
+        patches.restore()
+
+    return {"combats": combats,
+            "combats_per_second": combats / cost if cost > 0 else 0,
+            "casts_per_second": stats.casts / cost if cost > 0 else 0,
+            "casts_per_combat": float(stats.casts) / combats if combats else 0,
+            "messages_per_combat": float(stats.messages) / combats if combats else 0,
+            "objects_per_combat": float(objects) / combats if combats else 0,
+            "queries_per_combat": float(len(queries)) / combats if combats else 0,
+            "deaths": stats.deaths,
+            "ticks": ticks,
+            "simulated_time": clock.now}
+
+
+def main(combats=1000, seed=0):
+    """
+    Run combats of all combat handlers.
+    """
+    print("%8s %10s %10s %12s %10s %10s %10s" % ("handler", "combats/s", "casts/s", "casts/combat",
+                                                 "msgs/cmbt", "objs/cmbt", "sql/cmbt"))
+    for name, handler_class in HANDLERS:
+        result = simulate(handler_class, combats, seed)
+        print("%8s %10.1f %10.1f %12.1f %10.1f %10.1f %10.2f" % (name,
+                                                                 result["combats_per_second"],
+                                                                 result["casts_per_second"],
+                                                                 result["casts_per_combat"],
+                                                                 result["messages_per_combat"],
+                                                                 result["objects_per_combat"],
+                                                                 result["queries_per_combat"]))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 0)
@@ -0,0 +1,290 @@
+"""
+Muddery dummyrunner settings
+
+Settings and actions for the dummyrunner to test a Muddery game. Dummy
+clients connect through the webclient's websocket and send the webclient's
+JSON commands. They log in, create and puppet characters, then play the game
+by looking around, walking, talking to NPCs, fighting and looting.
+
+Responses of the server are parsed in RECEIVE, so clients only use objects,
+dialogues and skills they have seen.
+
+Run it in the game folder, after adding this at the end of the game's
+settings file (see evennia/server/profiling/dummyrunner.py):
+
+    from evennia.server.profiling.settings_mixin import *
+
+then start the server and launch the dummyrunner:
+
+    muddery --dummyrunner <number of clients>
+
+Latency percentiles of every command and the server's tick lag are printed
+when the dummyrunner stops.
+
+"""
+
+import json
+import random
+
+
+# Dummy runner settings
+
+# Time between each dummyrunner "tick", in seconds.
+TIMESTEP = 2
+
+# Chance of a dummy actually performing an action on a given tick.
+CHANCE_OF_ACTION = 0.5
+
+# Chance of a currently unlogged-in dummy performing its login
+# action every tick.
+CHANCE_OF_LOGIN = 1.0
+
+# Which telnet port to connect to. Not used by websocket clients.
+TELNET_PORT = None
+
+# Muddery clients use the webclient's websocket.
+PROTOCOL = "websocket"
+
+# Which websocket port to connect to. If set to None, uses the
+# webclient's websocket port of the running server.
+WEBSOCKET_PORT = None
+
+# Time between each tick lag probe of a client, in seconds.
+TICK_PROBE_INTERVAL = 10
+
+
+# templates
+
+DUMMY_NAME = "Dummy-%s"
+DUMMY_PWD = "password-%s"
+CHARACTER_NAME = "Dummy%s"
+
+
+class ClientState(object):
+    """
+    Things a client has seen.
+    """
+    def __init__(self):
+        # player character's dbref
+        self.character = None
+
+        # playable characters' dbrefs
+        self.characters = []
+
+        # dbrefs of the objects in the current location
+        self.exits = []
+        self.npcs = []
+        self.things = []
+
+        # current dialogue sentence's args
+        self.sentence = None
+
+        # combat's status
+        self.in_combat = False
+        self.skills = []
+        self.enemies = []
+
+
+def get_state(client):
+    """
+    Get a client's state.
+    """
+    if not hasattr(client, "state"):
+        client.state = ClientState()
+    return client.state
+
+
+def command(cmd, args=""):
+    """
+    Make a command string.
+    """
+    return json.dumps({"cmd": cmd, "args": args})
+
+
+def RECEIVE(client, cmdname, args, kwargs):
+    """
+    Parse messages from the server.
+
+    Args:
+        client: (DummyWebsocketClient) the client
+        cmdname: (string) the message's name
+        args: (list) the message's args
+        kwargs: (dict) the message's options
+
+    Returns:
+        (list) commands to send at once
+    """
+    if cmdname != "text":
+        return
+
+    state = get_state(client)
+    replies = []
+
+    for text in args:
+        try:
+            message = json.loads(text)
+        except (TypeError, ValueError):
+            continue
+        if not isinstance(message, dict):
+            continue
+
+        if "char_all" in message:
+            state.characters = [char["dbref"] for char in message["char_all"]]
+
+        if "puppet" in message:
+            state.character = message["puppet"]["dbref"]
+
+        if "look_around" in message:
+            appearance = message["look_around"]
+            state.exits = [obj["dbref"] for obj in appearance.get("exits", [])]
+            state.npcs = [obj["dbref"] for obj in appearance.get("npcs", [])]
+            state.things = [obj["dbref"] for obj in appearance.get("things", [])]
+
+        if "dialogues_list" in message:
+            sentences = message["dialogues_list"]
+            if sentences:
+                sentence = sentences[0]
+                state.sentence = {"npc": sentence.get("npc", ""),
+                                  "dialogue": sentence["dialogue"],
+                                  "sentence": sentence["sentence"]}
+            else:
+                state.sentence = None
+
+        if "joined_combat" in message:
+            state.in_combat = True
+
+        if "combat_info" in message:
+            characters = message["combat_info"]["characters"]
+            team = None
+            for character in characters:
+                if character["dbref"] == state.character:
+                    team = character["team"]
+            state.enemies = [character["dbref"] for character in characters
+                             if character["team"] != team]
+
+        if "combat_commands" in message:
+            state.skills = [skill["key"] for skill in message["combat_commands"]]
+
+        if "left_combat" in message:
+            state.in_combat = False
+            state.enemies = []
+
+        if "prepare_match" in message:
+            # accept the honour combat
+            replies.append(command("confirm_combat"))
+
+    return replies
+
+
+# action function definitions
+
+# login/logout
+
+def c_login(client):
+    "creates an account and a character, then puppets the character"
+    playername = DUMMY_NAME % client.gid
+    password = DUMMY_PWD % client.gid
+
+    def puppet(client):
+        "puppets the first character after it has been created"
+        state = get_state(client)
+        if not state.characters:
+            return None
+        return command("puppet", state.characters[0])
+
+    cmds = (command("create", {"playername": playername,
+                               "password": password,
+                               "connect": True}),
+            command("char_create", {"name": CHARACTER_NAME % client.gid}),
+            puppet)
+    return cmds
+
+
+def c_logout(client):
+    "logouts of the game"
+    return command("quit")
+
+
+# random commands
+
+def c_looks(client):
+    "looks at the location or an object"
+    state = get_state(client)
+    objects = state.exits + state.npcs + state.things
+    if not objects:
+        return command("look")
+    return command("look", random.choice(objects))
+
+
+def c_moves(client):
+    "moves through an exit"
+    state = get_state(client)
+    if state.in_combat or not state.exits:
+        return c_looks(client)
+    return command("goto", random.choice(state.exits))
+
+
+def c_talks(client):
+    "talks to an NPC"
+    state = get_state(client)
+    if state.in_combat or not state.npcs:
+        return c_looks(client)
+    return command("talk", random.choice(state.npcs))
+
+
+def c_dialogues(client):
+    "continues the current dialogue"
+    state = get_state(client)
+    if state.in_combat or not state.sentence:
+        return c_talks(client)
+    return command("dialogue", state.sentence)
+
+
+def c_attacks(client):
+    "attacks an NPC"
+    state = get_state(client)
+    if state.in_combat or not state.npcs:
+        return c_looks(client)
+    return command("attack", random.choice(state.npcs))
+
+
+def c_casts_skill(client):
+    "casts a skill in combat"
+    state = get_state(client)
+    if not state.in_combat or not state.skills or not state.enemies:
+        return c_attacks(client)
+    return command("castskill", {"skill": random.choice(state.skills),
+                                 "target": random.choice(state.enemies),
+                                 "combat": True})
+
+
+def c_queues_up(client):
+    "queues up for an honour combat"
+    state = get_state(client)
+    if state.in_combat:
+        return c_casts_skill(client)
+    return command("queue_up_combat")
+
+
+def c_loots(client):
+    "loots an object"
+    state = get_state(client)
+    if state.in_combat or not state.things:
+        return c_looks(client)
+    return command("loot", random.choice(state.things))
+
+
+# Action tuple (required)
+#
+# (login function, logout function, (probability, action function), ...)
+
+ACTIONS = (c_login,
+           c_logout,
+           (0.2, c_looks),
+           (0.15, c_moves),
+           (0.1, c_talks),
+           (0.15, c_dialogues),
+           (0.1, c_attacks),
+           (0.2, c_casts_skill),
+           (0.02, c_queues_up),
+           (0.08, c_loots))
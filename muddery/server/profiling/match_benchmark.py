@@ -0,0 +1,92 @@
+"""
+Matchmaking simulation
+
+A deterministic simulation of the honour matchmaker. It reports the match
+rate, the average waiting time and the honour spread of matched pairs.
+
+Run it with:
+
+    python -m muddery.server.profiling.match_benchmark [seed]
+
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+import random
+from muddery.utils.matchmaker import Matchmaker
+
+
+def simulate(players, seed=0, join_period=60, duration=300, interval=10):
+    """
+    Simulate a queue.
+
+    Args:
+        players: (int) the number of queued players
+        seed: (int) random seed
+        join_period: (number) players join the queue in this period
+        duration: (number) simulated time
+        interval: (number) match interval
+
+    Returns:
+        (dict) results
+    """
+    rand = random.Random(seed)
+    honours = dict((i, max(0, int(rand.gauss(1000, 200)))) for i in xrange(players))
+    joins = sorted((rand.uniform(0, join_period), i) for i in xrange(players))
+    join_times = dict((player, join_time) for join_time, player in joins)
+
+    matchmaker = Matchmaker()
+    waits = []
+    spreads = []
+    match_cost = 0.0
+    ticks = 0
+
+    next_join = 0
+    tick_time = interval
+    while tick_time <= duration:
+        while next_join < len(joins) and joins[next_join][0] <= tick_time:
+            join_time, player = joins[next_join]
+            matchmaker.add(player, honours[player], join_time)
+            next_join += 1
+
+        begin = time.time()
+        pairs = matchmaker.match(tick_time)
+        match_cost += time.time() - begin
+        ticks += 1
+
+        for player_a, player_b in pairs:
+            spreads.append(abs(honours[player_a] - honours[player_b]))
+            waits.append(tick_time - join_times[player_a])
+            waits.append(tick_time - join_times[player_b])
+
+        tick_time += interval
+
+    matched = len(waits)
+    return {"players": players,
+            "match_rate": float(matched) / players if players else 0,
+            "average_wait": sum(waits) / matched if matched else 0,
+            "average_spread": float(sum(spreads)) / len(spreads) if spreads else 0,
+            "max_spread": max(spreads) if spreads else 0,
+            "ms_per_tick": match_cost * 1000 / ticks if ticks else 0}
+
+
+def main(seed=0):
+    """
+    Run the simulation with 100, 1k and 10k players.
+    """
+    print("%8s %10s %10s %12s %10s %12s" % ("players", "match rate", "avg wait",
+                                           "avg spread", "max spread", "ms per tick"))
+    for players in (100, 1000, 10000):
+        result = simulate(players, seed)
+        print("%8d %9.1f%% %9.1fs %12.1f %10d %12.2f" % (result["players"],
+                                                        result["match_rate"] * 100,
+                                                        result["average_wait"],
+                                                        result["average_spread"],
+                                                        result["max_spread"],
+                                                        result["ms_per_tick"]))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 0)
@@ -0,0 +1,115 @@
+"""
+Honour rankings benchmark
+
+Compares the incremental honour rankings with sorting all characters after
+every update, which is how rankings were calculated before. It also checks
+that both give the same rankings.
+
+Run it with:
+
+    python -m muddery.server.profiling.rankings_benchmark [characters] [updates]
+
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+import random
+from muddery.utils.honour_rankings import HonourRankings
+
+
+class SortedRankings(object):
+    """
+    Sorts all characters after every update.
+    """
+    def __init__(self, honours):
+        self.honours = dict((key, {"honour": value, "place": 0, "ranking": 0})
+                            for key, value in honours.iteritems())
+        self.rankings = []
+        self.make_rankings()
+
+    def make_rankings(self):
+        rankings = sorted(self.honours.items(), lambda x, y: cmp(x[1]["honour"], y[1]["honour"]), reverse=True)
+        self.rankings = [item[0] for item in rankings if item[1]["honour"] >= 0]
+
+        if not self.rankings:
+            return
+
+        last = self.rankings[0]
+        for i, key in enumerate(self.rankings):
+            self.honours[key]["place"] = i
+            self.honours[key]["ranking"] = i + 1
+            if self.honours[key]["honour"] == self.honours[last]["honour"]:
+                self.honours[key]["ranking"] = self.honours[last]["ranking"]
+            last = key
+
+    def set(self, character_id, honour):
+        self.honours[character_id]["honour"] = honour
+        self.make_rankings()
+
+
+def check(rankings, sorted_rankings):
+    """
+    Check if both rankings are the same.
+    """
+    for character_id, info in sorted_rankings.honours.iteritems():
+        if info["honour"] < 0:
+            continue
+        if rankings.get_ranking(character_id) != info["ranking"]:
+            return False
+    return True
+
+
+def run(characters, updates, seed=0):
+    """
+    Run the benchmark.
+
+    Args:
+        characters: (int) the number of characters
+        updates: (int) the number of honour updates
+        seed: (int) random seed
+
+    Returns:
+        (dict) ms per update of both implementations
+    """
+    rand = random.Random(seed)
+    honours = dict((i, max(0, int(rand.gauss(1000, 200)))) for i in xrange(characters))
+    changes = [(rand.randrange(characters), max(0, int(rand.gauss(1000, 200)))) for i in xrange(updates)]
+
+    rankings = HonourRankings()
+    rankings.load(honours)
+    sorted_rankings = SortedRankings(honours)
+
+    begin = time.time()
+    for character_id, honour in changes:
+        rankings.set(character_id, honour)
+        rankings.get_top(10)
+        rankings.get_around(character_id, 10)
+    incremental_cost = time.time() - begin
+
+    begin = time.time()
+    for character_id, honour in changes:
+        sorted_rankings.set(character_id, honour)
+    sorting_cost = time.time() - begin
+
+    return {"characters": characters,
+            "incremental": incremental_cost * 1000 / updates,
+            "sorting": sorting_cost * 1000 / updates,
+            "same": check(rankings, sorted_rankings)}
+
+
+def main(characters=100000, updates=20):
+    """
+    Print the results.
+    """
+    result = run(characters, updates)
+    print("%10s %18s %18s %6s" % ("characters", "incremental (ms)", "sorting (ms)", "same"))
+    print("%10d %18.3f %18.3f %6s" % (result["characters"],
+                                      result["incremental"],
+                                      result["sorting"],
+                                      result["same"]))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -127,6 +127,10 @@ INPUT_FUNC_MODULES = ["evennia.server.inputfuncs", "muddery.server.conf.inputfun
 # Modules that contain prototypes for use with the spawner mechanism.
 PROTOTYPE_MODULES = ["muddery.world.prototypes"]
 
+# Settings and actions of the dummyrunner, dummy clients play Muddery
+# through the webclient's websocket.
+DUMMYRUNNER_SETTINGS_MODULE = "muddery.server.profiling.dummyrunner_settings"
+
 
 ######################################################################
 # Inlinefunc
@@ -305,6 +309,14 @@ CONDITION_FUNC_SET = "muddery.statements.default_statement_func_set.ConditionFun
 # Skill functions set
 SKILL_FUNC_SET = "muddery.statements.default_statement_func_set.SkillFuncSet"
 
+# Max number of compiled statements of each kind (actions, skills and
+# conditions) kept in memory
+STATEMENT_CACHE_SIZE = 4096
+
+# Record call counts and time costs of statement functions and conditions.
+# It can also be switched by the builder command "statement_profile".
+STATEMENT_PROFILING = False
+
 
 ######################################################################
 # Default command sets
@@ -333,6 +345,10 @@ CMDSET_COMBAT = "muddery.commands.default_cmdsets.CombatCmdSet"
 # attribute's category for data info
 DATA_KEY_CATEGORY = "data_key"
 
+# Compare every data key search with the database and log differences. It is
+# only for debugging the data key index.
+DATA_KEY_INDEX_CHECK = False
+
 # data app name
 WORLD_DATA_APP = "worlddata"
 
@@ -363,6 +379,27 @@ LOCALIZED_STRINGS_FOLDER = "languages"
 # World data sets
 DATA_SETS = "muddery.worlddata.data_sets.DataSets"
 
+# Load all dialogues when the server starts. If it is False, dialogues will be
+# loaded when they are used.
+PRELOAD_DIALOGUES = False
+
+# The number of objects written in one transaction when building the world.
+BUILDER_BATCH_SIZE = 200
+
+# The number of rows validated and written together when importing data.
+IMPORT_CHUNK_SIZE = 200
+
+# The number of threads exporting data tables.
+EXPORT_THREADS = 4
+
+# Merge dict messages sent to a session in one reactor turn into one frame.
+MSG_COALESCING = False
+
+# Message types that show the whole state of something. When merging
+# messages, only the last one of each type is sent.
+MSG_COALESCE_REPLACE_KEYS = ("status", "inventory", "equipments", "skills", "quests",
+                             "combat_commands", "rankings", "look_around", "current_location")
+
 
 ###################################
 # world editor
@@ -382,12 +419,24 @@ HONOUR_COMBAT_HANDLER = "muddery.combat.honour_combat_handler.HonourCombatHandle
 
 AUTO_COMBAT_TIMEOUT = 20
 
+# Seed of the loot random generator, set it to get the same drops in tests.
+# None means seeding from the system.
+LOOT_RANDOM_SEED = None
+
+# All combats' auto cast skills and timeouts are checked in ticks of this
+# interval in seconds.
+COMBAT_TICK_INTERVAL = 0.1
+
 
 ###################################
 # honour settings
 ###################################
 MIN_HONOUR_LEVEL = 2
 
+# Honour changes are written to the database in batches every this many
+# seconds, and when the server stops. Set it to 0 to write changes at once.
+HONOURS_FLUSH_INTERVAL = 10
+
 TOP_RANKINGS_NUMBER = 10
 
 NEAREST_RANKINGS_NUMBER = 10
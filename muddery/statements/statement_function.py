@@ -21,6 +21,11 @@ class StatementFunction(object):
     # only const functions can be used in conditions.
     const = False
 
+    # If the function's result may change while the caller's status does not
+    # change, such as random functions, volatile is True. Results of volatile
+    # functions can not be cached.
+    volatile = False
+
     def __init__(self):
         """
         Init default attributes.
@@ -4,10 +4,13 @@ This model handle statements.
 
 import re
 import ast
+import time
 import traceback
+from collections import OrderedDict
 from evennia.utils import logger
 from evennia.utils.utils import class_from_module
 from django.conf import settings
+from muddery.statements.statement_profiler import STATEMENT_PROFILER
 
 
 #re_words = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)|("(.*)")')
@@ -66,21 +69,17 @@ def get_condition_func(func_set, caller, obj, **kwargs):
     return function
 
 
-def exec_function(func_set, func_word, caller, obj, **kwargs):
+def parse_function(func_set, func_word):
     """
-    Do function.
+    Separate a function string into the function's class and args.
 
     Args:
         func_set: (object) function set
         func_word: (string) function string, such as: func("value")
-        caller: (object) statement's caller
-        obj: (object) caller's target
 
     Returns:
-        function result
+        (tuple) function's key, function's class and function's args
     """
-
-    # separate function's key and args
     try:
         pos = func_word.index("(")
         func_key = func_word[:pos]
@@ -92,13 +91,297 @@ def exec_function(func_set, func_word, caller, obj, **kwargs):
         func_args = ()
 
     func_class = func_set.get_func_class(func_key)
+    return func_key, func_class, func_args
+
+
+def exec_function(func_set, func_word, caller, obj, **kwargs):
+    """
+    Do function.
+
+    Args:
+        func_set: (object) function set
+        func_word: (string) function string, such as: func("value")
+        caller: (object) statement's caller
+        obj: (object) caller's target
+
+    Returns:
+        function result
+    """
+    # separate function's key and args
+    func_key, func_class, func_args = parse_function(func_set, func_word)
     if not func_class:
         logger.log_errmsg("Statement error: Can not find function: %s of %s." % (func_key, func_word))
         return
 
     func_obj = func_class()
     func_obj.set(caller, obj, func_args, **kwargs)
-    return func_obj.func()
+    if not STATEMENT_PROFILER.enabled:
+        return func_obj.func()
+
+    begin = time.time()
+    try:
+        return func_obj.func()
+    finally:
+        STATEMENT_PROFILER.add_function(func_class.key, time.time() - begin)
+
+
+class CompiledCondition(object):
+    """
+    A condition expression which has been parsed only once.
+
+    Every function in the expression is resolved to its class and its
+    literal args, the rest of the expression is compiled to a python
+    function which takes functions' results as args. So checking the
+    condition is just calling functions and the compiled expression.
+    """
+    __slots__ = ("source", "functions", "expression", "volatile")
+
+    def __init__(self, func_set, condition):
+        """
+        Compile the condition.
+
+        Args:
+            func_set: (object) condition function set
+            condition: (string) condition statement
+        """
+        self.source = condition
+
+        # a list of (function's word, function's class, function's args, default result)
+        self.functions = []
+
+        def replace(word):
+            func_word = word.group()
+            func_class = None
+            func_args = ()
+            default = False
+
+            try:
+                func_key, func_class, func_args = parse_function(func_set, func_word)
+                if not func_class:
+                    logger.log_errmsg("Statement error: Can not find function: %s of %s." % (func_key, func_word))
+            except Exception, e:
+                logger.log_errmsg("Exec function error: %s %s" % (func_word, e))
+                default = None
+
+            name = "_func%d" % len(self.functions)
+            self.functions.append((func_word, func_class, func_args, default))
+            return name
+
+        expression = re_function.sub(replace, condition)
+
+        # If the condition's result may change while the caller's status
+        # does not change.
+        self.volatile = any(func_class.volatile for func_word, func_class, func_args, default
+                            in self.functions if func_class)
+
+        names = ", ".join(["_func%d" % i for i in range(len(self.functions))])
+
+        try:
+            code = compile("lambda %s: (%s)" % (names, expression), "<condition>", "eval")
+            self.expression = eval(code, {})
+        except Exception, e:
+            logger.log_errmsg("Compile condition error: %s %s" % (condition, e))
+            self.expression = None
+
+    def __call__(self, caller, obj, **kwargs):
+        """
+        Check the condition.
+
+        Args:
+            caller: (object) statement's caller
+            obj: (object) caller's current target
+
+        Returns:
+            (boolean) the result of the condition
+        """
+        if self.expression is None:
+            return False
+
+        if STATEMENT_PROFILER.enabled:
+            return self.profile(caller, obj, **kwargs)
+
+        values = []
+        for func_word, func_class, func_args, default in self.functions:
+            if not func_class:
+                values.append(default)
+                continue
+
+            try:
+                func_obj = func_class()
+                func_obj.set(caller, obj, func_args, **kwargs)
+                values.append(bool(func_obj.func()))
+            except Exception, e:
+                logger.log_errmsg("Exec function error: %s %s" % (func_word, e))
+                values.append(None)
+
+        try:
+            return self.expression(*values)
+        except Exception, e:
+            logger.log_tracemsg("Exec condition error:%s %s" % (self.source, e))
+            return False
+
+    def profile(self, caller, obj, **kwargs):
+        """
+        Check the condition and record the cost of the condition and its
+        functions.
+
+        Args:
+            caller: (object) statement's caller
+            obj: (object) caller's current target
+
+        Returns:
+            (boolean) the result of the condition
+        """
+        begin = time.time()
+
+        values = []
+        for func_word, func_class, func_args, default in self.functions:
+            if not func_class:
+                values.append(default)
+                continue
+
+            func_begin = time.time()
+            try:
+                func_obj = func_class()
+                func_obj.set(caller, obj, func_args, **kwargs)
+                values.append(bool(func_obj.func()))
+            except Exception, e:
+                logger.log_errmsg("Exec function error: %s %s" % (func_word, e))
+                values.append(None)
+            STATEMENT_PROFILER.add_function(func_class.key, time.time() - func_begin)
+
+        try:
+            return self.expression(*values)
+        except Exception, e:
+            logger.log_tracemsg("Exec condition error:%s %s" % (self.source, e))
+            return False
+        finally:
+            STATEMENT_PROFILER.add_condition(self.source, time.time() - begin)
+
+
+class StatementProgram(object):
+    """
+    A statement of functions separated by ";" which has been parsed only once.
+    It holds functions' classes and args and can be executed directly.
+    """
+    __slots__ = ("source", "functions")
+
+    def __init__(self, func_set, statement):
+        """
+        Parse the statement.
+
+        Args:
+            func_set: (object) function set
+            statement: (string) statements separated by ";"
+        """
+        self.source = statement
+
+        # a list of (function's word, function's class, function's args)
+        self.functions = []
+
+        if not statement:
+            return
+
+        for func_word in statement.split(";"):
+            try:
+                func_key, func_class, func_args = parse_function(func_set, func_word)
+            except Exception, e:
+                logger.log_errmsg("Exec function error: %s %s" % (func_word, e))
+                continue
+
+            if not func_class:
+                logger.log_errmsg("Statement error: Can not find function: %s of %s." % (func_key, func_word))
+                continue
+
+            self.functions.append((func_word, func_class, func_args))
+
+    def __call__(self, caller, obj, **kwargs):
+        """
+        Execute all functions.
+
+        Args:
+            caller: (object) statement's caller
+            obj: (object) caller's current target
+
+        Returns:
+            None
+        """
+        if STATEMENT_PROFILER.enabled:
+            return self.profile(caller, obj, **kwargs)
+
+        for func_word, func_class, func_args in self.functions:
+            try:
+                func_obj = func_class()
+                func_obj.set(caller, obj, func_args, **kwargs)
+                func_obj.func()
+            except Exception, e:
+                logger.log_errmsg("Exec function error: %s %s" % (func_word, e))
+
+    def profile(self, caller, obj, **kwargs):
+        """
+        Execute all functions and record their costs.
+
+        Args:
+            caller: (object) statement's caller
+            obj: (object) caller's current target
+
+        Returns:
+            None
+        """
+        for func_word, func_class, func_args in self.functions:
+            begin = time.time()
+            try:
+                func_obj = func_class()
+                func_obj.set(caller, obj, func_args, **kwargs)
+                func_obj.func()
+            except Exception, e:
+                logger.log_errmsg("Exec function error: %s %s" % (func_word, e))
+            STATEMENT_PROFILER.add_function(func_class.key, time.time() - begin)
+
+
+class StatementCache(object):
+    """
+    Keeps compiled statements by their source strings. The least recently
+    used statements are discarded when the cache is full.
+    """
+    def __init__(self, compiler, func_set, max_size):
+        """
+        Args:
+            compiler: (class) compiled statement's class
+            func_set: (object) function set
+            max_size: (int) max number of compiled statements
+        """
+        self.compiler = compiler
+        self.func_set = func_set
+        self.max_size = max_size
+        self.cache = OrderedDict()
+
+    def get(self, statement):
+        """
+        Get a compiled statement, compile it if it is not in the cache.
+
+        Args:
+            statement: (string) statement's source
+
+        Returns:
+            compiled statement
+        """
+        try:
+            compiled = self.cache.pop(statement)
+        except KeyError:
+            compiled = self.compiler(self.func_set, statement)
+            if len(self.cache) >= self.max_size:
+                # remove the least recently used one
+                self.cache.popitem(last=False)
+
+        self.cache[statement] = compiled
+        return compiled
+
+    def clear(self):
+        """
+        Remove all compiled statements.
+        """
+        self.cache.clear()
 
 
 class StatementHandler(object):
@@ -119,6 +402,57 @@ class StatementHandler(object):
         skill_func_set_class = class_from_module(settings.SKILL_FUNC_SET)
         self.skill_func_set = skill_func_set_class()
 
+        # compiled statements
+        self.action_cache = StatementCache(StatementProgram,
+                                           self.action_func_set,
+                                           settings.STATEMENT_CACHE_SIZE)
+        self.skill_cache = StatementCache(StatementProgram,
+                                          self.skill_func_set,
+                                          settings.STATEMENT_CACHE_SIZE)
+        self.condition_cache = StatementCache(CompiledCondition,
+                                              self.condition_func_set,
+                                              settings.STATEMENT_CACHE_SIZE)
+
+        # The number of volatile conditions have been checked. If it does not
+        # change during a calculation, the result of the calculation can be cached.
+        self.volatile_count = 0
+
+    def compile_action(self, action):
+        """
+        Get an action's program.
+
+        Args:
+            action: (string) statements separated by ";"
+
+        Returns:
+            (StatementProgram) the compiled action
+        """
+        return self.action_cache.get(action)
+
+    def compile_skill(self, skill):
+        """
+        Get a skill's program.
+
+        Args:
+            skill: (string) statements separated by ";"
+
+        Returns:
+            (StatementProgram) the compiled skill
+        """
+        return self.skill_cache.get(skill)
+
+    def compile_condition(self, condition):
+        """
+        Get a compiled condition.
+
+        Args:
+            condition: (string) a condition expression
+
+        Returns:
+            (CompiledCondition) the compiled condition
+        """
+        return self.condition_cache.get(condition)
+
     def do_action(self, action, caller, obj, **kwargs):
         """
         Do a function.
@@ -135,21 +469,16 @@ class StatementHandler(object):
             return
 
         # execute the statement
-        functions = action.split(";")
-        for function in functions:
-            try:
-                exec_function(self.action_func_set, function, caller, obj, **kwargs)
-            except Exception, e:
-                logger.log_errmsg("Exec function error: %s %s" % (function, e))
-
-        return
+        program = self.action_cache.get(action)
+        program(caller, obj, **kwargs)
 
     def do_skill(self, action, caller, obj, **kwargs):
         """
         Do a function.
 
         Args:
-            action: (string) statements separated by ";"
+            action: (string or StatementProgram) statements separated by ";"
+                    or a compiled skill
             caller: (object) statement's caller
             obj: (object) caller's current target
 
@@ -160,14 +489,28 @@ class StatementHandler(object):
             return
 
         # execute the statement
-        functions = action.split(";")
-        for function in functions:
-            try:
-                exec_function(self.skill_func_set, function, caller, obj, **kwargs)
-            except Exception, e:
-                logger.log_errmsg("Exec function error: %s %s" % (function, e))
+        if isinstance(action, StatementProgram):
+            program = action
+        else:
+            program = self.skill_cache.get(action)
+        program(caller, obj, **kwargs)
 
-        return
+    def do_programs(self, programs):
+        """
+        Execute a batch of compiled statements in one pass, such as all skills
+        casted in a combat round.
+
+        Args:
+            programs: (list) a list of (program, caller, obj, kwargs),
+                      program is a StatementProgram, kwargs is a dict of
+                      the program's kwargs.
+
+        Returns:
+            None
+        """
+        for program, caller, obj, kwargs in programs:
+            if program:
+                program(caller, obj, **kwargs)
 
     def match_condition(self, condition, caller, obj, **kwargs):
         """
@@ -184,17 +527,25 @@ class StatementHandler(object):
         if not condition:
             return True
 
-        # calculate functions first
-        exec_string = exec_condition(self.condition_func_set, condition, caller, obj, **kwargs)
+        # get the compiled condition and check it
+        compiled = self.condition_cache.get(condition)
+        return self.check_compiled(compiled, caller, obj, **kwargs)
 
-        try:
-            # do condition
-            result = eval(exec_string)
-        except Exception, e:
-            logger.log_tracemsg("Exec condition error:%s %s" % (condition, e))
-            return False
+    def check_compiled(self, compiled, caller, obj, **kwargs):
+        """
+        Check a compiled condition.
+
+        Args:
+            compiled: (CompiledCondition) the compiled condition
+            caller: (object) statement's caller
+            obj: (object) caller's current target
 
-        return result
+        Returns:
+            (boolean) the result of the condition
+        """
+        if compiled.volatile:
+            self.volatile_count += 1
+        return compiled(caller, obj, **kwargs)
 
 
 STATEMENT_HANDLER = StatementHandler()
@@ -0,0 +1,121 @@
+"""
+Statement profiler records the cost of statement functions and conditions.
+
+It is disabled by default, then statements only check its enabled flag
+once per call. Enable it by settings.STATEMENT_PROFILING or at runtime.
+"""
+
+from __future__ import print_function
+
+import time
+from django.conf import settings
+
+
+class StatementProfiler(object):
+    """
+    Keeps call counts, total and max time of every function key and every
+    condition string.
+    """
+    def __init__(self, enabled=None):
+        """
+        Args:
+            enabled: (boolean) record costs or not
+        """
+        if enabled is None:
+            enabled = settings.STATEMENT_PROFILING
+        self.enabled = enabled
+
+        # function's key: [call count, total time, max time]
+        self.functions = {}
+
+        # condition string: [call count, total time, max time]
+        self.conditions = {}
+
+        self.start_time = time.time()
+
+    def enable(self):
+        """
+        Start recording.
+        """
+        self.enabled = True
+
+    def disable(self):
+        """
+        Stop recording. Recorded data is kept.
+        """
+        self.enabled = False
+
+    def reset(self):
+        """
+        Clear recorded data.
+        """
+        self.functions = {}
+        self.conditions = {}
+        self.start_time = time.time()
+
+    def add(self, records, key, cost):
+        """
+        Record a call.
+
+        Args:
+            records: (dict) the records to add to
+            key: (string) function's key or condition string
+            cost: (float) time cost in seconds
+        """
+        record = records.get(key)
+        if record is None:
+            records[key] = [1, cost, cost]
+        else:
+            record[0] += 1
+            record[1] += cost
+            if cost > record[2]:
+                record[2] = cost
+
+    def add_function(self, key, cost):
+        """
+        Record a function call.
+        """
+        self.add(self.functions, key, cost)
+
+    def add_condition(self, condition, cost):
+        """
+        Record a condition check.
+        """
+        self.add(self.conditions, condition, cost)
+
+    def get_report(self, records, top=None):
+        """
+        Get records in the order of total time.
+
+        Returns:
+            (list) a list of dicts
+        """
+        report = [{"key": key,
+                   "count": count,
+                   "total": total,
+                   "max": max_cost,
+                   "average": total / count}
+                  for key, (count, total, max_cost) in records.iteritems()]
+        report.sort(key=lambda item: item["total"], reverse=True)
+        if top:
+            report = report[:top]
+        return report
+
+    def get_stats(self, top=None):
+        """
+        Get recorded data.
+
+        Args:
+            top: (int) only get this number of the most costly items
+
+        Returns:
+            (dict) recorded data, time is in seconds
+        """
+        return {"enabled": self.enabled,
+                "duration": time.time() - self.start_time,
+                "functions": self.get_report(self.functions, top),
+                "conditions": self.get_report(self.conditions, top)}
+
+
+# main statement profiler
+STATEMENT_PROFILER = StatementProfiler()
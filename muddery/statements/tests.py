@@ -0,0 +1,164 @@
+"""
+Tests of statements.
+"""
+
+from django.test import TestCase
+from muddery.statements.statement_function import StatementFunction
+from muddery.statements.statement_func_set import BaseStatementFuncSet
+from muddery.statements.statement_handler import StatementHandler, StatementCache, CompiledCondition, exec_condition
+from muddery.statements.statement_profiler import STATEMENT_PROFILER
+
+
+class FuncEcho(StatementFunction):
+    """
+    Returns its first arg.
+    """
+    key = "echo"
+    const = True
+
+    def func(self):
+        return self.args[0] if self.args else None
+
+
+class FuncBoom(StatementFunction):
+    """
+    Raises an error.
+    """
+    key = "boom"
+    const = True
+
+    def func(self):
+        raise ValueError("boom")
+
+
+class FuncIsCaller(StatementFunction):
+    """
+    Checks the caller.
+    """
+    key = "is_caller"
+    const = True
+
+    def func(self):
+        return self.caller == self.args[0]
+
+
+class TestFuncSet(BaseStatementFuncSet):
+    def at_creation(self):
+        self.add(FuncEcho)
+        self.add(FuncBoom)
+        self.add(FuncIsCaller)
+
+
+def baseline_match(func_set, condition, caller, obj):
+    """
+    Check a condition as the handler did before conditions were compiled.
+    """
+    if not condition:
+        return True
+
+    exec_string = exec_condition(func_set, condition, caller, obj)
+    try:
+        return eval(exec_string)
+    except Exception:
+        return False
+
+
+class TestMatchCondition(TestCase):
+    """
+    Compiled conditions give the same results as evaluated conditions.
+    """
+    conditions = (
+        ("", True),
+        ("echo(1)", True),
+        ("echo(0)", False),
+        ("nofunc(1)", False),
+        ("boom()", None),
+        ("echo(1) and", False),
+        ("echo(1) echo(1)", False),
+        ("echo(1) and echo(0)", False),
+        ("echo(1) or echo(0)", True),
+        ("not echo(0)", True),
+        ("not echo(1) or (echo(1) and not echo(0))", True),
+        ("(echo(0) or echo(1)) and echo(\"\")", False),
+        ("echo(\"(\")", True),
+        ("echo(\"a(b\") and not echo(\"\")", True),
+        ("echo(1, 2)", True),
+        ("boom() or echo(1)", True),
+        ("is_caller(\"me\")", True),
+        ("is_caller(\"you\")", False),
+    )
+
+    def setUp(self):
+        self.handler = StatementHandler()
+        self.func_set = TestFuncSet()
+        self.handler.condition_func_set = self.func_set
+        self.handler.condition_cache = StatementCache(CompiledCondition, self.func_set, 100)
+
+    def tearDown(self):
+        STATEMENT_PROFILER.disable()
+        STATEMENT_PROFILER.reset()
+
+    def test_results(self):
+        for condition, result in self.conditions:
+            self.assertEqual(self.handler.match_condition(condition, "me", None), result, condition)
+
+    def test_baseline(self):
+        for condition, result in self.conditions:
+            self.assertEqual(self.handler.match_condition(condition, "me", None),
+                             baseline_match(self.func_set, condition, "me", None),
+                             condition)
+
+    def test_cached(self):
+        for i in range(2):
+            for condition, result in self.conditions:
+                self.assertEqual(self.handler.match_condition(condition, "me", None), result, condition)
+
+    def test_profiled(self):
+        STATEMENT_PROFILER.enable()
+        for condition, result in self.conditions:
+            self.assertEqual(self.handler.match_condition(condition, "me", None), result, condition)
+
+        stats = STATEMENT_PROFILER.get_stats()
+        self.assertTrue(stats["conditions"])
+        self.assertTrue(stats["functions"])
+
+
+class TestStatementCache(TestCase):
+    """
+    The cache keeps the most recently used statements.
+    """
+    def setUp(self):
+        self.func_set = TestFuncSet()
+        self.cache = StatementCache(CompiledCondition, self.func_set, 3)
+
+    def test_eviction(self):
+        compiled = self.cache.get("echo(1)")
+        self.cache.get("echo(2)")
+        self.cache.get("echo(3)")
+        self.assertIs(self.cache.get("echo(1)"), compiled)
+
+        # echo(2) is the least recently used one
+        self.cache.get("echo(4)")
+        self.assertEqual(list(self.cache.cache), ["echo(3)", "echo(1)", "echo(4)"])
+        self.assertIs(self.cache.get("echo(1)"), compiled)
+
+        self.cache.get("echo(5)")
+        self.cache.get("echo(6)")
+        self.cache.get("echo(7)")
+        self.assertEqual(len(self.cache.cache), 3)
+        self.assertIsNot(self.cache.get("echo(1)"), compiled)
+
+    def test_clear(self):
+        self.cache.get("echo(1)")
+        self.cache.clear()
+        self.assertEqual(len(self.cache.cache), 0)
+
+    def test_handler_cache_size(self):
+        from django.conf import settings
+        handler = StatementHandler()
+        handler.condition_cache = StatementCache(CompiledCondition, TestFuncSet(),
+                                                 settings.STATEMENT_CACHE_SIZE)
+        for i in range(settings.STATEMENT_CACHE_SIZE + 10):
+            handler.match_condition("echo(%d)" % i, None, None)
+        self.assertEqual(len(handler.condition_cache.cache), settings.STATEMENT_CACHE_SIZE)
+        self.assertNotIn("echo(0)", handler.condition_cache.cache)
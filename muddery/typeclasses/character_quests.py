@@ -13,7 +13,7 @@ from muddery.utils.dialogue_handler import DIALOGUE_HANDLER
 from muddery.utils.loot_handler import LootHandler
 from muddery.utils.localized_strings_handler import _
 from muddery.utils.game_settings import GAME_SETTINGS
-from muddery.utils.object_key_handler import OBJECT_KEY_HANDLER
+from muddery.utils.name_resolver import NAME_RESOLVER
 from muddery.worlddata.data_sets import DATA_SETS
 from django.conf import settings
 from django.apps import apps
@@ -73,7 +73,7 @@ class MudderyQuest(MudderyObject):
                          "desc": obj_record.desc}
             self.objectives[obj_record.ordinal] = objective
 
-            accomplished = self.db.accomplished.get(key, 0)
+            accomplished = self.db.accomplished.get(obj_record.ordinal, 0)
             if accomplished < obj_record.number:
                 if not objective_type in self.not_accomplished:
                     self.not_accomplished[objective_type] = [obj_record.ordinal]
@@ -108,7 +108,7 @@ class MudderyQuest(MudderyObject):
                 if self.objectives[ordinal]["type"] == defines.OBJECTIVE_TALK:
                     # talking
                     target = _("Talk to")
-                    name = DIALOGUE_HANDLER.get_npc_name(self.objectives[ordinal]["object"])
+                    name = NAME_RESOLVER.get_dialogue_npc_name(self.objectives[ordinal]["object"])
         
                     objectives.append({"target": target,
                                        "object": name,
@@ -118,20 +118,9 @@ class MudderyQuest(MudderyObject):
                 elif self.objectives[ordinal]["type"] == defines.OBJECTIVE_OBJECT:
                     # getting
                     target = _("Get")
-                    name = ""
-                    
+
                     # Get the name of the objective object.
-                    object_key = self.objectives[ordinal]["object"]
-                    model_names = OBJECT_KEY_HANDLER.get_models(object_key)
-                    for model_name in model_names:
-                        model = apps.get_model(settings.WORLD_DATA_APP, model_name)
-                        # Get record.
-                        try:
-                            record = model.objects.get(key=object_key)
-                            name = record.name
-                            break
-                        except Exception, e:
-                            pass
+                    name = NAME_RESOLVER.get_name(self.objectives[ordinal]["object"])
         
                     objectives.append({"target": target,
                                        "object": name,
@@ -141,20 +130,9 @@ class MudderyQuest(MudderyObject):
                 elif self.objectives[ordinal]["type"] == defines.OBJECTIVE_KILL:
                     # getting
                     target = _("Kill")
-                    name = ""
 
                     # Get the name of the objective character.
-                    object_key = self.objectives[ordinal]["object"]
-                    model_names = OBJECT_KEY_HANDLER.get_models(object_key)
-                    for model_name in model_names:
-                        model = apps.get_model(settings.WORLD_DATA_APP, model_name)
-                        # Get record.
-                        try:
-                            record = model.objects.get(key=object_key)
-                            name = record.name
-                            break
-                        except Exception, e:
-                            pass
+                    name = NAME_RESOLVER.get_name(self.objectives[ordinal]["object"])
 
                     objectives.append({"target": target,
                                        "object": name,
@@ -203,6 +181,53 @@ class MudderyQuest(MudderyObject):
         if obj_list:
             owner.remove_objects(obj_list)
 
+    def get_unaccomplished_objectives(self):
+        """
+        Get objectives that have not been accomplished.
+
+        Returns:
+            (list) a list of (ordinal, objective's type, objective's object key)
+        """
+        return [(ordinal, type, self.objectives[ordinal]["object"])
+                for type, ordinals in self.not_accomplished.iteritems()
+                for ordinal in ordinals]
+
+    def add_accomplished(self, events):
+        """
+        Add accomplished numbers of several objectives. The accomplished
+        numbers are saved only once. Events are counted in order, events
+        after an objective has been accomplished are not counted.
+
+        Args:
+            events: (list) a list of (objective's ordinal, number to add)
+
+        Returns:
+            (list) ordinals of objectives that have just been accomplished.
+        """
+        accomplished = dict(self.db.accomplished)
+        finished = []
+
+        for ordinal, number in events:
+            if ordinal not in self.objectives:
+                continue
+
+            objective = self.objectives[ordinal]
+            type = objective["type"]
+            if ordinal not in self.not_accomplished.get(type, ()):
+                # already accomplished
+                continue
+
+            accomplished[ordinal] = accomplished.get(ordinal, 0) + number
+            if accomplished[ordinal] >= objective["number"]:
+                # if this objectives is accomplished, remove it
+                self.not_accomplished[type].remove(ordinal)
+                if not self.not_accomplished[type]:
+                    del(self.not_accomplished[type])
+                finished.append(ordinal)
+
+        self.db.accomplished = accomplished
+        return finished
+
     def at_objective(self, type, object_key, number=1):
         """
         Called when the owner may complete some objectives.
@@ -218,31 +243,11 @@ class MudderyQuest(MudderyObject):
         if type not in self.not_accomplished:
             return False
 
-        status_changed = False
-        index = 0
-
-        # search all object objectives
-        while index < len(self.not_accomplished[type]):
-            ordinal = self.not_accomplished[type][index]
-            index += 1
-
-            if self.objectives[ordinal]["object"] == object_key:
-                # if this object matches an objective
-                status_changed = True
+        # search all objectives of this type
+        events = [(ordinal, number) for ordinal in self.not_accomplished[type]
+                  if self.objectives[ordinal]["object"] == object_key]
+        if not events:
+            return False
 
-                # add accomplished number
-                accomplished = self.db.accomplished.get(ordinal, 0)
-                accomplished += number
-                self.db.accomplished[ordinal] = accomplished
-
-                if self.db.accomplished[ordinal] >= self.objectives[ordinal]["number"]:
-                    # if this objectives is accomplished, remove it
-                    index -= 1
-                    del(self.not_accomplished[type][index])
-                                                                    
-                    if not self.not_accomplished[type]:
-                        # if all objectives are accomplished
-                        del(self.not_accomplished[type])
-                        break
-                                                                                
-        return status_changed
+        self.add_accomplished(events)
+        return True
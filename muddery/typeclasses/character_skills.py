@@ -68,6 +68,7 @@ class MudderySkill(MudderyObject):
 
         # set data
         self.function = getattr(self.dfield, "function", "")
+        self.program = STATEMENT_HANDLER.compile_skill(self.function)
         self.cd = getattr(self.dfield, "cd", 0)
         self.passive = getattr(self.dfield, "passive", False)
         self.message = getattr(self.dfield, "message", "")
@@ -131,7 +132,7 @@ class MudderySkill(MudderyObject):
                 return
 
         # call skill function
-        STATEMENT_HANDLER.do_skill(self.function, owner, target,
+        STATEMENT_HANDLER.do_skill(self.program, owner, target,
                                    key=self.get_data_key(), name=self.get_name(),
                                    message=self.message)
 
@@ -143,6 +144,22 @@ class MudderySkill(MudderyObject):
 
         return
 
+    def get_cast_program(self, target):
+        """
+        Get the skill's compiled function and its args without casting it,
+        so that a batch of skills can be executed together.
+
+        Args:
+            target: (object) skill's target
+
+        Returns:
+            (tuple) (program, caller, target, kwargs)
+        """
+        kwargs = {"key": self.get_data_key(),
+                  "name": self.get_name(),
+                  "message": self.message}
+        return self.program, self.db.owner, target, kwargs
+
     def check_available(self):
         """
         Check this skill.
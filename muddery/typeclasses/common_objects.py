@@ -64,6 +64,9 @@ class MudderyCommonObject(MudderyObject):
             raise MudderyError("%s over stack." % self.get_data_key())
         
         self.db.number += number
+
+        if self.location and hasattr(self.location, "update_content"):
+            self.location.update_content(self)
         return
 
     def decrease_num(self, number):
@@ -80,6 +83,9 @@ class MudderyCommonObject(MudderyObject):
             raise MudderyError("%s's number will below zero." % self.get_data_key())
         
         self.db.number -= number
+
+        if self.location and hasattr(self.location, "update_content"):
+            self.location.update_content(self)
         return
 
     def get_available_commands(self, caller):
@@ -22,6 +22,9 @@ from muddery.utils.data_field_handler import DataFieldHandler
 from muddery.utils import utils
 from muddery.utils.exception import MudderyError
 from muddery.utils.object_key_handler import OBJECT_KEY_HANDLER
+from muddery.utils.object_data_handler import OBJECT_DATA_HANDLER
+from muddery.utils.data_key_index import DATA_KEY_INDEX
+from muddery.utils.message_coalescer import MESSAGE_COALESCER
 from muddery.utils.event_handler import EventHandler
 from muddery.utils.localized_strings_handler import _
 from muddery.utils.game_settings import GAME_SETTINGS
@@ -135,6 +138,21 @@ class MudderyObject(DefaultObject):
         # This object's class may be changed after load_data(), so do not add
         # codes here. You can add codes in after_data_loaded() which is called
         # after load_data().
+
+    def delete(self):
+        """
+        Deletes this object, and remove it from the data key index.
+        """
+        obj_id = self.id
+        location = self.location
+        result = super(MudderyObject, self).delete()
+        if result:
+            DATA_KEY_INDEX.remove_object(obj_id)
+
+            # Deleting does not call the location's hooks.
+            if location and hasattr(location, "at_content_deleted"):
+                location.at_content_deleted(obj_id)
+        return result
     
     def at_post_unpuppet(self, player, session=None, **kwargs):
         """
@@ -200,7 +218,10 @@ class MudderyObject(DefaultObject):
         
         # Save data info's key and model
         utils.set_obj_data_key(self, key)
-        
+
+        if self.location and hasattr(self.location, "update_content"):
+            self.location.update_content(self)
+
         # Load data.
         self.load_data(set_location=set_location)
 
@@ -227,25 +248,10 @@ class MudderyObject(DefaultObject):
             # Reverse exit loads data without key's prefix.
             key = key[len(settings.REVERSE_EXIT_PREFIX):]
 
-        data_models = OBJECT_KEY_HANDLER.get_models(key)
-
-        for data_model in data_models:
-            # Get db model
-            model_obj = apps.get_model(settings.WORLD_DATA_APP, data_model)
-            if not model_obj:
-                logger.log_errmsg("%s can not open model %s" % (key, data_model))
-                continue
-
-            # Get data record.
-            try:
-                data = model_obj.objects.get(key=key)
-            except Exception, e:
-                logger.log_errmsg("%s can not find key %s" % (key, key))
-                continue
-
-            # Set data.
-            for field in data._meta.fields:
-                setattr(self.dfield, field.name, data.serializable_value(field.name))
+        # Set data from the world data snapshot.
+        for model_name, field_names, record in OBJECT_DATA_HANDLER.get_records(key):
+            for field_name, value in zip(field_names, record):
+                setattr(self.dfield, field_name, value)
 
     def load_data(self, set_location=True):
         """
@@ -331,12 +337,7 @@ class MudderyObject(DefaultObject):
         Args:
             typeclass_key: (string) Typeclass's key.
         """
-        typeclass_path = ""
-        try:
-            data = DATA_SETS.typeclasses.objects.get(key=typeclass_key)
-            typeclass_path = data.path
-        except Exception, e:
-            pass
+        typeclass_path = OBJECT_DATA_HANDLER.get_typeclass_path(typeclass_key)
 
         if not typeclass_path:
             if typeclass_key:
@@ -362,6 +363,10 @@ class MudderyObject(DefaultObject):
         
         self.typeclass_key = typeclass_key
 
+        if self.location and hasattr(self.location, "update_content"):
+            # the object's type may change
+            self.location.update_content(self)
+
     def set_name(self, name):
         """
         Set object's name.
@@ -383,6 +388,9 @@ class MudderyObject(DefaultObject):
         if self.destination:
             self.flush_from_cache()
 
+        if self.location and hasattr(self.location, "update_content"):
+            self.location.update_content(self)
+
     def get_name(self):
         """
         Get player character's name.
@@ -468,7 +476,12 @@ class MudderyObject(DefaultObject):
         """
         if not destination:
             # remove destination
+            had_destination = bool(self.destination)
             self.destination = destination
+
+            if had_destination and self.location and hasattr(self.location, "update_content"):
+                # it is not an exit now
+                self.location.update_content(self)
             return
 
         # set new destination
@@ -495,6 +508,10 @@ class MudderyObject(DefaultObject):
     
         self.destination = destination_obj
 
+        if self.location and hasattr(self.location, "update_content"):
+            # the object's bucket depends on its destination
+            self.location.update_content(self)
+
     def set_icon(self, icon_key):
         """
         Set object's icon.
@@ -615,10 +632,16 @@ class MudderyObject(DefaultObject):
         except Exception:
             logger.log_trace()
 
-        kwargs["options"] = options
-                                                        
         # relay to session(s)
         sessions = make_iter(session) if session else self.sessions.all()
+
+        if settings.MSG_COALESCING:
+            # merge messages in this reactor turn
+            for session in sessions:
+                MESSAGE_COALESCER.send(session, text, options, **kwargs)
+            return
+
+        kwargs["options"] = options
         for session in sessions:
             session.msg(text=text, **kwargs)
 
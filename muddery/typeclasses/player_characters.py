@@ -19,6 +19,7 @@ from muddery.utils import defines, utils
 from muddery.utils.builder import build_object, get_object_record
 from muddery.utils.equip_type_handler import EQUIP_TYPE_HANDLER
 from muddery.utils.quest_handler import QuestHandler
+from muddery.utils.inventory_handler import InventoryHandler
 from muddery.utils.statement_attribute_handler import StatementAttributeHandler
 from muddery.utils.exception import MudderyError
 from muddery.utils.localized_strings_handler import _
@@ -26,6 +27,8 @@ from muddery.utils.game_settings import GAME_SETTINGS
 from muddery.utils.dialogue_handler import DIALOGUE_HANDLER
 from muddery.utils.honours_handler import HONOURS_HANDLER
 from muddery.utils.match_queue_handler import MATCH_QUEUE_HANDLER
+from muddery.utils.world_graph import WORLD_GRAPH
+from muddery.utils.name_resolver import NAME_RESOLVER
 from muddery.dao.honours_mapper import HONOURS_MAPPER
 from muddery.worlddata.data_sets import DATA_SETS
 from muddery.utils.attributes_info_handler import CHARACTER_ATTRIBUTES_INFO
@@ -65,6 +68,11 @@ class MudderyPlayerCharacter(MudderyCharacter):
     def statement_attr(self):
         return StatementAttributeHandler(self)
 
+    # inventory index
+    @lazy_property
+    def inventory(self):
+        return InventoryHandler(self)
+
     def at_object_creation(self):
         """
         Called once, when this object is first created. This is the
@@ -142,6 +150,10 @@ class MudderyPlayerCharacter(MudderyCharacter):
         """
         super(MudderyPlayerCharacter, self).at_object_receive(moved_obj, source_location)
 
+        # inventory changed
+        self.inventory.add(moved_obj)
+        DIALOGUE_HANDLER.clear_character_cache(self)
+
         # send latest inventory data to player
         self.msg({"inventory": self.return_inventory()})
     
@@ -155,10 +167,32 @@ class MudderyPlayerCharacter(MudderyCharacter):
         
         """
         super(MudderyPlayerCharacter, self).at_object_left(moved_obj, target_location)
-        
+
+        # inventory changed
+        self.inventory.discard(moved_obj.id)
+        DIALOGUE_HANDLER.clear_character_cache(self)
+
         # send latest inventory data to player
         self.msg({"inventory": self.return_inventory()})
 
+    def update_content(self, obj):
+        """
+        Called after an object's data key or number has been changed.
+
+        Args:
+        obj (Object): The object in the inventory
+        """
+        self.inventory.update(obj)
+
+    def at_content_deleted(self, obj_id):
+        """
+        Called after an object in the inventory has been deleted.
+
+        Args:
+        obj_id (int): The deleted object's id
+        """
+        self.inventory.discard(obj_id)
+
     def at_after_move(self, source_location):
         """
         We make sure to look around after a move.
@@ -218,6 +252,8 @@ class MudderyPlayerCharacter(MudderyCharacter):
 
         MATCH_QUEUE_HANDLER.remove(self)
 
+        DIALOGUE_HANDLER.clear_character_cache(self)
+
     def set_nickname(self, nickname):
         """
         Set player character's nickname.
@@ -298,35 +334,7 @@ class MudderyPlayerCharacter(MudderyCharacter):
                           ...}
             }
         """
-        rooms = {}
-        exits = {}
-
-        for room_key in self.db.revealed_map:
-            # get room's information
-            room = utils.search_obj_data_key(room_key)
-            if room:
-                room = room[0]
-                rooms[room_key] = {"name": room.get_name(),
-                                   "icon": room.icon,
-                                   "area": room.location and room.location.get_data_key(),
-                                   "pos": room.position}
-
-                new_exits = room.get_exits()
-                if new_exits:
-                    exits.update(new_exits)
-
-        for path in exits.values():
-            # add room's neighbours
-            if not path["to"] in rooms:
-                neighbour = utils.search_obj_data_key(path["to"])
-                if neighbour:
-                    neighbour = neighbour[0]                    
-                    rooms[neighbour.get_data_key()] = {"name": neighbour.get_name(),
-                                                       "icon": neighbour.icon,
-                                                       "area": neighbour.location and neighbour.location.get_data_key(),
-                                                       "pos": neighbour.position}
-                    
-        return {"rooms": rooms, "exits": exits}
+        return WORLD_GRAPH.get_graph().get_map(self.db.revealed_map)
 
     def show_location(self):
         """
@@ -361,28 +369,9 @@ class MudderyPlayerCharacter(MudderyCharacter):
             reveal_map = None
             if not location_key in self.db.revealed_map:
                 # reveal map
-                self.db.revealed_map.add(self.location.get_data_key())
-
-                rooms = {location_key: {"name": self.location.get_name(),
-                                        "icon": self.location.icon,
-                                        "area": self.location.location and self.location.location.get_data_key(),
-                                        "pos": self.location.position}}
-
-                exits = self.location.get_exits()
-
-                for path in exits.values():
-                    # add room's neighbours
-                    if not path["to"] in rooms:
-                        neighbour = utils.search_obj_data_key(path["to"])
-                        if neighbour:
-                            neighbour = neighbour[0]
+                self.db.revealed_map.add(location_key)
 
-                            rooms[neighbour.get_data_key()] = {"name": neighbour.get_name(),
-                                                               "icon": neighbour.icon,
-                                                               "area": neighbour.location and neighbour.location.get_data_key(),
-                                                               "pos": neighbour.position}
-                    
-                msg["reveal_map"] = {"rooms": rooms, "exits": exits}
+                msg["reveal_map"] = WORLD_GRAPH.get_graph().get_map([location_key])
 
             # get appearance
             appearance = self.location.get_appearance(self)
@@ -430,29 +419,17 @@ class MudderyPlayerCharacter(MudderyCharacter):
         rejected_keys = {}      # the keys of objects that have been rejected
         reject_reason = {}      # the reasons of why objects have been rejected
 
-        # check what the character has now
-        inventory = {}
-        for item in self.contents:
-            key = item.get_data_key()
-            if key in inventory:
-                # if the character has more than one item of the same kind,
-                # get the smallest stack.
-                if inventory[key].db.number > item.db.number:
-                    inventory[key] = item
-            else:
-                inventory[key] = item
-
         for obj in obj_list:
             key = obj["object"]
             available = obj["number"]
             number = available
             accepted = 0
-            name = ""
+            name = NAME_RESOLVER.get_name(key)
             unique = False
 
             if number == 0:
                 # it is an empty object
-                if key in inventory:
+                if self.inventory.has(key):
                     # already has this object
                     accepted_keys[key] = 0
                     accepted_names[name] = 0
@@ -480,8 +457,6 @@ class MudderyPlayerCharacter(MudderyCharacter):
                     reject_reason[name] = reason
                     continue
 
-                name = new_obj.get_name()
-
                 # move the new object to the character
                 if not new_obj.move_to(self, quiet=True, emit_to_obj=self):
                     new_obj.delete()
@@ -496,19 +471,19 @@ class MudderyPlayerCharacter(MudderyCharacter):
 
             else:
                 # common number
-                # if already has this kind of object
-                if key in inventory:
+                # if already has this kind of object, get the smallest stack
+                current = self.inventory.get_smallest(key)
+                if current:
                     # add to current object
-                    name = inventory[key].name
-                    unique = inventory[key].unique
+                    unique = current.unique
 
                     add = number
-                    if add > inventory[key].max_stack - inventory[key].db.number:
-                        add = inventory[key].max_stack - inventory[key].db.number
+                    if add > current.max_stack - current.db.number:
+                        add = current.max_stack - current.db.number
 
                     if add > 0:
                         # increase stack number
-                        inventory[key].increase_num(add)
+                        current.increase_num(add)
                         number -= add
                         accepted += add
 
@@ -526,7 +501,6 @@ class MudderyPlayerCharacter(MudderyCharacter):
                         reason = _("Can not get %s.") % name
                         break
 
-                    name = new_obj.get_name()
                     unique = new_obj.unique
 
                     # move the new object to the character
@@ -565,8 +539,8 @@ class MudderyPlayerCharacter(MudderyCharacter):
             self.show_inventory()
 
             # call quest handler
-            for key in accepted_keys:
-                self.quest_handler.at_objective(defines.OBJECTIVE_OBJECT, key, accepted_keys[key])
+            self.quest_handler.at_objectives([(defines.OBJECTIVE_OBJECT, key, accepted_keys[key])
+                                              for key in accepted_keys])
 
         return rejected_keys
 
@@ -579,15 +553,7 @@ class MudderyPlayerCharacter(MudderyCharacter):
         Returns:
             int: object number
         """
-        objects = self.search_inventory(obj_key)
-
-        # get total number
-        sum = 0
-        for obj in objects:
-            obj_num = obj.get_number()
-            sum += obj_num
-
-        return sum
+        return self.inventory.get_number(obj_key)
 
     def can_get_object(self, obj_key, number):
         """
@@ -680,16 +646,13 @@ class MudderyPlayerCharacter(MudderyCharacter):
         Returns:
             boolean: success
         """
-        objects = self.search_inventory(obj_key)
+        if self.inventory.get_number(obj_key) < number:
+            return False
 
-        # get total number
-        sum = 0
-        for obj in objects:
-            obj_num = obj.get_number()
-            sum += obj_num
+        objects = self.search_inventory(obj_key)
 
-        if sum < number:
-            return False
+        # inventory will change
+        DIALOGUE_HANDLER.clear_character_cache(self)
 
         # remove objects
         to_remove = number
@@ -731,8 +694,7 @@ class MudderyPlayerCharacter(MudderyCharacter):
         """
         Search specified object in the inventory.
         """
-        result = [item for item in self.contents if item.get_data_key() == obj_key]
-        return result
+        return self.inventory.get(obj_key)
 
     def show_inventory(self):
         """
@@ -746,7 +708,7 @@ class MudderyPlayerCharacter(MudderyCharacter):
         Get inventory's data.
         """
         inv = []
-        for item in self.contents:
+        for item in self.inventory.all():
             info = {"dbref": item.dbref,        # item's dbref
                     "name": item.name,          # item's name
                     "number": item.db.number,   # item's number
@@ -820,12 +782,11 @@ class MudderyPlayerCharacter(MudderyCharacter):
             # in order of positions
             info = None
             if self.db.equipments[position]:
-                dbref = self.db.equipments[position]
-                for obj in self.contents:
-                    if obj.dbref == dbref:
-                        info = {"dbref": obj.dbref,
-                                "name": obj.name,
-                                "desc": obj.db.desc}
+                obj = self.inventory.get_by_dbref(self.db.equipments[position])
+                if obj:
+                    info = {"dbref": obj.dbref,
+                            "name": obj.name,
+                            "desc": obj.db.desc}
             equipments[position] = info
 
         return equipments
@@ -849,11 +810,9 @@ class MudderyPlayerCharacter(MudderyCharacter):
 
         # Take off old equipment
         if self.db.equipments[position]:
-            dbref = self.db.equipments[position]
-
-            for content in self.contents:
-                if content.dbref == dbref:
-                    content.equipped = False
+            content = self.inventory.get_by_dbref(self.db.equipments[position])
+            if content:
+                content.equipped = False
 
         # Put on new equipment, store object's dbref.
         self.db.equipments[position] = obj.dbref
@@ -882,12 +841,9 @@ class MudderyPlayerCharacter(MudderyCharacter):
             raise MudderyError(_("Can not find this equipment."))
 
         # Set object's attribute 'equipped' to False
-        dbref = self.db.equipments[position]
-
-        for obj in self.contents:
-            if obj.dbref == dbref:
-                obj.equipped = False
-                find = True
+        obj = self.inventory.get_by_dbref(self.db.equipments[position])
+        if obj:
+            obj.equipped = False
 
         self.db.equipments[position] = None
 
@@ -7,6 +7,7 @@ Rooms are simple containers that has no location of their own.
 
 import ast
 import traceback
+from collections import OrderedDict
 from django.conf import settings
 from django.apps import apps
 from muddery.typeclasses.objects import MudderyObject
@@ -36,6 +37,16 @@ class MudderyRoom(MudderyObject, DefaultRoom):
         self.peaceful = False
         self.position = None
         self.background = None
+        self.content_buckets = None
+
+    def at_init(self):
+        """
+        Called when the object is loaded into memory.
+        """
+        # Contents will be put into buckets when they are looked.
+        self.content_buckets = None
+
+        super(MudderyRoom, self).at_init()
 
     def after_data_loaded(self):
         """
@@ -77,6 +88,9 @@ class MudderyRoom(MudderyObject, DefaultRoom):
         """
         super(MudderyRoom, self).at_object_receive(moved_obj, source_location)
 
+        if self.content_buckets is not None:
+            self.add_content(moved_obj)
+
         if not GAME_SETTINGS.get("solo_mode"):
             # send surrounding changes to player
             type = self.get_surrounding_type(moved_obj)
@@ -100,6 +114,9 @@ class MudderyRoom(MudderyObject, DefaultRoom):
         """
         super(MudderyRoom, self).at_object_leave(moved_obj, target_location)
 
+        if self.content_buckets is not None:
+            self.remove_content(moved_obj)
+
         if not GAME_SETTINGS.get("solo_mode"):
             # send surrounding changes to player
             type = self.get_surrounding_type(moved_obj)
@@ -134,6 +151,79 @@ class MudderyRoom(MudderyObject, DefaultRoom):
                                               "to": cont.destination.get_data_key()}
         return exits
 
+    def init_contents(self):
+        """
+        Put all contents into buckets of their types.
+        """
+        self.content_buckets = {"exits": OrderedDict(),
+                                "npcs": OrderedDict(),
+                                "things": OrderedDict(),
+                                "players": OrderedDict()}
+        for cont in self.contents:
+            self.add_content(cont)
+
+    def get_content_type(self, obj):
+        """
+        Get the bucket of a content. Online and offline players are in the same
+        bucket.
+        """
+        if obj.destination:
+            return "exits"
+        elif obj.is_typeclass(settings.BASE_GENERAL_CHARACTER_TYPECLASS, exact=False):
+            if obj.is_typeclass(settings.BASE_PLAYER_CHARACTER_TYPECLASS, exact=False):
+                return "players"
+            else:
+                return "npcs"
+        else:
+            return "things"
+
+    def add_content(self, obj):
+        """
+        Add a content to its bucket, with its appearance which does not change
+        with the caller.
+        """
+        self.remove_content(obj)
+
+        appearance = {"dbref": obj.dbref,
+                      "name": obj.get_name(),
+                      "key": obj.get_data_key()}
+
+        # Everyone can view it, do not need to check the lock.
+        view_all = obj.locks.get("view") == "view:all()"
+
+        self.content_buckets[self.get_content_type(obj)][obj.id] = (obj, appearance, view_all)
+
+    def remove_content(self, obj):
+        """
+        Remove a content from its bucket.
+        """
+        for bucket in self.content_buckets.values():
+            if obj.id in bucket:
+                del bucket[obj.id]
+                return
+
+    def update_content(self, obj):
+        """
+        Update a content's appearance after its data changed.
+        """
+        if self.content_buckets is not None:
+            self.add_content(obj)
+
+    def at_content_deleted(self, obj_id):
+        """
+        Called after a content has been deleted.
+
+        Args:
+            obj_id: (int) the deleted object's id
+        """
+        if self.content_buckets is None:
+            return
+
+        for bucket in self.content_buckets.values():
+            if obj_id in bucket:
+                del bucket[obj_id]
+                return
+
     def get_surroundings(self, caller):
         """
         This is a convenient hook for a 'look'
@@ -146,20 +236,31 @@ class MudderyRoom(MudderyObject, DefaultRoom):
                 "players": [],
                 "offlines": []}
 
-        visible = (cont for cont in self.contents if cont != caller and
-                   cont.access(caller, "view"))
+        if self.content_buckets is None or \
+            sum(len(bucket) for bucket in self.content_buckets.values()) != len(self.contents_cache.get()):
+            # Contents have been changed without hooks.
+            self.init_contents()
 
-        if GAME_SETTINGS.get("solo_mode"):
-            visible = (cont for cont in visible if not cont.has_account)
+        solo_mode = GAME_SETTINGS.get("solo_mode")
 
-        for cont in visible:
-            # only show objects that match the condition
-            if not cont.is_visible(caller):
-                continue
+        for type, bucket in self.content_buckets.iteritems():
+            for cont, static_appearance, view_all in bucket.values():
+                if cont == caller:
+                    continue
 
-            type = self.get_surrounding_type(cont)
-            if type:
-                appearance = {}
+                if type == "players":
+                    if solo_mode or not cont.has_account:
+                        # do not show offline players
+                        continue
+
+                if not view_all and not cont.access(caller, "view"):
+                    continue
+
+                # only show objects that match the condition
+                if not cont.is_visible(caller):
+                    continue
+
+                appearance = dict(static_appearance)
 
                 if type == "npcs":
                     # add quest status
@@ -167,13 +268,7 @@ class MudderyRoom(MudderyObject, DefaultRoom):
                         provide_quest, complete_quest = cont.have_quest(caller)
                         appearance["provide_quest"] = provide_quest
                         appearance["complete_quest"] = complete_quest
-                elif type == "offlines":
-                    continue
 
-                appearance["dbref"] = cont.dbref
-                appearance["name"] = cont.get_name()
-                appearance["key"] = cont.get_data_key()
-                
                 info[type].append(appearance)
 
         return info
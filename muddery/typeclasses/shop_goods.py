@@ -10,6 +10,7 @@ from muddery.typeclasses.objects import MudderyObject
 from muddery.utils.exception import MudderyError
 from muddery.utils.builder import build_object, get_object_record
 from muddery.utils.localized_strings_handler import _
+from muddery.utils.name_resolver import NAME_RESOLVER
 from muddery.worlddata.data_sets import DATA_SETS
 
 
@@ -57,11 +58,10 @@ class MudderyShopGoods(MudderyObject):
         self.condition = getattr(self.dfield, "condition", "")
 
         # get price unit information
-        unit_record = get_object_record(self.unit_key)
-        if not unit_record:
+        if not get_object_record(self.unit_key):
             logger.log_errmsg("Can not find %s price unit %s." % (self.goods_key, self.unit_key))
             return
-        self.unit_name = unit_record.name
+        self.unit_name = NAME_RESOLVER.get_name(self.unit_key)
 
         # load goods object
         goods = self.db.goods
@@ -78,7 +78,7 @@ class MudderyShopGoods(MudderyObject):
                 logger.log_err("Can not create goods %s." % self.goods_key)
                 return
 
-        self.name = goods.get_name()
+        self.name = NAME_RESOLVER.get_name(self.goods_key, goods.get_name())
         self.desc = goods.db.desc
         self.icon = getattr(goods, "icon", None)
 
@@ -102,7 +102,7 @@ class MudderyShopGoods(MudderyObject):
 
         # check if can get these objects
         if not caller.can_get_object(self.db.goods.get_data_key(), self.number):
-            caller.msg({"alert": _("Sorry, you can not take more %s.") % self.db.goods.get_name()})
+            caller.msg({"alert": _("Sorry, you can not take more %s.") % self.name})
             return
 
         # Reduce price units.
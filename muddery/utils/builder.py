@@ -6,6 +6,12 @@ from __future__ import print_function
 
 from muddery.utils import utils
 from muddery.utils.object_key_handler import OBJECT_KEY_HANDLER
+from muddery.utils.object_data_handler import OBJECT_DATA_HANDLER
+from muddery.utils.event_handler import EVENT_INDEX
+from muddery.utils.world_graph import WORLD_GRAPH
+from muddery.utils.name_resolver import NAME_RESOLVER
+from muddery.utils.loot_handler import LOOT_TABLES
+from muddery.utils.world_builder import WorldBuilder
 from muddery.utils.game_settings import GAME_SETTINGS
 from muddery.worlddata.data_sets import DATA_SETS
 from django.conf import settings
@@ -25,21 +31,7 @@ def get_object_record(obj_key):
     Returns:
         The object's data record.
     """
-    record = None
-    model_names = OBJECT_KEY_HANDLER.get_models(obj_key)
-    for model_name in model_names:
-        try:
-            # Get record.
-            model_obj = apps.get_model(settings.WORLD_DATA_APP, model_name)
-            record = model_obj.objects.get(key=obj_key)
-            break
-        except Exception, e:
-            ostring = "Can not get record %s: %s." % (obj_key, e)
-            print(ostring)
-            print(traceback.print_exc())
-            continue
-
-    return record
+    return OBJECT_DATA_HANDLER.get_record(obj_key)
 
 
 def build_object(obj_key, caller=None, set_location=True):
@@ -129,168 +121,58 @@ def build_unique_objects(objects_data, type_name, caller=None):
     Build all objects in a model.
 
     Args:
-        model_name: (string) The name of the data model.
+        objects_data: (Manager) The objects of the data model.
+        type_name: (string) The name of the data model.
         caller: (command caller) If provide, running messages will send to the caller.
     """
-    # get typeclass model
-    typeclass_objects = DATA_SETS.typeclasses.objects
-    
-    all_objects = objects_data.all()
-
-    # new objects
-    new_obj_keys = set(record.key for record in all_objects)
-
-    # reverse exits
-    reverse_exits = set(settings.REVERSE_EXIT_PREFIX + record.key
-                        for record in all_objects
-                            if record.typeclass==settings.TWO_WAY_EXIT_TYPECLASS_KEY)
-
-    new_obj_keys.update(reverse_exits)
-
-    # current objects
-    current_objs = utils.search_obj_unique_type(type_name)
+    WorldBuilder(caller).build([(objects_data, type_name)])
 
-    # remove objects
-    count_remove = 0
-    count_update = 0
-    count_create = 0
-    current_obj_keys = set()
-
-    for obj in current_objs:
-        obj_key = obj.get_data_key()
-
-        if obj_key in current_obj_keys:
-            # This object is duplcated.
-            ostring = "Deleting %s" % obj_key
-            print(ostring)
-            if caller:
-                caller.msg(ostring)
-
-            obj.delete()
-            count_remove += 1
-            continue
-
-        if not obj_key in new_obj_keys:
-            # This object should be removed
-            ostring = "Deleting %s" % obj_key
-            print(ostring)
-            if caller:
-                caller.msg(ostring)
 
-            obj.delete()
-            count_remove += 1
-            continue
-
-        try:
-            # set data
-            obj.load_data()
-            # put obj to its default location
-            obj.reset_location()
-        except Exception, e:
-            ostring = "%s can not load data:%s" % (obj.dbref, e)
-            print(ostring)
-            print(traceback.print_exc())
-            if caller:
-                caller.msg(ostring)
-
-        current_obj_keys.add(obj_key)
-
-    # Create new objects.
-    for record in all_objects:
-        if not record.key in current_obj_keys:
-            # Create new objects.
-            ostring = "Creating %s." % record.key
-            print(ostring)
-            if caller:
-                caller.msg(ostring)
-
-            try:
-                typeclass = typeclass_objects.get(key=record.typeclass)
-                obj = create.create_object(typeclass.path, record.name)
-                count_create += 1
-            except Exception, e:
-                ostring = "Can not create obj %s: %s" % (record.key, e)
-                print(ostring)
-                print(traceback.print_exc())
-                if caller:
-                    caller.msg(ostring)
-                continue
-
-            try:
-                obj.set_data_key(record.key)
-                utils.set_obj_unique_type(obj, type_name)
-            except Exception, e:
-                ostring = "Can not set data info to obj %s: %s" % (record.key, e)
-                print(ostring)
-                print(traceback.print_exc())
-                if caller:
-                    caller.msg(ostring)
-                continue
-
-        if record.typeclass == settings.TWO_WAY_EXIT_TYPECLASS_KEY:
-            # If it's a two way exit, create the reverse exit.
-            reverse_exit_key = settings.REVERSE_EXIT_PREFIX + record.key
-            if not reverse_exit_key in current_obj_keys:
-                ostring = "Creating %s." % reverse_exit_key
-                print(ostring)
-                if caller:
-                    caller.msg(ostring)
-
-                # Create object.
-                try:
-                    obj = create.create_object(settings.REVERSE_EXIT_TYPECLASS_PATH, record.name)
-                    count_create += 1
-                except Exception, e:
-                    ostring = "Can not create obj %s: %s" % (reverse_exit_key, e)
-                    print(ostring)
-                    print(traceback.print_exc())
-                    if caller:
-                        caller.msg(ostring)
-                    return
-
-                try:
-                    # Set data info.
-                    obj.set_data_key(reverse_exit_key)
-                    utils.set_obj_unique_type(obj, type_name)
-                except Exception, e:
-                    ostring = "Can not set data info to obj %s: %s" % (reverse_exit_key, e)
-                    print(ostring)
-                    print(traceback.print_exc())
-                    if caller:
-                        caller.msg(ostring)
-                    return
-
-    ostring = "Removed %d object(s). Created %d object(s). Updated %d object(s). Total %d objects.\n"\
-              % (count_remove, count_create, count_update, len(all_objects) + len(reverse_exits))
-    print(ostring)
-    if caller:
-        caller.msg(ostring)
-
-
-def build_all(caller=None):
+def build_all(caller=None, dry_run=False):
     """
     Build all objects in the world.
 
     Args:
         caller: (command caller) If provide, running messages will send to the caller.
-    """
-    # Reset object key's info.
-    OBJECT_KEY_HANDLER.reload()
-
-    # Build areas.
-    build_unique_objects(DATA_SETS.world_areas.objects, DATA_SETS.world_areas.model_name, caller)
-    
-    # Build rooms.
-    build_unique_objects(DATA_SETS.world_rooms.objects, DATA_SETS.world_rooms.model_name, caller)
-
-    # Build exits.
-    build_unique_objects(DATA_SETS.world_exits.objects, DATA_SETS.world_exits.model_name, caller)
-
-    # Build objects.
-    build_unique_objects(DATA_SETS.world_objects.objects, DATA_SETS.world_objects.model_name, caller)
+        dry_run: (boolean) Only report differences between world data and
+                 current objects, do not change objects.
 
-    # Build NPCs.
-    build_unique_objects(DATA_SETS.world_npcs.objects, DATA_SETS.world_npcs.model_name, caller)
+    Returns:
+        (dict) the build report
+    """
+    snapshot = None
+    if dry_run:
+        # Compare with a private snapshot of world data, loaded data is not
+        # changed before the world is built.
+        snapshot = OBJECT_DATA_HANDLER.build_snapshot()
+    else:
+        # Reset object key's info.
+        OBJECT_KEY_HANDLER.reload()
+
+        # Reload objects' data.
+        OBJECT_DATA_HANDLER.reload()
+
+        # Reload events.
+        EVENT_INDEX.reload()
+
+        # Rebuild the world graph.
+        WORLD_GRAPH.reload()
+
+        # Loot records may have been changed.
+        LOOT_TABLES.clear()
+
+        # Reload objects' names.
+        NAME_RESOLVER.reload()
+
+    # Build areas, rooms, exits, objects and NPCs.
+    models = [DATA_SETS.world_areas,
+              DATA_SETS.world_rooms,
+              DATA_SETS.world_exits,
+              DATA_SETS.world_objects,
+              DATA_SETS.world_npcs]
+    return WorldBuilder(caller).build([(model.objects, model.model_name) for model in models],
+                                      dry_run,
+                                      snapshot)
 
 
 def reset_default_locations():
@@ -0,0 +1,232 @@
+"""
+Data key index maps objects' data keys and unique types to objects' ids, so
+objects can be found by their data keys without querying attributes.
+"""
+
+from __future__ import print_function
+
+from django.conf import settings
+from evennia.objects.models import ObjectDB
+from evennia.utils import logger
+
+
+class DataKeyIndex(object):
+    """
+    Keeps the data keys and unique types of all objects in memory.
+    """
+    # attributes to index
+    attributes = ("key", "type")
+
+    def __init__(self):
+        """
+        Initialize handler
+        """
+        self.loaded = False
+
+        # attribute's name: {attribute's value: set of objects' ids}
+        self.values = {}
+
+        # attribute's name: {object's id: attribute's value}
+        self.objects = {}
+
+        self.clear()
+
+    def clear(self):
+        """
+        Clear data.
+        """
+        self.loaded = False
+        self.values = dict((attribute, {}) for attribute in self.attributes)
+        self.objects = dict((attribute, {}) for attribute in self.attributes)
+
+    def query(self, attribute, value=None):
+        """
+        Query objects' attributes from the database.
+
+        Args:
+            attribute: (string) attribute's name
+            value: (string) if it is given, only query objects with this value
+
+        Returns:
+            (list) a list of (object's id, attribute's value)
+        """
+        query = {"db_attributes__db_attrtype": None,
+                 "db_attributes__db_model": "objectdb",
+                 "db_attributes__db_key": attribute,
+                 "db_attributes__db_category": settings.DATA_KEY_CATEGORY}
+        if value is not None:
+            query["db_attributes__db_strvalue"] = value
+        return ObjectDB.objects.filter(**query).values_list("id", "db_attributes__db_strvalue")
+
+    def reload(self):
+        """
+        Load all objects' data keys and unique types.
+        """
+        self.clear()
+
+        for attribute in self.attributes:
+            try:
+                for obj_id, value in self.query(attribute).iterator():
+                    self.add(attribute, obj_id, value)
+            except Exception, e:
+                logger.log_errmsg("Can not load objects' %s: %s" % (attribute, e))
+
+        self.loaded = True
+
+    def add(self, attribute, obj_id, value):
+        """
+        Add an object's attribute.
+        """
+        self.discard(attribute, obj_id)
+
+        self.objects[attribute][obj_id] = value
+        if value not in self.values[attribute]:
+            self.values[attribute][value] = set()
+        self.values[attribute][value].add(obj_id)
+
+    def discard(self, attribute, obj_id):
+        """
+        Remove an object's attribute.
+        """
+        value = self.objects[attribute].pop(obj_id, None)
+        if value is None:
+            return
+
+        ids = self.values[attribute].get(value)
+        if ids is not None:
+            ids.discard(obj_id)
+            if not ids:
+                del self.values[attribute][value]
+
+    def set(self, attribute, obj, value):
+        """
+        Set an object's attribute. It only changes the index, the object's
+        attribute should be set by the caller.
+
+        Args:
+            attribute: (string) attribute's name
+            obj: (object) the object
+            value: (string) attribute's value
+        """
+        if not self.loaded:
+            # will get the value when loading
+            return
+
+        self.add(attribute, obj.id, value)
+
+    def remove_object(self, obj_id):
+        """
+        Remove a deleted object.
+
+        Args:
+            obj_id: (int) object's id
+        """
+        for attribute in self.attributes:
+            self.discard(attribute, obj_id)
+
+    def get_value(self, attribute, obj_id):
+        """
+        Get an object's attribute value.
+
+        Returns:
+            (string) attribute's value, or None if the object does not have it
+        """
+        if not self.loaded:
+            self.reload()
+
+        return self.objects[attribute].get(obj_id)
+
+    def get_ids(self, attribute, value):
+        """
+        Get ids of objects which have the given attribute value.
+
+        Returns:
+            (list) objects' ids
+        """
+        if not self.loaded:
+            self.reload()
+
+        return sorted(self.values[attribute].get(value, ()))
+
+    def search(self, attribute, value):
+        """
+        Search objects which have the given attribute value.
+
+        Args:
+            attribute: (string) attribute's name
+            value: (string) attribute's value
+
+        Returns:
+            (list) objects
+        """
+        objects = []
+        missing = []
+        for obj_id in self.get_ids(attribute, value):
+            # use objects in the cache first
+            obj = ObjectDB.get_cached_instance(obj_id)
+            if obj:
+                objects.append(obj)
+            else:
+                missing.append(obj_id)
+
+        if missing:
+            found = list(ObjectDB.objects.filter(id__in=missing))
+            objects.extend(found)
+
+            if len(found) < len(missing):
+                # objects have been deleted
+                found_ids = set(obj.id for obj in found)
+                for obj_id in missing:
+                    if obj_id not in found_ids:
+                        self.remove_object(obj_id)
+
+            objects.sort(key=lambda obj: obj.id)
+
+        if settings.DATA_KEY_INDEX_CHECK:
+            self.check_value(attribute, value, [obj.id for obj in objects])
+
+        return objects
+
+    def check_value(self, attribute, value, ids):
+        """
+        Compare a search result with the database.
+
+        Returns:
+            (boolean) the result is right or not
+        """
+        db_ids = sorted(obj_id for obj_id, db_value in self.query(attribute, value))
+        if db_ids != ids:
+            logger.log_errmsg("Data key index of %s %s is %s, but %s in the database." %
+                              (attribute, value, ids, db_ids))
+            return False
+        return True
+
+    def check(self):
+        """
+        Compare the whole index with the database.
+
+        Returns:
+            (list) a list of differences, (attribute's name, object's id,
+                   value in the index, value in the database)
+        """
+        if not self.loaded:
+            self.reload()
+
+        differences = []
+        for attribute in self.attributes:
+            db_objects = dict(self.query(attribute))
+            index_objects = self.objects[attribute]
+            for obj_id in set(db_objects.keys()) | set(index_objects.keys()):
+                index_value = index_objects.get(obj_id)
+                db_value = db_objects.get(obj_id)
+                if index_value != db_value:
+                    differences.append((attribute, obj_id, index_value, db_value))
+
+        for difference in differences:
+            logger.log_errmsg("Data key index of object %s's %s is %s, but %s in the database." %
+                              (difference[1], difference[0], difference[2], difference[3]))
+        return differences
+
+
+# main data key index
+DATA_KEY_INDEX = DataKeyIndex()
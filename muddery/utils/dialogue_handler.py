@@ -8,14 +8,38 @@ The DialogueHandler maintains a pool of dialogues.
 from __future__ import print_function
 
 import re
+import sys
 from muddery.utils import defines
 from muddery.utils.quest_dependency_handler import QUEST_DEP_HANDLER
 from muddery.statements.statement_handler import STATEMENT_HANDLER
 from muddery.utils.game_settings import GAME_SETTINGS
+from muddery.utils.name_resolver import NAME_RESOLVER
 from muddery.worlddata.data_sets import DATA_SETS
 from evennia.utils import logger
 
 
+class DialogueSentence(object):
+    """
+    A sentence of a dialogue. Sentences are read-only after they are loaded.
+    """
+    __slots__ = ("dialogue",        # dialogue's key
+                 "sentence",        # sentence's index in the dialogue
+                 "ordinal",
+                 "speaker_model",   # speaker's template
+                 "speaker_npc",     # if the speaker is the NPC
+                 "speaker_player",  # if the speaker is the player
+                 "icon",
+                 "content",
+                 "action",
+                 "provide_quest",
+                 "complete_quest",
+                 "is_last")
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
 class DialogueHandler(object):
     """
     The DialogueHandler maintains a pool of dialogues.
@@ -41,7 +65,75 @@ class DialogueHandler(object):
         self.can_close_dialogue = GAME_SETTINGS.get("can_close_dialogue")
         self.single_sentence_mode = GAME_SETTINGS.get("single_dialogue_sentence")
         self.dialogue_storage = {}
+
+        # shared strings
+        self.strings = {}
+
+        # sentence fields to load
+        self.sentence_fields = ("ordinal", "speaker", "icon", "content", "action",
+                                "provide_quest", "complete_quest")
+
+        # NPCs' availability to characters.
+        # character's id: {(npc's id, kind): result}
+        self.availability_cache = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
     
+    def intern_string(self, string):
+        """
+        Share equal strings in dialogues.
+        """
+        return self.strings.setdefault(string, string)
+
+    def build_dialogue(self, dialogue, condition, sentences, nexts, dependencies):
+        """
+        Build a dialogue's data.
+
+        Args:
+            dialogue: (string) dialogue's key
+            condition: (string) dialogue's condition
+            sentences: (list) a list of sentence's (ordinal, speaker, icon, content, action,
+                       provide_quest, complete_quest)
+            nexts: (list) next dialogues' keys
+            dependencies: (list) a list of dependency's (quest, type)
+
+        Returns:
+            (dict) dialogue's data
+        """
+        intern_string = self.intern_string
+        dialogue = intern_string(dialogue)
+
+        data = {}
+
+        data["condition"] = intern_string(condition)
+
+        data["dependencies"] = [{"quest": intern_string(quest), "type": intern_string(dep_type)}
+                                for quest, dep_type in dependencies]
+
+        # sort sentences by ordinal
+        sentences = sorted(sentences, key=lambda x:x[0])
+        data["sentences"] = []
+        for count, values in enumerate(sentences):
+            ordinal, speaker, icon, content, action, provide_quest, complete_quest = values
+            speaker_model = intern_string(self.speaker_escape.sub(self.escape_fun, speaker))
+
+            data["sentences"].append(DialogueSentence(dialogue=dialogue,
+                                                      sentence=count,
+                                                      ordinal=ordinal,
+                                                      speaker_model=speaker_model,
+                                                      speaker_npc=("%(n)" in speaker_model),
+                                                      speaker_player=("%(p)" in speaker_model),
+                                                      icon=intern_string(icon),
+                                                      content=content,
+                                                      action=intern_string(action),
+                                                      provide_quest=intern_string(provide_quest),
+                                                      complete_quest=intern_string(complete_quest),
+                                                      is_last=(count == len(sentences) - 1)))
+
+        data["nexts"] = [intern_string(next_dlg) for next_dlg in nexts]
+
+        return data
+
     def load_cache(self, dialogue):
         """
         To reduce database accesses, add a cache.
@@ -62,49 +154,98 @@ class DialogueHandler(object):
         except Exception, e:
             return
 
-        sentences = DATA_SETS.dialogue_sentences.objects.filter(dialogue=dialogue)
-
-        nexts = DATA_SETS.dialogue_relations.objects.filter(dialogue=dialogue)
-
-        dependencies = DATA_SETS.dialogue_quest_dependencies.objects.filter(dialogue=dialogue)
-
-        # Add db fields to data object.
-        data = {}
-
-        data["condition"] = dialogue_record.condition
-
-        data["dependencies"] = []
-        for dependency in dependencies:
-            data["dependencies"].append({"quest": dependency.dependency,
-                                         "type": dependency.type})
-
-        data["sentences"] = []
-        for sentence in sentences:
-            speaker_model = self.speaker_escape.sub(self.escape_fun, sentence.speaker)
-
-            data["sentences"].append({"dialogue": dialogue,
-                                      "ordinal": sentence.ordinal,
-                                      "speaker_model": speaker_model,
-                                      "icon": sentence.icon,
-                                      "content": sentence.content,
-                                      "action": sentence.action,
-                                      "provide_quest": sentence.provide_quest,
-                                      "complete_quest": sentence.complete_quest,
-                                      "can_close": self.can_close_dialogue})
+        sentences = DATA_SETS.dialogue_sentences.objects.filter(dialogue=dialogue)\
+                                                        .values_list(*self.sentence_fields)
 
-        # sort sentences by ordinal
-        data["sentences"].sort(key=lambda x:x["ordinal"])
-        count = 0
-        for sentence in data["sentences"]:
-            sentence["sentence"] = count
-            sentence["is_last"] = False
-            count += 1
-        data["sentences"][-1]["is_last"] = True
+        nexts = DATA_SETS.dialogue_relations.objects.filter(dialogue=dialogue)\
+                                                    .values_list("next_dlg", flat=True)
 
-        data["nexts"] = [next_one.next_dlg for next_one in nexts]
+        dependencies = DATA_SETS.dialogue_quest_dependencies.objects.filter(dialogue=dialogue)\
+                                                                    .values_list("dependency", "type")
 
         # Add to cache.
-        self.dialogue_storage[dialogue] = data
+        self.dialogue_storage[dialogue] = self.build_dialogue(dialogue,
+                                                              dialogue_record.condition,
+                                                              sentences,
+                                                              nexts,
+                                                              dependencies)
+
+    def load_all(self):
+        """
+        Load all dialogues with four queries.
+        """
+        sentences = {}
+        for values in DATA_SETS.dialogue_sentences.objects.all()\
+                                                  .values_list("dialogue", *self.sentence_fields)\
+                                                  .iterator():
+            dialogue = values[0]
+            if dialogue not in sentences:
+                sentences[dialogue] = []
+            sentences[dialogue].append(values[1:])
+
+        nexts = {}
+        for dialogue, next_dlg in DATA_SETS.dialogue_relations.objects.all()\
+                                                              .values_list("dialogue", "next_dlg")\
+                                                              .iterator():
+            if dialogue not in nexts:
+                nexts[dialogue] = []
+            nexts[dialogue].append(next_dlg)
+
+        dependencies = {}
+        for dialogue, dependency, dep_type in DATA_SETS.dialogue_quest_dependencies.objects.all()\
+                                                                              .values_list("dialogue", "dependency", "type")\
+                                                                              .iterator():
+            if dialogue not in dependencies:
+                dependencies[dialogue] = []
+            dependencies[dialogue].append((dependency, dep_type))
+
+        storage = {}
+        for dialogue, condition in DATA_SETS.dialogues.objects.all()\
+                                                      .values_list("key", "condition")\
+                                                      .iterator():
+            storage[dialogue] = self.build_dialogue(dialogue,
+                                                    condition,
+                                                    sentences.get(dialogue, []),
+                                                    nexts.get(dialogue, []),
+                                                    dependencies.get(dialogue, []))
+
+        self.dialogue_storage = storage
+
+    def get_memory_report(self):
+        """
+        Estimate the memory used by cached dialogues.
+
+        Returns:
+            (dict) number of dialogues, number of sentences, total bytes and
+                   bytes per dialogue.
+        """
+        counted = set()
+
+        def size_of(obj):
+            if id(obj) in counted:
+                return 0
+            counted.add(id(obj))
+
+            size = sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                for key, value in obj.items():
+                    size += size_of(key) + size_of(value)
+            elif isinstance(obj, (list, tuple)):
+                for item in obj:
+                    size += size_of(item)
+            elif isinstance(obj, DialogueSentence):
+                for field in DialogueSentence.__slots__:
+                    size += size_of(getattr(obj, field))
+            return size
+
+        total = size_of(self.dialogue_storage)
+        dialogues = len(self.dialogue_storage)
+        sentences = sum(len(data.get("sentences", [])) for data in self.dialogue_storage.values())
+
+        return {"dialogues": dialogues,
+                "sentences": sentences,
+                "bytes": total,
+                "bytes_per_dialogue": total / dialogues if dialogues else 0}
 
     def get_dialogue(self, dialogue):
         """
@@ -148,10 +289,10 @@ class DialogueHandler(object):
             return False
 
         sentence = sentences[0]
-        if sentence['is_last'] or\
-           sentence['action'] or\
-           sentence['complete_quest'] or\
-           sentence['provide_quest']:
+        if sentence.is_last or\
+           sentence.action or\
+           sentence.complete_quest or\
+           sentence.provide_quest:
             return False
 
         return True
@@ -187,8 +328,8 @@ class DialogueHandler(object):
         while self.check_need_get_next(sentences):
             sentences = self.get_next_sentences(caller,
                                                 npc.dbref,
-                                                sentences[0]['dialogue'],
-                                                sentences[0]['sentence'])
+                                                sentences[0].dialogue,
+                                                sentences[0].sentence)
             output = self.create_output_sentences(sentences, caller, npc)
             if output:
                 sentences_list.append(output)
@@ -231,8 +372,8 @@ class DialogueHandler(object):
         while self.check_need_get_next(sentences):
             sentences = self.get_next_sentences(caller,
                                                 npc,
-                                                sentences[0]['dialogue'],
-                                                sentences[0]['sentence'])
+                                                sentences[0].dialogue,
+                                                sentences[0].sentence)
             output = self.create_output_sentences(sentences, caller, npc)
             if output:
                 sentences_list.append(output)
@@ -241,6 +382,62 @@ class DialogueHandler(object):
 
         return sentences_list
 
+    def get_availability(self, caller, npc, kind, function):
+        """
+        Get a cached result of the NPC's availability to the caller. If it is
+        not cached, call the function to get the result.
+
+        Args:
+            caller: (object) the character.
+            npc: (object) the NPC.
+            kind: (string) the kind of the result.
+            function: (function) function(caller, npc) that calculates the result.
+
+        Returns:
+            the result
+        """
+        if caller.id not in self.availability_cache:
+            self.availability_cache[caller.id] = {}
+        character_cache = self.availability_cache[caller.id]
+
+        key = (npc.id, kind)
+        if key in character_cache:
+            self.cache_hits += 1
+            return character_cache[key]
+
+        self.cache_misses += 1
+        volatile_count = STATEMENT_HANDLER.volatile_count
+        result = function(caller, npc)
+
+        if STATEMENT_HANDLER.volatile_count == volatile_count:
+            # Does not use volatile conditions, so the result can be cached.
+            character_cache[key] = result
+
+        return result
+
+    def clear_character_cache(self, caller):
+        """
+        Remove a character's availability cache. It should be called when the
+        character's status that used in dialogues changes, such as quests,
+        inventory and attributes.
+
+        Args:
+            caller: (object) the character.
+        """
+        if caller.id in self.availability_cache:
+            del self.availability_cache[caller.id]
+
+    def get_cache_stats(self):
+        """
+        Get the counters of the availability cache.
+
+        Returns:
+            (dict) cache's hits, misses and the number of cached characters.
+        """
+        return {"hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "characters": len(self.availability_cache)}
+
     def get_npc_sentences(self, caller, npc):
         """
         Get NPC's sentences that can show to the caller.
@@ -258,6 +455,20 @@ class DialogueHandler(object):
         if not npc:
             return
 
+        sentences = self.get_availability(caller, npc, "sentences", self.match_npc_sentences)
+        return list(sentences)
+
+    def match_npc_sentences(self, caller, npc):
+        """
+        Find NPC's sentences that can show to the caller.
+
+        Args:
+            caller: (object) the character who want to start a talk.
+            npc: (object) the NPC that the character want to talk to.
+
+        Returns:
+            sentences: (list) a list of available sentences.
+        """
         sentences = []
 
         # Get npc's dialogues.
@@ -289,7 +500,7 @@ class DialogueHandler(object):
             # Default sentences should not have condition and dependencies.
             for dlg_key in npc.default_dialogues:
                 npc_dlg = self.get_dialogue(dlg_key)
-                if npc_dlg:
+                if npc_dlg and npc_dlg["sentences"]:
                     sentences.append(npc_dlg["sentences"][0])
             
         return sentences
@@ -363,9 +574,9 @@ class DialogueHandler(object):
 
         return speaker
 
-    def get_dialogue_speaker_icon(self, icon_str, caller, npc, speaker_model):
+    def get_dialogue_speaker_icon(self, icon_str, caller, npc, sentence):
         """
-        Get the speaker's text.
+        Get the speaker's icon.
         'p' means player.
         'n' means NPC.
         Use string in quotes directly.
@@ -380,10 +591,10 @@ class DialogueHandler(object):
             except Exception, e:
                 logger.log_errmsg("Load icon %s error: %s" % (icon_str, e))
         else:
-            if "%(n)" in speaker_model:
+            if sentence.speaker_npc:
                 if npc:
                     icon = getattr(npc, "icon", None)
-            elif "%(p)" in speaker_model:
+            elif sentence.speaker_player:
                 icon = getattr(caller, "icon", None)
 
         return icon
@@ -404,15 +615,15 @@ class DialogueHandler(object):
             return []
 
         sentences_list = []
-        speaker = self.get_dialogue_speaker_name(caller, npc, originals[0]["speaker_model"])
-        icon = self.get_dialogue_speaker_icon(originals[0]["icon"], caller, npc, originals[0]["speaker_model"])
+        speaker = self.get_dialogue_speaker_name(caller, npc, originals[0].speaker_model)
+        icon = self.get_dialogue_speaker_icon(originals[0].icon, caller, npc, originals[0])
         for original in originals:
             sentence = {"speaker": speaker,             # speaker's name
-                        "dialogue": original["dialogue"],   # dialogue's key
-                        "sentence": original["sentence"],   # sentence's ordinal
-                        "content": original["content"],
+                        "dialogue": original.dialogue,  # dialogue's key
+                        "sentence": original.sentence,  # sentence's ordinal
+                        "content": original.content,
                         "icon": icon,
-                        "can_close": original["can_close"],}
+                        "can_close": self.can_close_dialogue,}
             if npc:
                 sentence["npc"] = npc.dbref             # NPC's dbref
             else:
@@ -442,18 +653,18 @@ class DialogueHandler(object):
             return
 
         # do dialogue's action
-        if sentence["action"]:
-            STATEMENT_HANDLER.do_action(sentence["action"], caller, npc)
+        if sentence.action:
+            STATEMENT_HANDLER.do_action(sentence.action, caller, npc)
 
-        if sentence["is_last"]:
+        if sentence.is_last:
             # last sentence
             self.finish_dialogue(caller, dialogue)
 
-        if sentence["complete_quest"]:
-            caller.quest_handler.complete(sentence["complete_quest"])
+        if sentence.complete_quest:
+            caller.quest_handler.complete(sentence.complete_quest)
 
-        if sentence["provide_quest"]:
-            caller.quest_handler.accept(sentence["provide_quest"])
+        if sentence.provide_quest:
+            caller.quest_handler.accept(sentence.provide_quest)
 
     def finish_dialogue(self, caller, dialogue):
         """
@@ -472,33 +683,34 @@ class DialogueHandler(object):
         clear cache
         """
         self.dialogue_storage = {}
+        self.strings = {}
+        self.availability_cache = {}
 
     def get_npc_name(self, dialogue):
         """
         Get who says this dialogue.
         """
-        # Get record.
-        try:
-            record = DATA_SETS.npc_dialogues.objects.get(dialogue=dialogue)
-            return record.npc.name
-        except Exception, e:
-            pass
-
-        return ""
+        return NAME_RESOLVER.get_dialogue_npc_name(dialogue)
 
     def have_quest(self, caller, npc):
         """
         Check if the npc can complete or provide quests.
         Completing is higher than providing.
         """
-        provide_quest = False
-        complete_quest = False
-
         if not caller:
-            return (provide_quest, complete_quest)
+            return (False, False)
 
         if not npc:
-            return (provide_quest, complete_quest)
+            return (False, False)
+
+        return self.get_availability(caller, npc, "quest", self.match_npc_quests)
+
+    def match_npc_quests(self, caller, npc):
+        """
+        Find if the npc can complete or provide quests.
+        """
+        provide_quest = False
+        complete_quest = False
 
         accomplished_quests = caller.quest_handler.get_accomplished_quests()
 
@@ -544,12 +756,12 @@ class DialogueHandler(object):
 
         # find quests in its sentences
         for sen in npc_dlg["sentences"]:
-            if sen["complete_quest"] in accomplished_quests:
+            if sen.complete_quest in accomplished_quests:
                 complete_quest = True
                 return (provide_quest, complete_quest)
 
-            if not provide_quest and sen["provide_quest"]:
-                quest_key = sen["provide_quest"]
+            if not provide_quest and sen.provide_quest:
+                quest_key = sen.provide_quest
                 if caller.quest_handler.can_provide(quest_key):
                     provide_quest = True
                     if not accomplished_quests:
@@ -8,70 +8,123 @@ from muddery.statements.statement_handler import STATEMENT_HANDLER
 from muddery.utils import utils
 from muddery.worlddata.data_sets import DATA_SETS
 from django.conf import settings
-from django.apps import apps
 from evennia.utils import logger
 
 
 PERMISSION_BYPASS_EVENTS = {perm.lower() for perm in settings.PERMISSION_BYPASS_EVENTS}
 
 
-def get_event_additional_model():
+class EventRecord(dict):
     """
-    Set a dict of additional model names.
+    A read-only event record. Records are shared by all event handlers, so
+    they can not be modified.
     """
-    additional_model = {}
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Event records are read-only.")
 
-    # list event's additional data's model
-    for data_settings in DATA_SETS.event_additional_data:
-        for record in data_settings.objects.all():
-            key = record.serializable_value("key")
-            additional_model[key] = data_settings.model_name
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
 
-    return additional_model
+
+class EventIndex(object):
+    """
+    The index of all events: trigger_obj -> trigger_type -> [event records].
+    """
+    def __init__(self):
+        """
+        Initialize the index.
+        """
+        self.index = None
+
+    def clear(self):
+        """
+        Clear data.
+        """
+        self.index = None
+
+    def reload(self):
+        """
+        Load all events with one query per model.
+        """
+        # event's key: additional data
+        additional_data = {}
+        for data_settings in DATA_SETS.event_additional_data:
+            try:
+                field_names = [field.name for field in data_settings.model._meta.fields]
+                attnames = [field.attname for field in data_settings.model._meta.fields]
+                for values in data_settings.objects.all().values_list(*attnames).iterator():
+                    data = dict(zip(field_names, values))
+                    additional_data[data["key"]] = data
+            except Exception, e:
+                logger.log_errmsg("Can not load event data %s: %s" % (data_settings.model_name, e))
+
+        index = {}
+        try:
+            model = DATA_SETS.event_data.model
+            field_names = [field.name for field in model._meta.fields]
+            attnames = [field.attname for field in model._meta.fields]
+            for values in DATA_SETS.event_data.objects.all().values_list(*attnames).iterator():
+                event = dict(zip(field_names, values))
+
+                # Set additional data.
+                if event["key"] in additional_data:
+                    event.update(additional_data[event["key"]])
+
+                trigger_obj = event["trigger_obj"]
+                trigger_type = event["trigger_type"]
+                if trigger_obj not in index:
+                    index[trigger_obj] = {}
+                if trigger_type not in index[trigger_obj]:
+                    index[trigger_obj][trigger_type] = []
+                index[trigger_obj][trigger_type].append(EventRecord(event))
+        except Exception, e:
+            logger.log_errmsg("Can not load events: %s" % e)
+
+        # replace the old index at once
+        self.index = index
+
+    def get_events(self, trigger_obj):
+        """
+        Get an object's events.
+
+        Args:
+            trigger_obj: (string) the key of the trigger object
+
+        Returns:
+            (dict) trigger_type -> [event records]
+        """
+        index = self.index
+        if index is None:
+            self.reload()
+            index = self.index
+        return index.get(trigger_obj, {})
+
+
+# main event index
+EVENT_INDEX = EventIndex()
 
 
 class EventHandler(object):
     """
     """
-    _additional_model = get_event_additional_model()
-
     def __init__(self, owner):
         """
         Initialize the handler.
         """
         self.owner = owner
-        self.events = {}
-
-        # Load events.
-        event_records = DATA_SETS.event_data.objects.filter(trigger_obj=owner.get_data_key())
-
-        for record in event_records:
-            event = {}
-
-            # Set data.
-            event_type = record.type
-            trigger_type = record.trigger_type
-
-            for field in record._meta.fields:
-                event[field.name] = record.serializable_value(field.name)
-            event["type"] = event_type
-
-            # Set additional data.
-            if record.key in self._additional_model:
-                model_name = self._additional_model[record.key]
-                model_additional = apps.get_model(settings.WORLD_DATA_APP, model_name)
-
-                try:
-                    add_record = model_additional.objects.get(key = record.key)
-                    # Set data.
-                    for add_field in add_record._meta.fields:
-                        event[add_field.name] = add_record.serializable_value(add_field.name)
-                except Exception, e:
-                    pass
-
-            if not trigger_type in self.events:
-                self.events[trigger_type] = []
-            self.events[trigger_type].append(event)
+        self.owner_key = owner.get_data_key()
+
+    @property
+    def events(self):
+        """
+        Owner's events, shared with the event index.
+        """
+        return EVENT_INDEX.get_events(self.owner_key)
 
     def can_bypass(self, character):
         """
@@ -5,10 +5,13 @@ This module imports data from files to db.
 from __future__ import print_function
 
 import os
-import tempfile
 import zipfile
+from collections import deque
+from cStringIO import StringIO
+from multiprocessing.pool import ThreadPool
 from django.apps import apps
 from django.conf import settings
+from django.db import connection
 from evennia.utils import logger
 from evennia.settings_default import GAME_DIR
 from muddery.server.launcher import configs
@@ -39,9 +42,9 @@ def get_lines(model_name):
     yield [field.name for field in fields]
 
     # get records
-    for record in model_obj.objects.all():
-        line = [str(record.serializable_value(field.name)) for field in fields]
-        yield line
+    values_list = model_obj.objects.all().values_list(*[field.attname for field in fields])
+    for values in values_list.iterator():
+        yield [str(value) for value in values]
 
 
 def export_file(filename, model_name, file_type=None):
@@ -91,36 +94,177 @@ def export_path_all(path, file_type=None):
             export_file(filename, model_name, file_type)
 
 
-def export_zip_all(file, file_type=None):
+def export_model_data(model_name, writer_class):
     """
-    Export all tables to a zip file which contains a group of csv files.
+    Export a table to a string.
+
+    Args:
+        model_name: (string) db model's name.
+        writer_class: (class) data writer's class.
+
+    Returns:
+        (string) file's data
+    """
+    stream = StringIO()
+    writer = writer_class(stream=stream)
+    for line in get_lines(model_name):
+        writer.writeln(line)
+    writer.save()
+
+    return stream.getvalue()
+
+
+def export_model_data_in_thread(args):
+    """
+    Export a table in a worker thread.
+
+    Args:
+        args: (tuple) (model's name, writer's class)
+    """
+    try:
+        return export_model_data(*args)
+    finally:
+        # Each thread has its own database connection.
+        connection.close()
+
+
+class ZipStream(object):
+    """
+    A write only file object for zip archives. Written data is taken out by
+    pop(), so archives can be sent while they are being written.
+    """
+    def __init__(self):
+        self.buffer = []
+        self.position = 0
+
+    def write(self, data):
+        self.buffer.append(data)
+        self.position += len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        """
+        Take out written data.
+        """
+        data = "".join(self.buffer)
+        self.buffer = []
+        return data
+
+
+def iter_zip_all(file_type=None):
+    """
+    Export all tables to a zip file which contains a group of data files. Tables
+    are exported in a thread pool and the zip file is generated in pieces.
+
+    The file type, the version file and the first table are checked before
+    returning, so most errors are raised before the zip file is sent.
+
+    Args:
+        file_type: (string) data file's type.
+
+    Returns:
+        (generator) pieces of the zip file
     """
     if not file_type:
         # Set default file type.
         file_type = "csv"
 
     writer_class = writers.get_writer(file_type)
-    if writer_class:
-        # Get tempfile's name.
-        temp = tempfile.mktemp()
-        file_ext = writer_class.file_ext
+    if not writer_class:
+        raise MudderyError("Unknown file type: %s" % file_type)
+
+    version_file = os.path.join(GAME_DIR, configs.CONFIG_FILE)
+    if not os.path.isfile(version_file):
+        raise MudderyError("Can not find the version file: %s" % version_file)
+
+    # get model names
+    app_config = apps.get_app_config(settings.WORLD_DATA_APP)
+    model_names = [model._meta.object_name for model in app_config.get_models()]
+
+    # Export the first table at once.
+    first_data = None
+    if model_names:
+        first_data = export_model_data(model_names[0], writer_class)
+
+    return generate_zip(model_names, writer_class, first_data)
+
+
+def generate_zip(model_names, writer_class, first_data=None):
+    """
+    Generate a zip file of tables. At most settings.EXPORT_THREADS tables are
+    exported ahead of the one being written, so a slow download does not
+    keep all tables in memory.
+
+    Args:
+        model_names: (list) db models' names.
+        writer_class: (class) data writer's class.
+        first_data: (string) the first table's data if it has been exported.
+
+    Returns:
+        (generator) pieces of the zip file
+    """
+    file_ext = writer_class.file_ext
+    stream = ZipStream()
+    archive = zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED)
+    pool = ThreadPool(settings.EXPORT_THREADS)
+
+    # tables waiting to be exported
+    names = iter(model_names[1:] if first_data is not None else model_names)
+
+    # a deque of (model's name, async result)
+    pending = deque()
+
+    def submit():
+        model_name = next(names, None)
+        if model_name is not None:
+            result = pool.apply_async(export_model_data_in_thread, ((model_name, writer_class),))
+            pending.append((model_name, result))
+
+    try:
+        for i in xrange(settings.EXPORT_THREADS):
+            submit()
+
+        if first_data is not None:
+            archive.writestr(model_names[0] + "." + file_ext, first_data)
+            first_data = None
+            yield stream.pop()
+
+        while pending:
+            model_name, result = pending.popleft()
+            data = result.get()
+            submit()
+
+            archive.writestr(model_name + "." + file_ext, data)
+            data = None
+            yield stream.pop()
 
-        try:
-            archive = zipfile.ZipFile(file, 'w', zipfile.ZIP_DEFLATED)
-
-            # get model names
-            app_config = apps.get_app_config(settings.WORLD_DATA_APP)
-            for model in app_config.get_models():
-                model_name = model._meta.object_name
-                export_file(temp, model_name, file_type)
-                filename = model_name + "." + file_ext
-                archive.write(temp, filename)
-
-            # add version file
-            version_file = os.path.join(GAME_DIR, configs.CONFIG_FILE)
-            archive.write(version_file, configs.CONFIG_FILE)
-        finally:
-            os.remove(temp)
+        # add version file
+        version_file = os.path.join(GAME_DIR, configs.CONFIG_FILE)
+        with open(version_file, "rb") as config:
+            archive.writestr(configs.CONFIG_FILE, config.read())
+
+        archive.close()
+        yield stream.pop()
+    except Exception, e:
+        # Abort the stream, so the client does not get a truncated file as
+        # a complete one.
+        logger.log_tracemsg("Export game data error: %s" % e)
+        raise
+    finally:
+        pool.terminate()
+
+
+def export_zip_all(file, file_type=None):
+    """
+    Export all tables to a zip file which contains a group of csv files.
+    """
+    for data in iter_zip_all(file_type):
+        file.write(data)
 
 
 def export_resources(file):
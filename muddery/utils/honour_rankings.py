@@ -0,0 +1,149 @@
+"""
+Honour rankings keep characters sorted by their honours.
+
+It does not depend on the server, so it can be used in simulations.
+"""
+
+from bisect import bisect_left, insort
+
+
+class HonourRankings(object):
+    """
+    Keeps ranked characters in a list sorted by honour in descending order.
+    Updating a character's honour costs a bisect and a list insert instead of
+    sorting all characters.
+
+    Only characters whose honours are not negative are ranked. Characters with
+    the same honour have the same ranking, like 1, 2, 2, 4.
+    """
+    def __init__(self):
+        # character's id: honour
+        self.honours = {}
+
+        # sorted list of (-honour, character's id)
+        self.index = []
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, character_id):
+        return character_id in self.honours
+
+    def clear(self):
+        """
+        Clear all data.
+        """
+        self.honours = {}
+        self.index = []
+
+    def load(self, honours):
+        """
+        Load all characters' honours at once.
+
+        Args:
+            honours: (dict) {character's id: character's honour}
+        """
+        self.honours = dict(honours)
+        self.index = sorted((-honour, character_id)
+                            for character_id, honour in self.honours.iteritems()
+                            if honour >= 0)
+
+    def set(self, character_id, honour):
+        """
+        Set a character's honour.
+
+        Args:
+            character_id: (int) character's id
+            honour: (number) character's honour
+        """
+        self.remove(character_id)
+        self.honours[character_id] = honour
+        if honour >= 0:
+            insort(self.index, (-honour, character_id))
+
+    def remove(self, character_id):
+        """
+        Remove a character.
+
+        Args:
+            character_id: (int) character's id
+        """
+        if character_id not in self.honours:
+            return
+
+        honour = self.honours.pop(character_id)
+        if honour >= 0:
+            pos = bisect_left(self.index, (-honour, character_id))
+            del self.index[pos]
+
+    def get_honour(self, character_id):
+        """
+        Get a character's honour.
+
+        Raises:
+            KeyError: the character does not exist.
+        """
+        return self.honours[character_id]
+
+    def get_place(self, character_id):
+        """
+        Get a character's position in the rankings, starts from 0.
+
+        Returns:
+            (int) character's position, 0 if the character is not ranked.
+        """
+        honour = self.honours[character_id]
+        if honour < 0:
+            return 0
+        return bisect_left(self.index, (-honour, character_id))
+
+    def get_ranking(self, character_id):
+        """
+        Get a character's ranking, starts from 1.
+
+        Returns:
+            (int) character's ranking, 0 if the character is not ranked.
+        """
+        honour = self.honours[character_id]
+        if honour < 0:
+            return 0
+        return bisect_left(self.index, (-honour,)) + 1
+
+    def get_top(self, number):
+        """
+        Get top ranking characters.
+
+        Returns:
+            (list) characters' ids
+        """
+        return [item[1] for item in self.index[:number]]
+
+    def get_last(self, number):
+        """
+        Get last ranking characters.
+
+        Returns:
+            (list) characters' ids
+        """
+        if number <= 0:
+            return []
+        return [item[1] for item in self.index[-number:]]
+
+    def get_around(self, character_id, number):
+        """
+        Get characters around the given character.
+
+        Returns:
+            (list) characters' ids, including the given character
+        """
+        size = len(self.index)
+        begin = self.get_place(character_id) - number / 2
+        if begin < 0:
+            begin = 0
+        end = begin + number + 1
+        if end > size:
+            end = size
+            begin = end - number - 1
+            if begin < 0:
+                begin = 0
+        return [item[1] for item in self.index[begin:end]]
@@ -0,0 +1,182 @@
+"""
+InventoryHandler indexes a character's inventory by objects' data keys, so
+objects can be found and counted without scanning all contents.
+"""
+
+from __future__ import print_function
+
+from evennia.utils.utils import dbref as dbref_to_id
+from muddery.utils.data_key_index import DATA_KEY_INDEX
+
+
+class InventoryHandler(object):
+    """
+    Keeps a character's inventory in memory. The index is built when it is
+    used at the first time, then it is updated by the character's hooks.
+    """
+    def __init__(self, owner):
+        """
+        Initialize handler.
+
+        Args:
+            owner: (object) the character
+        """
+        self.owner = owner
+
+        # data key: a list of objects in the order of their ids
+        self.stacks = None
+
+        # data key: the total number of objects
+        self.totals = {}
+
+        # object's id: (object, data key, number)
+        self.objects = {}
+
+    def reset(self):
+        """
+        Clear the index, it will be built again when it is used.
+        """
+        self.stacks = None
+        self.totals = {}
+        self.objects = {}
+
+    def build(self):
+        """
+        Build the index from the owner's contents.
+        """
+        self.stacks = {}
+        self.totals = {}
+        self.objects = {}
+        for item in self.owner.contents:
+            self.add(item)
+
+    def check(self):
+        """
+        Build the index if it has not been built.
+        """
+        if self.stacks is None:
+            self.build()
+
+    def add(self, obj):
+        """
+        Add an object to the index, or update it if it is already in the index.
+        """
+        if self.stacks is None:
+            # will add it when building the index
+            return
+
+        self.discard(obj.id)
+
+        key = DATA_KEY_INDEX.get_value("key", obj.id)
+        if key is None:
+            key = obj.get_data_key()
+        number = obj.db.number or 0
+
+        self.objects[obj.id] = (obj, key, number)
+        self.totals[key] = self.totals.get(key, 0) + number
+
+        if key not in self.stacks:
+            self.stacks[key] = [obj]
+        else:
+            stack = self.stacks[key]
+            stack.append(obj)
+            if len(stack) > 1 and stack[-2].id > obj.id:
+                stack.sort(key=lambda item: item.id)
+
+    def discard(self, obj_id):
+        """
+        Remove an object from the index.
+
+        Args:
+            obj_id: (int) object's id
+        """
+        if self.stacks is None:
+            return
+
+        info = self.objects.pop(obj_id, None)
+        if not info:
+            return
+
+        obj, key, number = info
+        total = self.totals.get(key, 0) - number
+        if total:
+            self.totals[key] = total
+        else:
+            self.totals.pop(key, None)
+
+        stack = self.stacks[key]
+        for i, item in enumerate(stack):
+            if item is obj:
+                del stack[i]
+                break
+        if not stack:
+            del self.stacks[key]
+
+    def update(self, obj):
+        """
+        Update an object's data key and number.
+        """
+        if obj.location == self.owner:
+            self.add(obj)
+        else:
+            self.discard(obj.id)
+
+    def has(self, key):
+        """
+        If the owner has objects of this data key.
+        """
+        self.check()
+        return key in self.stacks
+
+    def get(self, key):
+        """
+        Get objects of a data key.
+
+        Returns:
+            (list) objects in the order of their ids
+        """
+        self.check()
+        return list(self.stacks.get(key, ()))
+
+    def get_number(self, key):
+        """
+        Get the total number of objects of a data key.
+        """
+        self.check()
+        return self.totals.get(key, 0)
+
+    def get_smallest(self, key):
+        """
+        Get the smallest stack of a data key.
+
+        Returns:
+            (object) the object, or None if the owner does not have it
+        """
+        self.check()
+        stack = self.stacks.get(key)
+        if not stack:
+            return None
+
+        objects = self.objects
+        return min(stack, key=lambda item: objects[item.id][2])
+
+    def get_by_dbref(self, dbref):
+        """
+        Get an object by its dbref.
+
+        Returns:
+            (object) the object, or None if the owner does not have it
+        """
+        self.check()
+        info = self.objects.get(dbref_to_id(dbref))
+        return info[0] if info else None
+
+    def all(self):
+        """
+        Get all objects in the inventory.
+
+        Returns:
+            (list) objects in the order of their ids
+        """
+        self.check()
+        return sorted((info[0] for info in self.objects.itervalues()), key=lambda item: item.id)
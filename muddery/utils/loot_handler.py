@@ -1,5 +1,9 @@
 """
 LootHandler handles matters of loots.
+
+Loot records of every provider are compiled into a LootTable once and shared
+by all providers with the same key. Drops can be rolled for many looters or
+many kills at once.
 """
 
 import random
@@ -10,6 +14,175 @@ from muddery.utils.localized_strings_handler import _
 from muddery.statements.statement_handler import STATEMENT_HANDLER
 from muddery.utils.exception import MudderyError
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class LootTable(object):
+    """
+    A provider's loot records in parallel tuples. It should not be changed
+    after it is created.
+    """
+    def __init__(self, records):
+        """
+        Args:
+            records: (list) a list of (object's key, number, odds, quest's key, condition)
+        """
+        self.objects = tuple(record[0] for record in records)
+        self.numbers = tuple(record[1] for record in records)
+        self.odds = tuple(record[2] for record in records)
+        self.quests = tuple(record[3] for record in records)
+        self.conditions = tuple(record[4] for record in records)
+
+        # compiled conditions, None if there is no condition
+        self.compiled = tuple(STATEMENT_HANDLER.compile_condition(condition) if condition else None
+                              for condition in self.conditions)
+
+        if numpy:
+            self.odds_array = numpy.array(self.odds, dtype=float)
+        else:
+            self.odds_array = None
+
+    def __len__(self):
+        return len(self.objects)
+
+    def get_loot(self, index):
+        """
+        Get a loot's information.
+
+        Returns:
+            (dict) loot's information
+        """
+        return {"object": self.objects[index],
+                "number": self.numbers[index],
+                "odds": self.odds[index],
+                "quest": self.quests[index],
+                "condition": self.conditions[index]}
+
+    def can_loot(self, index, looter, owner):
+        """
+        Check a loot's quest and condition.
+        """
+        quest = self.quests[index]
+        if quest:
+            if looter.quest_handler:
+                if not looter.quest_handler.is_not_accomplished(quest):
+                    return False
+
+        compiled = self.compiled[index]
+        if compiled:
+            if not STATEMENT_HANDLER.check_compiled(compiled, looter, owner):
+                return False
+
+        return True
+
+
+class LootTableHandler(object):
+    """
+    Keeps compiled loot tables and the random generator of drops.
+    """
+    def __init__(self):
+        """
+        Initialize handler
+        """
+        # (model's name, provider's key): loot table
+        self.tables = {}
+
+        self.random = random.Random()
+        self.numpy_random = numpy.random.RandomState() if numpy else None
+
+    def clear(self):
+        """
+        Clear data.
+        """
+        self.tables = {}
+
+    def seed(self, seed=None):
+        """
+        Seed the random generator, so drops can be repeated.
+
+        Args:
+            seed: (int) random seed
+        """
+        self.random.seed(seed)
+        if self.numpy_random:
+            self.numpy_random.seed(seed)
+
+    def get_table(self, model, provider):
+        """
+        Get a provider's loot table, compile it if it has not been compiled.
+
+        Args:
+            model: (model) loot list model
+            provider: (string) provider's key
+
+        Returns:
+            (LootTable) the loot table
+        """
+        table_key = (model.__name__, provider)
+        table = self.tables.get(table_key)
+        if table is not None:
+            return table
+
+        records = []
+        try:
+            records = model.objects.filter(provider=provider)\
+                .values_list("object", "number", "odds", "quest", "condition")
+            records = list(records)
+        except Exception, e:
+            logger.log_errmsg("Can't load loot info %s: %s" % (provider, e))
+
+        table = LootTable(records)
+        self.tables[table_key] = table
+        return table
+
+    def roll_odds(self, table, times):
+        """
+        Roll the odds of all loots several times.
+
+        Args:
+            table: (LootTable) the loot table
+            times: (int) the number of rolls
+
+        Returns:
+            (list) a list of lists of dropped loots' indexes
+        """
+        if not len(table) or times <= 0:
+            return [[] for i in xrange(times)]
+
+        if numpy:
+            rolls = self.numpy_random.random_sample((times, len(table))) <= table.odds_array
+            return [row.nonzero()[0].tolist() for row in rolls]
+
+        odds = table.odds
+        rand = self.random.random
+        return [[index for index in xrange(len(odds)) if rand() <= odds[index]]
+                for i in xrange(times)]
+
+    def roll(self, table, looters, owner):
+        """
+        Roll drops for looters. Every looter has one roll.
+
+        Args:
+            table: (LootTable) the loot table
+            looters: (list) looters
+            owner: (object) the provider of loots
+
+        Returns:
+            (list) a list of dropped objects' information of every looter
+        """
+        results = []
+        for looter, indexes in zip(looters, self.roll_odds(table, len(looters))):
+            results.append([table.get_loot(index) for index in indexes
+                            if table.can_loot(index, looter, owner)])
+        return results
+
+
+# main loot table handler
+LOOT_TABLES = LootTableHandler()
+
 
 class LootHandler(object):
     """
@@ -21,58 +194,46 @@ class LootHandler(object):
         Initialize handler
         """
         self.owner = owner
-        self.loot_list = []
+        self.table = None
 
         if not owner:
             return
 
         # load loot data
-        loot_list = []
-        try:
-            loot_records = model.objects.filter(provider=self.owner.get_data_key())
-
-            for loot_record in loot_records:
-                loot_object = {"object": loot_record.serializable_value("object"),
-                               "number": loot_record.number,
-                               "odds": loot_record.odds,
-                               "quest": loot_record.serializable_value("quest"),
-                               "condition": loot_record.condition}
-                loot_list.append(loot_object)
-        except Exception, e:
-            logger.log_errmsg("Can't load loot info %s: %s" % (self.owner.get_data_key(), e))
+        self.table = LOOT_TABLES.get_table(model, self.owner.get_data_key())
 
-        self.loot_list = loot_list
+    @property
+    def loot_list(self):
+        """
+        All loots' information.
+        """
+        if not self.table:
+            return []
+        return [self.table.get_loot(index) for index in xrange(len(self.table))]
 
     def get_obj_list(self, looter):
         """
         Get a list of objects that dropped.
-        
+
         Returns:
             (list) a list of object's information
         """
+        return self.get_obj_lists([looter])[0]
 
-        def can_loot(self, looter, obj):
-            """
-            help function to decide which objects can be looted.
-            """
-            rand = random.random()
-            if obj["odds"] < rand:
-                return False
-
-            if obj["quest"]:
-                if looter.quest_handler:
-                    if not looter.quest_handler.is_not_accomplished(obj["quest"]):
-                        return False
-
-            if not STATEMENT_HANDLER.match_condition(obj["condition"], looter, self.owner):
-                return False
+    def get_obj_lists(self, looters):
+        """
+        Get objects that dropped for several looters at once.
 
-            return True
+        Args:
+            looters: (list) looters
 
-        # Get objects that matches odds and conditions .
-        obj_list = [obj for obj in self.loot_list if can_loot(self, looter, obj)]
+        Returns:
+            (list) a list of object lists, one for each looter
+        """
+        if not self.table:
+            return [[] for looter in looters]
 
-        return obj_list
+        return LOOT_TABLES.roll(self.table, looters, self.owner)
 
     def loot(self, looter):
         """
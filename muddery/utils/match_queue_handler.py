@@ -6,14 +6,14 @@ from __future__ import print_function
 
 from collections import deque
 import time
-import math
+import weakref
 from django.conf import settings
 from twisted.internet import reactor
 from twisted.internet import task
 from evennia.utils import logger
 from evennia import create_script
-from evennia.utils.search import search_object
 from muddery.dao.honours_mapper import HONOURS_MAPPER
+from muddery.utils.matchmaker import Matchmaker
 from muddery.utils.localized_strings_handler import _
 
 
@@ -21,9 +21,10 @@ class MatchQueueHandler(object):
     """
     This model translates default strings into localized strings.
     """
-    max_candidates = 20
-    max_honour_diff = 200
     min_waiting_time = 5
+    base_honour_window = 50
+    honour_window_growth = 5
+    max_honour_window = 400
     preparing_time = 10
     ave_samples_number = 20
     match_interval = 10
@@ -32,8 +33,17 @@ class MatchQueueHandler(object):
         """
         Initialize handler
         """
-        self.queue = deque()
+        self.matchmaker = Matchmaker(self.min_waiting_time,
+                                     self.base_honour_window,
+                                     self.honour_window_growth,
+                                     self.max_honour_window)
+
+        # character's id: weak reference of the character
+        self.characters = {}
+
+        # character's id: join time
         self.waiting_time = {}
+
         self.preparing = {}
         self.ave_samples = deque()
         self.ave_waiting = -1
@@ -48,6 +58,18 @@ class MatchQueueHandler(object):
         if self.loop and self.loop.running:
             self.loop.stop()
 
+    def get_character(self, character_id):
+        """
+        Get a queued character by its id.
+
+        Returns:
+            (object) the character, or None if it does not exist
+        """
+        ref = self.characters.get(character_id)
+        if ref is None:
+            return None
+        return ref()
+
     def add(self, character):
         """
         Add a character to the queue.
@@ -56,102 +78,103 @@ class MatchQueueHandler(object):
 
         if character_id in self.waiting_time:
             return
-        
-        self.queue.append(character_id)
-        self.waiting_time[character_id] = time.time()
+
+        time_now = time.time()
+        self.characters[character_id] = weakref.ref(character)
+        self.waiting_time[character_id] = time_now
+        self.matchmaker.add(character_id, HONOURS_MAPPER.get_honour(character, 0), time_now)
         character.msg({"in_combat_queue": self.ave_waiting})
 
     def remove_by_id(self, character_id):
         """
         Remove a character from the queue.
         """
-        character = search_object("#%s" % character_id)
+        character = self.get_character(character_id)
         if character:
-            self.remove(character[0])
+            self.remove(character)
+        else:
+            self.discard(character_id)
 
     def remove(self, character):
         """
         Remove a character from the queue.
         """
-        character_id = character.id
+        self.discard(character.id)
+        character.msg({"left_combat_queue": ""})
+
+    def discard(self, character_id):
+        """
+        Remove a character's data from the queue.
+        """
+        self.matchmaker.remove(character_id)
 
         if character_id in self.waiting_time:
             del self.waiting_time[character_id]
-            self.queue.remove(character_id)
+
+        if character_id in self.characters:
+            del self.characters[character_id]
 
         if character_id in self.preparing:
             del self.preparing[character_id]
 
-        character.msg({"left_combat_queue": ""})
+    def can_match(self, character_id):
+        """
+        If the character can be matched now.
+        """
+        character = self.get_character(character_id)
+        if not character:
+            return False
+
+        return not character.is_in_combat()
 
     def match(self):
         """
-        Match opponents according to character's scores.
-        The longer a character in the queue, the score is higher.
-        The nearer of two character's rank, the score is higher.
+        Match opponents according to character's honours.
+        The longer a character in the queue, the wider its honour window is.
         """
-        if len(self.queue) < 2:
+        if len(self.matchmaker) < 2:
             return
 
         time_now = time.time()
-        candidates = []
-        count = 0
-        max = self.max_candidates
-        for id in self.queue:
-            if count >= max:
-                break
-                
-            if id in self.preparing:
-                continue
-                
-            characters = search_object("#%s" % id)
-            if not characters or characters[0].is_in_combat():
-                continue
-
-            candidates.append(id)
-            count += 1
-
-        max_score = 0
-        opponents = ()
-        for i in xrange(len(candidates) - 1):
-            for j in xrange(i + 1, len(candidates)):
-                score_A = time_now - self.waiting_time[candidates[i]]
-                score_B = time_now - self.waiting_time[candidates[j]]
-                honour_A = HONOURS_MAPPER.get_honour_by_id(candidates[i], 0)
-                honour_B = HONOURS_MAPPER.get_honour_by_id(candidates[j], 0)
-                score_C = self.max_honour_diff - math.fabs(honour_A - honour_B)
-
-                if score_A <= self.min_waiting_time or score_B <= self.min_waiting_time or score_C <= 0:
-                    break
-
-                score = score_A + score_B + score_C
-                if score > max_score:
-                    max_score = score
-                opponents = candidates[i], candidates[j]
-        
-        if opponents:
-            self.preparing[opponents[0]] = {"time": time.time(),
+        pairs = self.matchmaker.match(time_now, self.can_match)
+
+        for opponents in pairs:
+            self.preparing[opponents[0]] = {"time": time_now,
                                             "opponent": opponents[1],
                                             "confirmed": False}
-            self.preparing[opponents[1]] = {"time": time.time(),
+            self.preparing[opponents[1]] = {"time": time_now,
                                             "opponent": opponents[0],
                                             "confirmed": False}
-            character_A = search_object("#%s" % opponents[0])
-            character_B = search_object("#%s" % opponents[1])
+            character_A = self.get_character(opponents[0])
+            character_B = self.get_character(opponents[1])
             if character_A:
-                character_A[0].msg({"prepare_match": self.preparing_time})
+                character_A.msg({"prepare_match": self.preparing_time})
             if character_B:
-                character_B[0].msg({"prepare_match": self.preparing_time})
+                character_B.msg({"prepare_match": self.preparing_time})
             reactor.callLater(self.preparing_time, self.fight, opponents)
 
             self.ave_samples.append(time_now - self.waiting_time[opponents[0]])
             self.ave_samples.append(time_now - self.waiting_time[opponents[1]])
 
+        if pairs:
             while len(self.ave_samples) > self.ave_samples_number:
                 self.ave_samples.popleft()
 
             self.ave_waiting = float(sum(self.ave_samples)) / len(self.ave_samples)
 
+    def requeue(self, character_id):
+        """
+        Put a character which has been matched back to the queue.
+        """
+        if character_id in self.preparing:
+            del self.preparing[character_id]
+
+        character = self.get_character(character_id)
+        if character and character_id in self.waiting_time:
+            self.matchmaker.add(character_id,
+                                HONOURS_MAPPER.get_honour(character, 0),
+                                self.waiting_time[character_id])
+
     def confirm(self, character):
         """
         Confirm an honour combat.
@@ -172,15 +195,13 @@ class MatchQueueHandler(object):
 
         opponent_id = self.preparing[character_id]["opponent"]
 
-        character = search_object("#%s" % character_id)
-        if character:
-            character[0].msg({"match_rejected": character_id})
-            del self.preparing[character_id]
+        character.msg({"match_rejected": character_id})
+        del self.preparing[character_id]
 
-        opponent = search_object("#%s" % opponent_id)
+        opponent = self.get_character(opponent_id)
         if opponent:
-            opponent[0].msg({"match_rejected": character_id})
-            del self.preparing[opponent_id]
+            opponent.msg({"match_rejected": character_id})
+        self.requeue(opponent_id)
 
         self.remove_by_id(character_id)
 
@@ -191,48 +212,46 @@ class MatchQueueHandler(object):
         confirmed0 = opponents[0] in self.preparing and self.preparing[opponents[0]]["confirmed"]
         confirmed1 = opponents[1] in self.preparing and self.preparing[opponents[1]]["confirmed"]
 
+        opponent0 = self.get_character(opponents[0])
+        opponent1 = self.get_character(opponents[1])
+
         if not confirmed0 and not confirmed1:
             self.remove_by_id(opponents[0])
             self.remove_by_id(opponents[1])
 
-            opponent0 = search_object("#%s" % opponents[0])
-            opponent0[0].msg({"match_rejected": opponents[0],
-                              "left_combat_queue": ""})
-            opponent1 = search_object("#%s" % opponents[1])
-            opponent1[0].msg({"match_rejected": opponents[1],
-                              "left_combat_queue": ""})
+            if opponent0:
+                opponent0.msg({"match_rejected": opponents[0],
+                               "left_combat_queue": ""})
+            if opponent1:
+                opponent1.msg({"match_rejected": opponents[1],
+                               "left_combat_queue": ""})
         elif not confirmed0:
             # opponents 0 not confirmed
             self.remove_by_id(opponents[0])
-            if opponents[1] in self.preparing:
-                del self.preparing[opponents[1]]
+            self.requeue(opponents[1])
 
-            opponent0 = search_object("#%s" % opponents[0])
-            opponent0[0].msg({"match_rejected": opponents[0],
-                              "left_combat_queue": ""})
-
-            opponent1 = search_object("#%s" % opponents[1])
-            opponent1[0].msg({"match_rejected": opponents[0]})
+            if opponent0:
+                opponent0.msg({"match_rejected": opponents[0],
+                               "left_combat_queue": ""})
+            if opponent1:
+                opponent1.msg({"match_rejected": opponents[0]})
         elif not confirmed1:
             # opponents 1 not confirmed
             self.remove_by_id(opponents[1])
-            if opponents[0] in self.preparing:
-                del self.preparing[opponents[0]]
-
-            opponent1 = search_object("#%s" % opponents[1])
-            opponent1[0].msg({"match_rejected": opponents[1],
-                              "left_combat_queue": ""})
+            self.requeue(opponents[0])
 
-            opponent0 = search_object("#%s" % opponents[0])
-            opponent0[0].msg({"match_rejected": opponents[1]})
+            if opponent1:
+                opponent1.msg({"match_rejected": opponents[1],
+                               "left_combat_queue": ""})
+            if opponent0:
+                opponent0.msg({"match_rejected": opponents[1]})
         elif confirmed0 and confirmed1:
             # all confirmed
-            opponent0 = search_object("#%s" % opponents[0])
-            opponent1 = search_object("#%s" % opponents[1])
-            # create a new combat handler
-            chandler = create_script(settings.HONOUR_COMBAT_HANDLER)
-            # set combat team and desc
-            chandler.set_combat({1:[opponent0[0]], 2:[opponent1[0]]}, _("Fight of Honour"), settings.AUTO_COMBAT_TIMEOUT)
+            if opponent0 and opponent1:
+                # create a new combat handler
+                chandler = create_script(settings.HONOUR_COMBAT_HANDLER)
+                # set combat team and desc
+                chandler.set_combat({1:[opponent0], 2:[opponent1]}, _("Fight of Honour"), settings.AUTO_COMBAT_TIMEOUT)
 
             self.remove_by_id(opponents[0])
             self.remove_by_id(opponents[1])
@@ -0,0 +1,186 @@
+"""
+Matchmaker matches waiting characters by their honours.
+
+It does not depend on the server, so it can be used in simulations.
+"""
+
+from bisect import bisect_left, insort
+
+
+class Matchmaker(object):
+    """
+    Keeps waiting characters in a list sorted by honour. A character can be
+    matched with an opponent whose honour is in its honour window, the window
+    widens with the character's waiting time.
+    """
+    def __init__(self, min_waiting_time=5, base_window=50, window_growth=5, max_window=400):
+        """
+        Args:
+            min_waiting_time: (number) characters must wait at least this time
+            base_window: (number) the honour window when a character joins
+            window_growth: (number) the window grows this value per second
+            max_window: (number) max honour window
+        """
+        self.min_waiting_time = min_waiting_time
+        self.base_window = base_window
+        self.window_growth = window_growth
+        self.max_window = max_window
+
+        # sorted list of (honour, character's id)
+        self.index = []
+
+        # character's id: (honour, join time)
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, character_id):
+        return character_id in self.entries
+
+    def add(self, character_id, honour, join_time):
+        """
+        Add a character.
+
+        Args:
+            character_id: (int) character's id
+            honour: (number) character's honour
+            join_time: (number) the time when the character joined the queue
+        """
+        if character_id in self.entries:
+            return
+
+        self.entries[character_id] = (honour, join_time)
+        insort(self.index, (honour, character_id))
+
+    def remove(self, character_id):
+        """
+        Remove a character.
+
+        Args:
+            character_id: (int) character's id
+
+        Returns:
+            (tuple) the character's (honour, join time), or None if the
+                    character is not waiting
+        """
+        entry = self.entries.pop(character_id, None)
+        if entry is None:
+            return None
+
+        pos = bisect_left(self.index, (entry[0], character_id))
+        del self.index[pos]
+        return entry
+
+    def get_join_time(self, character_id):
+        """
+        Get the time when the character joined.
+        """
+        return self.entries[character_id][1]
+
+    def get_window(self, waiting_time):
+        """
+        Get the honour window of a character.
+
+        Args:
+            waiting_time: (number) character's waiting time
+
+        Returns:
+            (number) max honour difference
+        """
+        window = self.base_window + self.window_growth * waiting_time
+        if window > self.max_window:
+            window = self.max_window
+        return window
+
+    def match(self, time_now, can_match=None):
+        """
+        Match characters, the characters who wait longer are matched first.
+        Matched characters are removed.
+
+        Args:
+            time_now: (number) current time
+            can_match: (function) can_match(character_id) returns if the
+                       character can be matched now. Optional.
+
+        Returns:
+            (list) a list of matched pairs (character's id, opponent's id)
+        """
+        pairs = []
+        min_join_time = time_now - self.min_waiting_time
+
+        ready = sorted((join_time, character_id)
+                       for character_id, (honour, join_time) in self.entries.iteritems()
+                       if join_time <= min_join_time)
+
+        # the characters can not match in this turn
+        skipped = set()
+
+        for join_time, character_id in ready:
+            if character_id not in self.entries or character_id in skipped:
+                # already matched
+                continue
+
+            if can_match and not can_match(character_id):
+                skipped.add(character_id)
+                continue
+
+            honour = self.entries[character_id][0]
+            window = self.get_window(time_now - join_time)
+            opponent_id = self.find_opponent(character_id, honour, window, min_join_time,
+                                             can_match, skipped)
+            if opponent_id is None:
+                continue
+
+            self.remove(character_id)
+            self.remove(opponent_id)
+            pairs.append((character_id, opponent_id))
+
+        return pairs
+
+    def find_opponent(self, character_id, honour, window, min_join_time, can_match, skipped):
+        """
+        Find the nearest opponent in the honour window.
+
+        Returns:
+            (int) opponent's id or None
+        """
+        entries = self.entries
+        index = self.index
+        pos = bisect_left(index, (honour, character_id))
+        left = pos - 1
+        right = pos + 1
+        size = len(index)
+
+        while True:
+            left_diff = honour - index[left][0] if left >= 0 else None
+            right_diff = index[right][0] - honour if right < size else None
+            if left_diff is not None and left_diff > window:
+                left_diff = None
+                left = -1
+            if right_diff is not None and right_diff > window:
+                right_diff = None
+                right = size
+
+            if left_diff is None and right_diff is None:
+                return None
+
+            if right_diff is None or (left_diff is not None and left_diff <= right_diff):
+                candidate = index[left][1]
+                left -= 1
+            else:
+                candidate = index[right][1]
+                right += 1
+
+            if candidate in skipped:
+                continue
+
+            if entries[candidate][1] > min_join_time:
+                # has not waited enough time
+                continue
+
+            if can_match and not can_match(candidate):
+                skipped.add(candidate)
+                continue
+
+            return candidate
@@ -0,0 +1,167 @@
+"""
+Message coalescer merges messages sent to a session in one reactor turn into
+one frame.
+
+Messages are dicts of {message type: data}. Messages of the same type are
+kept in order, except types in settings.MSG_COALESCE_REPLACE_KEYS, which show
+the whole state of something (like status or inventory), only the last one of
+them is sent.
+"""
+
+from __future__ import print_function
+
+import json
+import time
+from collections import OrderedDict
+from twisted.internet import reactor
+from django.conf import settings
+from evennia.utils import logger
+
+
+class MessageCoalescer(object):
+    """
+    Keeps messages until the end of the reactor turn.
+    """
+    def __init__(self, replace_keys=None):
+        """
+        Args:
+            replace_keys: (list) message types that only the last one is sent
+        """
+        if replace_keys is None:
+            replace_keys = settings.MSG_COALESCE_REPLACE_KEYS
+        self.replace_keys = set(replace_keys)
+
+        # session's id: [session, frame, number of messages],
+        # a frame is a list of OrderedDicts
+        self.pending = OrderedDict()
+        self.flush_call = None
+
+        # metrics
+        self.start_time = time.time()
+        self.messages = 0
+        self.sent_messages = 0
+        self.frames = 0
+        self.replaced = 0
+
+    def can_coalesce(self, text, options, kwargs):
+        """
+        Only dict messages without protocol options can be merged.
+        """
+        return isinstance(text, dict) and not options and not kwargs
+
+    def send(self, session, text, options=None, **kwargs):
+        """
+        Send a message to a session. Dict messages are kept until the end of
+        the reactor turn, other messages are sent at once after the kept ones.
+
+        Args:
+            session: (Session) the session to send to
+            text: (dict or string) the message
+            options: (dict) protocol options
+        """
+        if not self.can_coalesce(text, options, kwargs):
+            # the session sends kept messages first
+            session.msg(text=text, options=options, **kwargs)
+            return
+
+        if session.sessid not in self.pending:
+            self.pending[session.sessid] = [session, [], 0]
+        kept = self.pending[session.sessid]
+
+        self.merge(kept[1], text)
+        kept[2] += 1
+        self.messages += 1
+
+        if not self.flush_call or not self.flush_call.active():
+            self.flush_call = reactor.callLater(0, self.flush)
+
+    def merge(self, frame, message):
+        """
+        Merge a message into a frame.
+
+        Args:
+            frame: (list) a list of OrderedDicts
+            message: (dict) the message to add
+        """
+        for key, value in message.iteritems():
+            if key in self.replace_keys:
+                # last writer wins
+                for part in frame:
+                    if key in part:
+                        del part[key]
+                        self.replaced += 1
+                        break
+
+            if not frame or key in frame[-1]:
+                # the client handles a dict's keys one by one, so the same
+                # type of messages must be in different dicts
+                frame.append(OrderedDict())
+            frame[-1][key] = value
+
+    def flush_session(self, sessid):
+        """
+        Send a session's kept messages. It is called by the session before
+        sending any other message, so messages keep their order whichever
+        way they are sent.
+        """
+        kept = self.pending.pop(sessid, None)
+        if not kept:
+            return
+        session, frame, count = kept
+
+        texts = []
+        for part in frame:
+            if not part:
+                continue
+            try:
+                texts.append(json.dumps(part))
+            except Exception, e:
+                texts.append(json.dumps({"err": "There is an error occurred while outputing messages."}))
+                logger.log_tracemsg("json.dumps failed: %s" % e)
+
+        if texts:
+            # the client shows every text of a frame in order
+            session.msg(text=texts, options={"raw": True})
+            self.frames += 1
+            self.sent_messages += count
+
+    def flush(self):
+        """
+        Send all kept messages.
+        """
+        self.flush_call = None
+        while self.pending:
+            sessid = next(iter(self.pending))
+            try:
+                self.flush_session(sessid)
+            except Exception, e:
+                logger.log_tracemsg("Send messages error: %s" % e)
+
+    def reset_stats(self):
+        """
+        Reset metrics.
+        """
+        self.start_time = time.time()
+        self.messages = 0
+        self.sent_messages = 0
+        self.frames = 0
+        self.replaced = 0
+
+    def get_stats(self):
+        """
+        Get metrics since the last reset.
+
+        Returns:
+            (dict) metrics
+        """
+        saved = self.sent_messages - self.frames
+        duration = time.time() - self.start_time
+        return {"messages": self.messages,
+                "frames": self.frames,
+                "replaced": self.replaced,
+                "frames_saved": saved,
+                "frames_saved_per_second": saved / duration if duration > 0 else 0}
+
+
+# main message coalescer
+MESSAGE_COALESCER = MessageCoalescer()
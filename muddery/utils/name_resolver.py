@@ -0,0 +1,99 @@
+"""
+Name resolver gets objects' display names by their keys without querying
+world data. Names are loaded from the object data snapshot, then translated
+by localized strings of the "name" category.
+"""
+
+from __future__ import print_function
+
+from evennia.utils import logger
+from muddery.utils.object_data_handler import OBJECT_DATA_HANDLER
+from muddery.utils.localized_strings_handler import LOCALIZED_STRINGS_HANDLER
+from muddery.worlddata.data_sets import DATA_SETS
+
+
+class NameResolver(object):
+    """
+    Keeps all objects' display names in memory.
+    """
+    # localized strings' category of names
+    category = "name"
+
+    def __init__(self):
+        """
+        Initialize handler
+        """
+        # object's key: display name
+        self.names = None
+
+        # dialogue's key: npc's key
+        self.dialogue_npcs = {}
+
+    def clear(self):
+        """
+        Clear data.
+        """
+        self.names = None
+        self.dialogue_npcs = {}
+
+    def reload(self):
+        """
+        Load all names. It should be called after objects' data and localized
+        strings have been loaded.
+        """
+        names = {}
+        for key, records in OBJECT_DATA_HANDLER.get_snapshot().records.iteritems():
+            for model_name, field_names, row in records:
+                if "name" in field_names:
+                    name = row[field_names.index("name")]
+                    if name:
+                        names[key] = LOCALIZED_STRINGS_HANDLER.translate(name, self.category)
+                        break
+
+        dialogue_npcs = {}
+        try:
+            for dialogue, npc in DATA_SETS.npc_dialogues.objects.all().values_list("dialogue", "npc"):
+                dialogue_npcs[dialogue] = npc
+        except Exception, e:
+            logger.log_errmsg("Can not load npcs' dialogues: %s" % e)
+
+        self.names = names
+        self.dialogue_npcs = dialogue_npcs
+
+    def get_name(self, key, default=""):
+        """
+        Get an object's display name.
+
+        Args:
+            key: (string) object's key
+            default: (string) the name if the key does not have a name
+
+        Returns:
+            (string) the name
+        """
+        if self.names is None:
+            self.reload()
+
+        return self.names.get(key, default)
+
+    def get_dialogue_npc_name(self, dialogue):
+        """
+        Get the name of the npc who says this dialogue.
+
+        Args:
+            dialogue: (string) dialogue's key
+
+        Returns:
+            (string) the npc's name
+        """
+        if self.names is None:
+            self.reload()
+
+        npc = self.dialogue_npcs.get(dialogue)
+        if not npc:
+            return ""
+        return self.names.get(npc, "")
+
+
+# main name resolver
+NAME_RESOLVER = NameResolver()
@@ -0,0 +1,148 @@
+"""
+Object data handler keeps a read-only snapshot of all objects' world data in
+memory, so objects can load their data fields without querying the database.
+"""
+
+from __future__ import print_function
+
+from collections import namedtuple
+from evennia.utils import logger
+from muddery.worlddata.data_sets import DATA_SETS
+
+
+class ObjectDataSnapshot(object):
+    """
+    A read-only snapshot of objects' data records. It is never modified after
+    it is built, reloading data builds a new snapshot.
+    """
+    def __init__(self, data_handlers, typeclass_handler):
+        """
+        Load all records with one query per model.
+
+        Args:
+            data_handlers: (list) object data handlers
+            typeclass_handler: (DataHandler) typeclass data handler
+        """
+        # object's key: [(model's name, field names, row), ...]
+        self.records = {}
+
+        # typeclass's key: typeclass's path
+        self.typeclass_paths = {}
+
+        for data_handler in data_handlers:
+            model = data_handler.model
+            if not model:
+                continue
+
+            try:
+                fields = model._meta.fields
+                field_names = tuple(field.name for field in fields)
+                row_class = namedtuple(data_handler.model_name, field_names, rename=True)
+
+                values_list = model.objects.all().values_list(*[field.attname for field in fields])
+                for values in values_list.iterator():
+                    row = row_class._make(values)
+                    if row.key not in self.records:
+                        self.records[row.key] = []
+                    self.records[row.key].append((data_handler.model_name, field_names, row))
+            except Exception, e:
+                logger.log_errmsg("Can not load object data %s: %s" % (data_handler.model_name, e))
+
+        try:
+            for key, path in typeclass_handler.objects.all().values_list("key", "path").iterator():
+                self.typeclass_paths[key] = path
+        except Exception, e:
+            logger.log_errmsg("Can not load typeclasses: %s" % e)
+
+
+class ObjectDataHandler(object):
+    """
+    The handler holds the current snapshot of objects' data.
+    """
+    def __init__(self):
+        """
+        Initialize handler
+        """
+        self.snapshot = None
+
+    def clear(self):
+        """
+        Clear data.
+        """
+        self.snapshot = None
+
+    def build_snapshot(self):
+        """
+        Build a new snapshot of current world data without using it.
+
+        Returns:
+            (ObjectDataSnapshot) the new snapshot
+        """
+        data_handlers = []
+        data_handlers.extend(DATA_SETS.object_data)
+        data_handlers.extend(DATA_SETS.object_additional_data)
+
+        return ObjectDataSnapshot(data_handlers, DATA_SETS.typeclasses)
+
+    def reload(self):
+        """
+        Reload data. The new snapshot replaces the old one at once, so readers
+        always see a whole snapshot.
+        """
+        self.snapshot = self.build_snapshot()
+
+    def get_snapshot(self):
+        """
+        Get the current snapshot, load it if it has not been loaded.
+
+        Returns:
+            (ObjectDataSnapshot) current snapshot
+        """
+        snapshot = self.snapshot
+        if snapshot is None:
+            self.reload()
+            snapshot = self.snapshot
+        return snapshot
+
+    def get_records(self, key):
+        """
+        Get all data records of an object.
+
+        Args:
+            key: (string) the key of an object
+
+        Returns:
+            (list) a list of (model's name, field names, record)
+        """
+        return self.get_snapshot().records.get(key, [])
+
+    def get_record(self, key):
+        """
+        Get the first data record of an object.
+
+        Args:
+            key: (string) the key of an object
+
+        Returns:
+            (namedtuple) the record, or None if the key does not exist
+        """
+        records = self.get_snapshot().records.get(key, None)
+        if not records:
+            return None
+        return records[0][2]
+
+    def get_typeclass_path(self, typeclass_key):
+        """
+        Get a typeclass's path.
+
+        Args:
+            typeclass_key: (string) the key of a typeclass
+
+        Returns:
+            (string) typeclass's path, or None if the key does not exist
+        """
+        return self.get_snapshot().typeclass_paths.get(typeclass_key, None)
+
+
+# main object data handler
+OBJECT_DATA_HANDLER = ObjectDataHandler()
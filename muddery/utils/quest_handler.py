@@ -10,6 +10,7 @@ from django.core.exceptions import ObjectDoesNotExist
 from evennia.utils import logger
 from muddery.utils.builder import build_object
 from muddery.utils.quest_dependency_handler import QUEST_DEP_HANDLER
+from muddery.utils.dialogue_handler import DIALOGUE_HANDLER
 from muddery.statements.statement_handler import STATEMENT_HANDLER
 from muddery.utils.localized_strings_handler import _
 from muddery.utils.exception import MudderyError
@@ -30,6 +31,11 @@ class QuestHandler(object):
         self.current_quests = owner.db.current_quests
         self.completed_quests = owner.db.completed_quests
 
+        # Unaccomplished objectives of current quests.
+        # (objective's type, object's key): a list of (quest's key, objective's ordinal)
+        # It is built when it is used.
+        self.objective_index = None
+
     def accept(self, quest_key):
         """
         Accept a quest.
@@ -50,6 +56,8 @@ class QuestHandler(object):
 
         new_quest.set_owner(self.owner)
         self.current_quests[quest_key] = new_quest
+        self.objective_index = None
+        DIALOGUE_HANDLER.clear_character_cache(self.owner)
 
         self.owner.msg({"msg": _("Accepted quest {c%s{n.") % new_quest.get_name()})
         self.show_quests()
@@ -64,6 +72,7 @@ class QuestHandler(object):
         for quest in self.current_quests:
             quest.delete()
         self.current_quests = []
+        self.objective_index = None
         
 
     def give_up(self, quest_key):
@@ -84,11 +93,14 @@ class QuestHandler(object):
             raise MudderyError(_("Can not find this quest."))
 
         del(self.current_quests[quest_key])
+        self.objective_index = None
 
         self.completed_quests.add(quest_key)
         if quest_key in self.completed_quests:
             self.completed_quests.remove(quest_key)
 
+        DIALOGUE_HANDLER.clear_character_cache(self.owner)
+
         self.show_quests()
 
     def complete(self, quest_key):
@@ -115,8 +127,10 @@ class QuestHandler(object):
 
         # Delete the quest.
         del (self.current_quests[quest_key])
+        self.objective_index = None
 
         self.completed_quests.add(quest_key)
+        DIALOGUE_HANDLER.clear_character_cache(self.owner)
 
         self.owner.msg({"msg": _("Completed quest {c%s{n.") % name})
         self.show_quests()
@@ -284,13 +298,69 @@ class QuestHandler(object):
         Returns:
             None
         """
-        status_changed = False
-        for quest in self.current_quests.values():
-            if quest.at_objective(object_type, object_key, number):
-                status_changed = True
-                if quest.is_accomplished():
-                    self.owner.msg({"msg":
-                        _("Quest {c%s{n's goals are accomplished.") % quest.name})
-
-        if status_changed:
-            self.show_quests()
+        self.at_objectives([(object_type, object_key, number)])
+
+    def build_objective_index(self):
+        """
+        Index unaccomplished objectives of current quests by their types and
+        objects.
+        """
+        index = {}
+        for quest_key, quest in self.current_quests.iteritems():
+            for ordinal, object_type, object_key in quest.get_unaccomplished_objectives():
+                target = (object_type, object_key)
+                if target not in index:
+                    index[target] = [(quest_key, ordinal)]
+                else:
+                    index[target].append((quest_key, ordinal))
+
+        self.objective_index = index
+
+    def at_objectives(self, objectives):
+        """
+        Called when the owner may complete several objectives at once, such as
+        killing several enemies in a combat. Each quest saves its progress
+        only once.
+
+        Args:
+            objectives: (list) a list of (objective's type, object's key, number)
+
+        Returns:
+            None
+        """
+        if self.objective_index is None:
+            self.build_objective_index()
+
+        # quest's key: a list of (objective's ordinal, number)
+        progress = {}
+        for object_type, object_key, number in objectives:
+            for quest_key, ordinal in self.objective_index.get((object_type, object_key), ()):
+                if quest_key not in progress:
+                    progress[quest_key] = [(ordinal, number)]
+                else:
+                    progress[quest_key].append((ordinal, number))
+
+        if not progress:
+            return
+
+        for quest_key, events in progress.iteritems():
+            quest = self.current_quests.get(quest_key)
+            if not quest:
+                continue
+
+            # remove accomplished objectives from the index
+            for ordinal in quest.add_accomplished(events):
+                objective = quest.objectives[ordinal]
+                target = (objective["type"], objective["object"])
+                targets = self.objective_index.get(target)
+                if targets and (quest_key, ordinal) in targets:
+                    targets.remove((quest_key, ordinal))
+                    if not targets:
+                        del self.objective_index[target]
+
+            if quest.is_accomplished():
+                self.owner.msg({"msg":
+                    _("Quest {c%s{n's goals are accomplished.") % quest.name})
+
+        DIALOGUE_HANDLER.clear_character_cache(self.owner)
+        self.show_quests()
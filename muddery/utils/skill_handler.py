@@ -7,13 +7,14 @@ from __future__ import print_function
 
 import time
 import traceback
-from twisted.internet import task
 from django.conf import settings
 from evennia.utils import logger
 from evennia.utils.utils import class_from_module
 from muddery.utils.builder import build_object
 from muddery.utils.localized_strings_handler import _
 from muddery.utils.game_settings import GAME_SETTINGS
+from muddery.statements.statement_handler import STATEMENT_HANDLER
+from muddery.combat.combat_scheduler import COMBAT_SCHEDULER
 
 
 class SkillHandler(object):
@@ -37,15 +38,14 @@ class SkillHandler(object):
         self.auto_cast_skill_cd = GAME_SETTINGS.get("auto_cast_skill_cd")
         self.gcd_finish_time = 0
         
-        # loop for auto cast skills
-        self.loop = None
+        # scheduled task of auto cast skills
+        self.auto_cast_task = None
 
     def __del__(self):
         """
         Remove tickers.
         """
-        if self.loop and self.loop.running:
-            self.loop.stop()
+        self.stop_auto_combat_skill()
 
     def get_all(self):
         """
@@ -193,8 +193,7 @@ class SkillHandler(object):
 
         if not self.owner.ndb.combat_handler:
             # combat is finished, stop ticker
-            if self.loop and self.loop.running:
-                self.loop.stop()
+            self.stop_auto_combat_skill()
             return
 
         # Choose a skill and the skill's target.
@@ -214,27 +213,23 @@ class SkillHandler(object):
         """
         Cast all passive skills.
         """
-        for skill in self.skills:
-            if self.skills[skill].passive:
-                self.skills[skill].cast_skill(None)
+        programs = [skill.get_cast_program(None) for skill in self.skills.values() if skill.passive]
+        STATEMENT_HANDLER.do_programs(programs)
 
     def start_auto_combat_skill(self):
         """
         Start auto cast skill.
         """
-        if self.loop and self.loop.running:
+        if self.auto_cast_task and self.auto_cast_task.active():
             return
 
-        # Cast a skill immediately
-        # self.auto_cast_skill()
-
-        # Set timer of auto cast.
-        self.loop = task.LoopingCall(self.auto_cast_skill)
-        self.loop.start(self.auto_cast_skill_cd)
+        # Set timer of auto cast, cast a skill in the next tick.
+        self.auto_cast_task = COMBAT_SCHEDULER.schedule(self.auto_cast_skill, 0, self.auto_cast_skill_cd)
 
     def stop_auto_combat_skill(self):
         """
         Stop auto cast skill.
         """
-        if self.loop and self.loop.running:
-            self.loop.stop()
+        if self.auto_cast_task:
+            self.auto_cast_task.cancel()
+            self.auto_cast_task = None
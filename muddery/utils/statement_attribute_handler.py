@@ -3,6 +3,7 @@ Handles a character's attributes used in statements.
 """
 
 from muddery.utils.localized_strings_handler import _
+from muddery.utils.dialogue_handler import DIALOGUE_HANDLER
 from django.conf import settings
 from evennia.utils import logger
 
@@ -23,6 +24,7 @@ class StatementAttributeHandler(object):
         Set an attribute.
         """
         self.attributes[key] = value
+        DIALOGUE_HANDLER.clear_character_cache(self.owner)
 
     def get(self, key, default=None):
         """
@@ -44,6 +46,7 @@ class StatementAttributeHandler(object):
             return False
 
         del self.attributes[key]
+        DIALOGUE_HANDLER.clear_character_cache(self.owner)
         return True
 
     def has(self, key):
@@ -0,0 +1,412 @@
+"""
+Tests of muddery's utils.
+"""
+
+from django.test import TestCase
+from django.db import DatabaseError
+from mock import Mock, patch
+from evennia.objects.models import ObjectDB
+from muddery.utils.world_builder import WorldBuilder
+from muddery.utils.inventory_handler import InventoryHandler
+from muddery.utils.data_key_index import DATA_KEY_INDEX
+from muddery.utils.name_resolver import NAME_RESOLVER
+from muddery.typeclasses import player_characters
+from muddery.typeclasses.player_characters import MudderyPlayerCharacter
+from muddery.typeclasses.common_objects import MudderyCommonObject
+from muddery.typeclasses.objects import MudderyObject
+from muddery.typeclasses.character_quests import MudderyQuest
+from muddery.utils import defines, quest_handler
+from muddery.utils.quest_handler import QuestHandler
+from muddery.utils.dialogue_handler import DIALOGUE_HANDLER
+from muddery.utils.game_settings import GAME_SETTINGS
+from muddery.worlddata.data_sets import DATA_SETS
+
+
+class TestWorldBuilder(TestCase):
+    """
+    Objects rolled back by the world builder must not stay in the idmapper
+    cache.
+    """
+    typeclass_path = "evennia.objects.objects.DefaultObject"
+
+    def assert_cache_matches_database(self):
+        cached_ids = set(obj.id for obj in ObjectDB.get_all_cached_instances())
+        existing_ids = set(ObjectDB.objects.filter(id__in=cached_ids).values_list("id", flat=True))
+        self.assertEqual(cached_ids, existing_ids)
+
+    def test_set_data_keys_fails(self):
+        records = [("world_objects", "obj_%d" % i, "Object %d" % i, self.typeclass_path)
+                   for i in range(5)]
+        builder = WorldBuilder(batch_size=3)
+
+        with patch.object(WorldBuilder, "set_data_keys", side_effect=DatabaseError("failed")):
+            created = builder.create_objects(records)
+
+        self.assertEqual(created, [])
+        self.assertEqual(len(builder.errors), 2)
+        self.assert_cache_matches_database()
+
+    def test_set_data_keys_fails_once(self):
+        records = [("world_objects", "obj_%d" % i, "Object %d" % i, self.typeclass_path)
+                   for i in range(4)]
+        builder = WorldBuilder(batch_size=2)
+        set_data_keys = WorldBuilder.set_data_keys
+        calls = []
+
+        def fail_first(self, objects):
+            calls.append(objects)
+            if len(calls) == 1:
+                raise DatabaseError("failed")
+            return set_data_keys(self, objects)
+
+        with patch.object(WorldBuilder, "set_data_keys", fail_first):
+            created = builder.create_objects(records)
+
+        self.assertEqual([key for obj, key in created], ["obj_2", "obj_3"])
+        for obj, key in created:
+            self.assertEqual(ObjectDB.objects.get(id=obj.id), obj)
+        self.assert_cache_matches_database()
+
+    def test_create_object_fails(self):
+        records = [("world_objects", "obj_%d" % i, "Object %d" % i, self.typeclass_path)
+                   for i in range(3)]
+        builder = WorldBuilder(batch_size=10)
+
+        from evennia.utils import create
+        create_object = create.create_object
+
+        def fail_second(typeclass, key, *args, **kwargs):
+            obj = create_object(typeclass, key, *args, **kwargs)
+            if key == "Object 1":
+                # the object has been saved and cached
+                raise DatabaseError("failed")
+            return obj
+
+        with patch.object(create, "create_object", fail_second):
+            created = builder.create_objects(records)
+
+        self.assertEqual([key for obj, key in created], ["obj_0", "obj_2"])
+        self.assert_cache_matches_database()
+
+
+class FakeAttributes(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class FakeItem(object):
+    """
+    A common object without the database.
+    """
+    max_stack = 5
+    unique = False
+
+    increase_num = MudderyCommonObject.__dict__["increase_num"]
+    decrease_num = MudderyCommonObject.__dict__["decrease_num"]
+
+    def __init__(self, obj_id, key, number=0, location=None):
+        self.id = obj_id
+        self.key = key
+        self.db = FakeAttributes(number=number)
+        self.location = None
+        if location:
+            self.move_to(location)
+
+    def get_data_key(self):
+        return self.key
+
+    def move_to(self, destination, quiet=False, emit_to_obj=None):
+        if self.location:
+            self.location.contents.remove(self)
+            self.location.inventory.discard(self.id)
+        self.location = destination
+        destination.contents.append(self)
+        destination.inventory.add(self)
+        return True
+
+
+class FakeCharacter(object):
+    """
+    A player character without the database.
+    """
+    update_content = MudderyPlayerCharacter.__dict__["update_content"]
+    at_content_deleted = MudderyPlayerCharacter.__dict__["at_content_deleted"]
+    receive_objects = MudderyPlayerCharacter.__dict__["receive_objects"]
+
+    def __init__(self):
+        self.contents = []
+        self.inventory = InventoryHandler(self)
+
+
+class TestInventoryHandler(TestCase):
+    """
+    The inventory index follows objects' keys and numbers.
+    """
+    def setUp(self):
+        self.next_id = 1
+        self.patches = [patch.object(DATA_KEY_INDEX, "get_value", return_value=None),
+                        patch.object(NAME_RESOLVER, "get_name", side_effect=lambda key, default="": key),
+                        patch.object(player_characters, "build_object", side_effect=self.build_object)]
+        for item in self.patches:
+            item.start()
+
+        self.owner = FakeCharacter()
+
+    def tearDown(self):
+        for item in self.patches:
+            item.stop()
+
+    def build_object(self, key):
+        obj = FakeItem(self.next_id, key)
+        self.next_id += 1
+        return obj
+
+    def add_item(self, key, number):
+        obj = self.build_object(key)
+        obj.db.number = number
+        obj.move_to(self.owner)
+        return obj
+
+    def test_build(self):
+        apple = self.add_item("apple", 2)
+        pear = self.add_item("pear", 3)
+
+        # the index is built when it is used
+        self.assertIsNone(self.owner.inventory.stacks)
+        self.assertEqual(self.owner.inventory.get_number("apple"), 2)
+        self.assertEqual(self.owner.inventory.get_number("pear"), 3)
+        self.assertEqual(self.owner.inventory.all(), [apple, pear])
+        self.assertIs(self.owner.inventory.get_by_dbref("#%d" % pear.id), pear)
+
+    def test_duplicate_keys(self):
+        inventory = self.owner.inventory
+        inventory.build()
+        apple1 = self.add_item("apple", 2)
+        apple2 = self.add_item("apple", 3)
+
+        # adding an object again does not count it twice
+        inventory.add(apple1)
+        inventory.add(apple2)
+        self.assertEqual(inventory.get("apple"), [apple1, apple2])
+        self.assertEqual(inventory.get_number("apple"), 5)
+
+        # stacks are kept in the order of ids
+        inventory.discard(apple1.id)
+        inventory.add(apple1)
+        self.assertEqual(inventory.get("apple"), [apple1, apple2])
+
+        inventory.discard(apple1.id)
+        inventory.discard(apple1.id)
+        self.assertEqual(inventory.get("apple"), [apple2])
+        self.assertEqual(inventory.get_number("apple"), 3)
+
+        # the data key has been changed
+        apple2.key = "pear"
+        inventory.update(apple2)
+        self.assertFalse(inventory.has("apple"))
+        self.assertEqual(inventory.get_number("apple"), 0)
+        self.assertEqual(inventory.get("pear"), [apple2])
+
+        # the object has left
+        apple2.location = None
+        inventory.update(apple2)
+        self.assertEqual(inventory.all(), [])
+        self.assertEqual(inventory.totals, {})
+
+    def test_get_smallest(self):
+        inventory = self.owner.inventory
+        inventory.build()
+        apple1 = self.add_item("apple", 4)
+        apple2 = self.add_item("apple", 2)
+        self.assertIs(inventory.get_smallest("apple"), apple2)
+
+        apple2.increase_num(3)
+        self.assertIs(inventory.get_smallest("apple"), apple1)
+        self.assertEqual(inventory.get_number("apple"), 9)
+
+        apple1.decrease_num(1)
+        apple2.decrease_num(4)
+        self.assertIs(inventory.get_smallest("apple"), apple2)
+        self.assertEqual(inventory.get_number("apple"), 4)
+        self.assertIsNone(inventory.get_smallest("pear"))
+
+    def test_content_deleted(self):
+        inventory = self.owner.inventory
+        inventory.build()
+        apple1 = self.add_item("apple", 4)
+        apple2 = self.add_item("apple", 2)
+
+        self.owner.at_content_deleted(apple2.id)
+        self.assertIs(inventory.get_smallest("apple"), apple1)
+        self.assertEqual(inventory.get_number("apple"), 4)
+        self.assertIsNone(inventory.get_by_dbref("#%d" % apple2.id))
+
+        self.owner.at_content_deleted(apple1.id)
+        self.assertFalse(inventory.has("apple"))
+
+    def test_receive_objects(self):
+        apple = self.add_item("apple", 4)
+
+        rejected = self.owner.receive_objects([{"object": "apple", "number": 3},
+                                               {"object": "apple", "number": 4},
+                                               {"object": "pear", "number": 2}],
+                                              mute=True)
+        self.assertEqual(rejected, {})
+
+        # the stack created by the first item is filled by the second one
+        stacks = self.owner.inventory.get("apple")
+        self.assertEqual(stacks[0], apple)
+        self.assertEqual([obj.db.number for obj in stacks], [5, 5, 1])
+        self.assertEqual(self.owner.inventory.get_number("apple"), 11)
+        self.assertEqual(self.owner.inventory.get_number("pear"), 2)
+
+
+class FakeQuest(object):
+    """
+    A quest without the database.
+    """
+    get_unaccomplished_objectives = MudderyQuest.__dict__["get_unaccomplished_objectives"]
+    add_accomplished = MudderyQuest.__dict__["add_accomplished"]
+    is_accomplished = MudderyQuest.__dict__["is_accomplished"]
+
+    def __init__(self, key, objectives):
+        """
+        Args:
+            key: (string) quest's key
+            objectives: (list) a list of (ordinal, type, object's key, number)
+        """
+        self.key = key
+        self.name = key
+        self.db = FakeAttributes(accomplished={})
+        self.objectives = {}
+        self.not_accomplished = {}
+        for ordinal, object_type, object_key, number in objectives:
+            self.objectives[ordinal] = {"ordinal": ordinal,
+                                        "type": object_type,
+                                        "object": object_key,
+                                        "number": number,
+                                        "desc": ""}
+            self.not_accomplished.setdefault(object_type, []).append(ordinal)
+
+    def set_owner(self, owner):
+        self.db.owner = owner
+
+    def get_name(self):
+        return self.name
+
+    def complete(self):
+        pass
+
+
+class TestQuestHandler(TestCase):
+    """
+    Objectives are dispatched through the objective index.
+    """
+    def setUp(self):
+        self.quests = {}
+        self.patches = [patch.object(DIALOGUE_HANDLER, "clear_character_cache"),
+                        patch.object(GAME_SETTINGS, "get", return_value=True),
+                        patch.object(QuestHandler, "show_quests"),
+                        patch.object(quest_handler, "build_object", side_effect=self.quests.get)]
+        for item in self.patches:
+            item.start()
+
+        owner = Mock()
+        owner.db.current_quests = {}
+        owner.db.completed_quests = set()
+        self.handler = QuestHandler(owner)
+
+    def tearDown(self):
+        for item in self.patches:
+            item.stop()
+
+    def accept(self, key, objectives):
+        quest = FakeQuest(key, objectives)
+        self.quests[key] = quest
+        self.handler.accept(key)
+        return quest
+
+    def kill(self, *keys):
+        self.handler.at_objectives([(defines.OBJECTIVE_KILL, key, 1) for key in keys])
+
+    def test_batch(self):
+        quest = self.accept("quest_wolves", [(1, defines.OBJECTIVE_KILL, "wolf", 5),
+                                             (2, defines.OBJECTIVE_KILL, "bear", 1)])
+        self.kill("wolf", "wolf", "bear", "wolf", "rabbit")
+        self.assertEqual(quest.db.accomplished, {1: 3, 2: 1})
+        self.assertEqual(self.handler.objective_index,
+                         {(defines.OBJECTIVE_KILL, "wolf"): [("quest_wolves", 1)]})
+
+        self.kill("wolf")
+        self.assertEqual(quest.db.accomplished, {1: 4, 2: 1})
+        self.assertFalse(quest.is_accomplished())
+
+    def test_shared_target(self):
+        quest1 = self.accept("quest_1", [(1, defines.OBJECTIVE_KILL, "wolf", 2)])
+        quest2 = self.accept("quest_2", [(1, defines.OBJECTIVE_KILL, "wolf", 3),
+                                         (2, defines.OBJECTIVE_OBJECT, "wolf", 1)])
+        self.kill("wolf", "wolf")
+        self.assertEqual(quest1.db.accomplished, {1: 2})
+        self.assertEqual(quest2.db.accomplished, {1: 2})
+        self.assertTrue(quest1.is_accomplished())
+        self.assertEqual(self.handler.objective_index,
+                         {(defines.OBJECTIVE_KILL, "wolf"): [("quest_2", 1)],
+                          (defines.OBJECTIVE_OBJECT, "wolf"): [("quest_2", 2)]})
+
+    def test_finish_mid_batch(self):
+        quest = self.accept("quest_wolves", [(1, defines.OBJECTIVE_KILL, "wolf", 2)])
+        self.kill("wolf", "wolf", "wolf", "wolf")
+
+        # kills after the objective has been accomplished are not counted
+        self.assertEqual(quest.db.accomplished, {1: 2})
+        self.assertTrue(quest.is_accomplished())
+        self.assertEqual(self.handler.objective_index, {})
+
+        self.kill("wolf")
+        self.assertEqual(quest.db.accomplished, {1: 2})
+
+    def test_index_reset(self):
+        self.accept("quest_1", [(1, defines.OBJECTIVE_KILL, "wolf", 2)])
+        self.kill("wolf")
+        self.assertIsNotNone(self.handler.objective_index)
+
+        quest2 = self.accept("quest_2", [(1, defines.OBJECTIVE_KILL, "bear", 1)])
+        self.assertIsNone(self.handler.objective_index)
+        self.kill("bear")
+        self.assertEqual(quest2.db.accomplished, {1: 1})
+
+        self.handler.complete("quest_2")
+        self.assertIsNone(self.handler.objective_index)
+        self.assertIn("quest_2", self.handler.completed_quests)
+        self.kill("wolf")
+        self.assertEqual(self.handler.objective_index, {})
+
+        self.handler.give_up("quest_1")
+        self.assertIsNone(self.handler.objective_index)
+        self.kill("wolf")
+        self.assertEqual(self.handler.objective_index, {})
+
+
+class TestQuestReload(TestCase):
+    """
+    Accomplished numbers are kept when a quest's data is loaded again.
+    """
+    def test_reload(self):
+        from evennia.utils import create
+        quest = create.create_object("muddery.typeclasses.character_quests.MudderyQuest", "quest")
+        quest.db.accomplished = {1: 2, 2: 1}
+
+        records = [Mock(ordinal=1, type=defines.OBJECTIVE_KILL, object="wolf", number=2, desc=""),
+                   Mock(ordinal=2, type=defines.OBJECTIVE_KILL, object="bear", number=3, desc=""),
+                   Mock(ordinal=3, type=defines.OBJECTIVE_OBJECT, object="fur", number=1, desc="")]
+
+        with patch.object(MudderyObject, "after_data_loaded"), \
+                patch.object(MudderyQuest, "get_data_key", return_value="quest"), \
+                patch.object(DATA_SETS, "quest_objectives") as quest_objectives:
+            quest_objectives.objects.filter.return_value = records
+            quest.after_data_loaded()
+
+        self.assertEqual(quest.not_accomplished, {defines.OBJECTIVE_KILL: [2],
+                                                  defines.OBJECTIVE_OBJECT: [3]})
+        self.assertEqual(sorted(quest.get_unaccomplished_objectives()),
+                         [(2, defines.OBJECTIVE_KILL, "bear"), (3, defines.OBJECTIVE_OBJECT, "fur")])
@@ -14,6 +14,7 @@ from django.conf import settings
 from evennia.utils import search, logger
 from muddery.server.launcher import configs
 from muddery.worlddata.data_sets import DATA_SETS
+from muddery.utils.data_key_index import DATA_KEY_INDEX
 
 
 def get_muddery_version():
@@ -33,6 +34,7 @@ def set_obj_data_key(obj, key):
         key: (string) key of the data.
     """
     obj.attributes.add("key", key, category=settings.DATA_KEY_CATEGORY, strattr=True)
+    DATA_KEY_INDEX.set("key", obj, key)
 
 
 def search_obj_data_key(key):
@@ -45,7 +47,7 @@ def search_obj_data_key(key):
     if not key:
         return None
 
-    return search.search_object_attribute(key="key", strvalue=key, category=settings.DATA_KEY_CATEGORY)
+    return DATA_KEY_INDEX.search("key", key)
     
     
 def search_db_data_type(key, value, typeclass):
@@ -65,6 +67,7 @@ def set_obj_unique_type(obj, type):
         type: (string) unique object's type.
     """
     obj.attributes.add("type", type, category=settings.DATA_KEY_CATEGORY, strattr=True)
+    DATA_KEY_INDEX.set("type", obj, type)
 
 
 def search_obj_unique_type(type):
@@ -74,8 +77,7 @@ def search_obj_unique_type(type):
     Args:
         type: (string) unique object's type.
     """
-    obj = search.search_object_attribute(key="type", strvalue=type, category=settings.DATA_KEY_CATEGORY)
-    return obj
+    return DATA_KEY_INDEX.search("type", type)
 
 
 def is_child(child, parent):
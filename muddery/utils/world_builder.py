@@ -0,0 +1,324 @@
+"""
+World builder builds all unique objects of the world in bulk.
+
+It compares world data with current objects first, then deletes, creates and
+updates objects in batches. Each batch is written in one transaction.
+"""
+
+from __future__ import print_function
+
+import time
+import traceback
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from evennia.objects.models import ObjectDB
+from evennia.typeclasses.attributes import Attribute
+from evennia.utils import create
+from muddery.utils.data_key_index import DATA_KEY_INDEX
+from muddery.utils.object_data_handler import OBJECT_DATA_HANDLER
+
+
+class BuildPlan(object):
+    """
+    Differences between world data and current objects.
+    """
+    def __init__(self):
+        # objects to create, a list of (type name, data key, name, typeclass path)
+        self.create = []
+
+        # objects to update, a list of (object, data key)
+        self.update = []
+
+        # objects to delete, a list of (object, data key)
+        self.delete = []
+
+
+class WorldBuilder(object):
+    """
+    Builds unique objects in bulk.
+    """
+    def __init__(self, caller=None, batch_size=None):
+        """
+        Args:
+            caller: (command caller) If provide, running messages will send to the caller.
+            batch_size: (int) the number of objects written in one transaction
+        """
+        self.caller = caller
+        if batch_size is None:
+            batch_size = settings.BUILDER_BATCH_SIZE
+        self.batch_size = batch_size
+
+        # phase's name: time cost in seconds
+        self.timing = {}
+        self.errors = []
+
+    def message(self, ostring):
+        """
+        Print a message and send it to the caller.
+        """
+        print(ostring)
+        if self.caller:
+            self.caller.msg(ostring)
+
+    def error(self, ostring):
+        """
+        Record an error.
+        """
+        self.errors.append(ostring)
+        print(ostring)
+        print(traceback.format_exc())
+        if self.caller:
+            self.caller.msg(ostring)
+
+    def batches(self, items):
+        """
+        Split items into batches.
+        """
+        for i in xrange(0, len(items), self.batch_size):
+            yield items[i:i + self.batch_size]
+
+    def plan(self, models, snapshot=None):
+        """
+        Compare world data with current objects.
+
+        Args:
+            models: (list) a list of (model's objects, model's name)
+            snapshot: (ObjectDataSnapshot) objects' data to compare, use the
+                      current snapshot if it is None
+
+        Returns:
+            (BuildPlan) the differences
+        """
+        if snapshot is None:
+            snapshot = OBJECT_DATA_HANDLER.get_snapshot()
+
+        plan = BuildPlan()
+
+        for objects_data, type_name in models:
+            # data key: (name, typeclass path)
+            records = {}
+            for key, name, typeclass in objects_data.all().values_list("key", "name", "typeclass"):
+                records[key] = (name, snapshot.typeclass_paths.get(typeclass, None))
+
+                if typeclass == settings.TWO_WAY_EXIT_TYPECLASS_KEY:
+                    # the reverse exit
+                    records[settings.REVERSE_EXIT_PREFIX + key] = (name, settings.REVERSE_EXIT_TYPECLASS_PATH)
+
+            current_keys = set()
+            for obj in DATA_KEY_INDEX.search("type", type_name):
+                obj_key = DATA_KEY_INDEX.get_value("key", obj.id)
+                if obj_key in current_keys or obj_key not in records:
+                    # duplicated or removed
+                    plan.delete.append((obj, obj_key))
+                else:
+                    plan.update.append((obj, obj_key))
+                    current_keys.add(obj_key)
+
+            for key, (name, typeclass_path) in records.iteritems():
+                if key not in current_keys:
+                    plan.create.append((type_name, key, name, typeclass_path))
+
+        return plan
+
+    def build(self, models, dry_run=False, snapshot=None):
+        """
+        Build objects.
+
+        Args:
+            models: (list) a list of (model's objects, model's name)
+            dry_run: (boolean) only compare data, do not change objects
+            snapshot: (ObjectDataSnapshot) objects' data to compare, use the
+                      current snapshot if it is None
+
+        Returns:
+            (dict) the report
+        """
+        begin = time.time()
+        plan = self.plan(models, snapshot)
+        self.timing["plan"] = time.time() - begin
+
+        if not dry_run:
+            begin = time.time()
+            self.delete_objects(plan.delete)
+            self.timing["delete"] = time.time() - begin
+
+            begin = time.time()
+            created = self.create_objects(plan.create)
+            self.timing["create"] = time.time() - begin
+
+            begin = time.time()
+            self.load_objects(created, plan.update)
+            self.timing["load"] = time.time() - begin
+
+        report = {"dry_run": dry_run,
+                  "create": [item[1] for item in plan.create],
+                  "update": [item[1] for item in plan.update],
+                  "delete": [item[1] for item in plan.delete],
+                  "timing": self.timing,
+                  "errors": self.errors}
+
+        if dry_run:
+            ostring = "Will remove %d object(s). Will create %d object(s). Will update %d object(s)."
+        else:
+            ostring = "Removed %d object(s). Created %d object(s). Updated %d object(s)."
+        self.message(ostring % (len(plan.delete), len(plan.create), len(plan.update)))
+        self.message("Time cost: " + ", ".join("%s %.3fs" % (phase, self.timing[phase])
+                                               for phase in ("plan", "delete", "create", "load")
+                                               if phase in self.timing))
+
+        return report
+
+    def delete_objects(self, objects):
+        """
+        Delete objects.
+
+        Args:
+            objects: (list) a list of (object, data key)
+        """
+        for batch in self.batches(objects):
+            with transaction.atomic():
+                for obj, key in batch:
+                    try:
+                        with transaction.atomic():
+                            obj.delete()
+                    except Exception, e:
+                        # The object is still in the database, load it again
+                        # when it is used.
+                        self.flush_objects([obj])
+                        self.error("Can not delete %s: %s" % (key, e))
+
+    def create_objects(self, records):
+        """
+        Create objects and set their data keys.
+
+        Args:
+            records: (list) a list of (type name, data key, name, typeclass path)
+
+        Returns:
+            (list) a list of (object, data key)
+        """
+        created = []
+
+        # Objects with larger ids are created here.
+        last_id = ObjectDB.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+
+        for batch in self.batches(records):
+            objects = []
+            try:
+                with transaction.atomic():
+                    for type_name, key, name, typeclass_path in batch:
+                        if not typeclass_path:
+                            self.error("Can not find the typeclass of %s." % key)
+                            continue
+
+                        try:
+                            with transaction.atomic():
+                                obj = create.create_object(typeclass_path, name)
+                        except Exception, e:
+                            # The object may have been saved and cached
+                            # before the error.
+                            good_ids = set(item[0].id for item in created)
+                            good_ids.update(item[0].id for item in objects)
+                            self.flush_objects([cached for cached in ObjectDB.get_all_cached_instances()
+                                                if cached.id > last_id and cached.id not in good_ids])
+                            self.error("Can not create obj %s: %s" % (key, e))
+                            continue
+
+                        if obj:
+                            objects.append((obj, type_name, key))
+                        else:
+                            self.error("Can not create obj %s." % key)
+
+                    self.set_data_keys(objects)
+            except Exception, e:
+                # the whole batch is rolled back
+                self.flush_objects([item[0] for item in objects])
+                self.error("Can not set data info to objects: %s" % e)
+                continue
+
+            for obj, type_name, key in objects:
+                DATA_KEY_INDEX.set("key", obj, key)
+                DATA_KEY_INDEX.set("type", obj, type_name)
+                created.append((obj, key))
+
+        return created
+
+    def set_data_keys(self, objects):
+        """
+        Write objects' data keys and unique types to the database.
+
+        Args:
+            objects: (list) a list of (object, type name, data key)
+        """
+        if not connection.features.can_return_ids_from_bulk_insert:
+            # Can not get attributes' ids after bulk insert.
+            for obj, type_name, key in objects:
+                obj.attributes.add("key", key, category=settings.DATA_KEY_CATEGORY, strattr=True)
+                obj.attributes.add("type", type_name, category=settings.DATA_KEY_CATEGORY, strattr=True)
+            return
+
+        attributes = []
+        for obj, type_name, key in objects:
+            attributes.append(Attribute(db_key="key",
+                                        db_category=settings.DATA_KEY_CATEGORY,
+                                        db_model="objectdb",
+                                        db_strvalue=key))
+            attributes.append(Attribute(db_key="type",
+                                        db_category=settings.DATA_KEY_CATEGORY,
+                                        db_model="objectdb",
+                                        db_strvalue=type_name))
+        attributes = Attribute.objects.bulk_create(attributes)
+
+        links = []
+        through = ObjectDB.db_attributes.through
+        for i, (obj, type_name, key) in enumerate(objects):
+            links.append(through(objectdb_id=obj.id, attribute_id=attributes[i * 2].id))
+            links.append(through(objectdb_id=obj.id, attribute_id=attributes[i * 2 + 1].id))
+        through.objects.bulk_create(links)
+
+        for obj, type_name, key in objects:
+            obj.attributes.reset_cache()
+
+    def load_objects(self, created, updated):
+        """
+        Load objects' data. All objects have been created, so objects' locations
+        and destinations can be found.
+
+        Args:
+            created: (list) new objects, a list of (object, data key)
+            updated: (list) existing objects, a list of (object, data key)
+        """
+        for batch in self.batches(created):
+            with transaction.atomic():
+                for obj, key in batch:
+                    try:
+                        with transaction.atomic():
+                            obj.load_data()
+                            obj.after_data_key_changed()
+                    except Exception, e:
+                        self.flush_objects([obj])
+                        self.error("%s can not load data:%s" % (key, e))
+
+        for batch in self.batches(updated):
+            with transaction.atomic():
+                for obj, key in batch:
+                    try:
+                        with transaction.atomic():
+                            obj.load_data()
+                            obj.reset_location()
+                    except Exception, e:
+                        self.flush_objects([obj])
+                        self.error("%s can not load data:%s" % (key, e))
+
+    def flush_objects(self, objects):
+        """
+        Remove objects from the idmapper cache after their changes have been
+        rolled back, so they are not found by their ids with unsaved data, or
+        found after their rows have been removed.
+
+        Args:
+            objects: (list) a list of objects
+        """
+        for obj in objects:
+            obj.flush_from_cache(force=True)
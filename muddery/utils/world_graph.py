@@ -0,0 +1,185 @@
+"""
+World graph keeps all rooms and exits of the world map in memory. It is built
+from world data when the world is built, so maps can be made without
+searching rooms and their exits.
+"""
+
+from __future__ import print_function
+
+import ast
+import json
+import hashlib
+from django.conf import settings
+from evennia.utils import logger
+from muddery.worlddata.data_sets import DATA_SETS
+
+
+class WorldGraph(object):
+    """
+    A read-only graph of rooms and exits. Rooms and exits are stored in arrays,
+    exits refer to rooms by their indexes.
+    """
+    def __init__(self, rooms, exits):
+        """
+        Args:
+            rooms: (list) a list of (key, name, icon, area, position)
+            exits: (list) a list of (key, from room's key, to room's key)
+        """
+        # rooms
+        self.room_keys = []
+        self.room_names = []
+        self.room_icons = []
+        self.room_areas = []
+        self.room_positions = []
+
+        # room's key: room's index
+        self.room_index = {}
+
+        for key, name, icon, area, position in rooms:
+            self.room_index[key] = len(self.room_keys)
+            self.room_keys.append(key)
+            self.room_names.append(name)
+            self.room_icons.append(icon)
+            self.room_areas.append(area)
+            self.room_positions.append(position)
+
+        # exits
+        self.exit_keys = []
+        self.exit_from = []
+        self.exit_to = []
+
+        # exits of each room, room's index: (exits' indexes)
+        adjacency = [[] for key in self.room_keys]
+
+        for key, from_key, to_key in exits:
+            if from_key not in self.room_index or to_key not in self.room_index:
+                continue
+
+            exit_index = len(self.exit_keys)
+            from_index = self.room_index[from_key]
+            self.exit_keys.append(key)
+            self.exit_from.append(from_index)
+            self.exit_to.append(self.room_index[to_key])
+            adjacency[from_index].append(exit_index)
+
+        self.adjacency = [tuple(room_exits) for room_exits in adjacency]
+
+        # The full map and its version.
+        self.full_map = self.get_map(self.room_keys, False)
+        self.json = json.dumps(self.full_map, sort_keys=True)
+        self.version = hashlib.md5(self.json).hexdigest()
+
+    def __contains__(self, room_key):
+        return room_key in self.room_index
+
+    def get_room_info(self, room_index):
+        """
+        Get a room's information.
+        """
+        return {"name": self.room_names[room_index],
+                "icon": self.room_icons[room_index],
+                "area": self.room_areas[room_index],
+                "pos": self.room_positions[room_index]}
+
+    def get_map(self, room_keys, neighbours=True):
+        """
+        Get a part of the map.
+
+        Args:
+            room_keys: (list) rooms' keys
+            neighbours: (boolean) add rooms' neighbours
+
+        Returns:
+            (dict) {"rooms": {room's key: room's info},
+                    "exits": {exit's key: {"from": room's key,
+                                           "to": room's key}}}
+        """
+        indexes = set()
+        for key in room_keys:
+            index = self.room_index.get(key)
+            if index is not None:
+                indexes.add(index)
+
+        room_keys = self.room_keys
+        exit_keys = self.exit_keys
+
+        exits = {}
+        neighbour_indexes = set()
+        for index in indexes:
+            for exit_index in self.adjacency[index]:
+                to_index = self.exit_to[exit_index]
+                exits[exit_keys[exit_index]] = {"from": room_keys[index],
+                                                "to": room_keys[to_index]}
+                neighbour_indexes.add(to_index)
+
+        if neighbours:
+            indexes.update(neighbour_indexes)
+
+        rooms = dict((room_keys[index], self.get_room_info(index)) for index in indexes)
+        return {"rooms": rooms, "exits": exits}
+
+
+class WorldGraphHandler(object):
+    """
+    The handler holds the current world graph.
+    """
+    def __init__(self):
+        """
+        Initialize handler
+        """
+        self.graph = None
+
+    def clear(self):
+        """
+        Clear data.
+        """
+        self.graph = None
+
+    def reload(self):
+        """
+        Build the world graph from world data.
+        """
+        # icon's key: icon's resource
+        icons = {}
+        for key, resource in DATA_SETS.icon_resources.objects.all().values_list("key", "resource"):
+            icons[key] = resource
+
+        areas = set(DATA_SETS.world_areas.objects.all().values_list("key", flat=True))
+
+        rooms = []
+        for key, name, icon, location, position in DATA_SETS.world_rooms.objects.all()\
+                .values_list("key", "name", "icon", "location", "position"):
+            pos = None
+            if position:
+                try:
+                    pos = ast.literal_eval(position)
+                except Exception, e:
+                    logger.log_errmsg("Load room %s's position error: %s" % (key, e))
+
+            rooms.append((key, name, icons.get(icon), location if location in areas else None, pos))
+
+        exits = []
+        for key, location, destination, typeclass in DATA_SETS.world_exits.objects.all()\
+                .values_list("key", "location", "destination", "typeclass"):
+            exits.append((key, location, destination))
+            if typeclass == settings.TWO_WAY_EXIT_TYPECLASS_KEY:
+                exits.append((settings.REVERSE_EXIT_PREFIX + key, destination, location))
+
+        self.graph = WorldGraph(rooms, exits)
+
+    def get_graph(self):
+        """
+        Get the current world graph, build it if it has not been built.
+
+        Returns:
+            (WorldGraph) the world graph
+        """
+        graph = self.graph
+        if graph is None:
+            self.reload()
+            graph = self.graph
+        return graph
+
+
+# main world graph handler
+WORLD_GRAPH = WorldGraphHandler()
@@ -26,15 +26,18 @@ class DataWriter(object):
     name = None
     file_ext = None
 
-    def __init__(self, filename = None):
+    def __init__(self, filename=None, stream=None):
         """
         Args:
             filename: (String) data file's name.
+            stream: (file) write data to this file object instead of a file
+                    of the filename.
 
         Returns:
             None
         """
         self.filename = filename
+        self.stream = stream
 
     def writeln(self, line):
         """
@@ -67,19 +70,22 @@ class CSVWriter(DataWriter):
     name = "csv"
     file_ext = "csv"
 
-    def __init__(self, filename=None):
+    def __init__(self, filename=None, stream=None):
         """
         Args:
             filename: (String) data file's name.
+            stream: (file) write data to this file object.
 
         Returns:
             None
         """
-        super(CSVWriter, self).__init__(filename)
+        super(CSVWriter, self).__init__(filename, stream)
 
         self.data_file = None
         self.writer = None
-        if filename:
+        if stream:
+            self.writer = csv.writer(stream, dialect='excel')
+        elif filename:
             self.data_file = open(filename, 'w')
             self.writer = csv.writer(self.data_file, dialect='excel')
 
@@ -121,19 +127,23 @@ class CSVWindowsWriter(DataWriter):
     name = "csv (For Windows)"
     file_ext = "csv"
 
-    def __init__(self, filename=None):
+    def __init__(self, filename=None, stream=None):
         """
         Args:
             filename: (String) data file's name.
+            stream: (file) write data to this file object.
 
         Returns:
             None
         """
-        super(CSVWindowsWriter, self).__init__(filename)
+        super(CSVWindowsWriter, self).__init__(filename, stream)
 
         self.data_file = None
         self.writer = None
-        if filename:
+        if stream:
+            stream.write(codecs.BOM_UTF8)
+            self.writer = csv.writer(stream, dialect='excel')
+        elif filename:
             self.data_file = open(filename, 'w')
             self.data_file.write(codecs.BOM_UTF8)
             self.writer = csv.writer(self.data_file, dialect='excel')
@@ -178,15 +188,16 @@ class XLSWriter(DataWriter):
     name = "xls"
     file_ext = "xls"
 
-    def __init__(self, filename=None):
+    def __init__(self, filename=None, stream=None):
         """
         Args:
             filename: (String) data file's name.
+            stream: (file) write data to this file object.
 
         Returns:
             None
         """
-        super(XLSWriter, self).__init__(filename)
+        super(XLSWriter, self).__init__(filename, stream)
 
         if not xlwt:
             print('**********************************************************')
@@ -199,7 +210,7 @@ class XLSWriter(DataWriter):
         self.book = None
         self.sheet = None
         self.row_pos = 0
-        if filename:
+        if filename or stream:
             self.book = xlwt.Workbook(encoding='utf-8')
             self.sheet = self.book.add_sheet("sheet 1")
 
@@ -233,7 +244,7 @@ class XLSWriter(DataWriter):
         if not self.book:
             return
 
-        self.book.save(self.filename)
+        self.book.save(self.stream or self.filename)
 
 
 class XLSXWriter(DataWriter):
@@ -246,15 +257,16 @@ class XLSXWriter(DataWriter):
     name = "xlsx"
     file_ext = "xlsx"
 
-    def __init__(self, filename=None):
+    def __init__(self, filename=None, stream=None):
         """
         Args:
             filename: (String) data file's name.
+            stream: (file) write data to this file object.
 
         Returns:
             None
         """
-        super(XLSXWriter, self).__init__(filename)
+        super(XLSXWriter, self).__init__(filename, stream)
 
         if not xlwt:
             print('**********************************************************')
@@ -268,7 +280,10 @@ class XLSXWriter(DataWriter):
         self.book = None
         self.sheet = None
         self.row_pos = 0
-        if filename:
+        if stream:
+            self.book = xlsxwriter.Workbook(stream, {"in_memory": True})
+            self.sheet = self.book.add_worksheet("sheet 1")
+        elif filename:
             self.book = xlsxwriter.Workbook(filename)
             self.sheet = self.book.add_worksheet("sheet 1")
 
@@ -17,6 +17,12 @@ urlpatterns = [
    url(r'^$', website_views.page_index, name="index"),
    url(r'^tbi/', website_views.to_be_implemented, name='to_be_implemented'),
 
+   # The full world map
+   url(r'^world_map\.json$', website_views.world_map, name='world_map'),
+
+   # Recorded costs of statements
+   url(r'^statement_profile\.json$', website_views.statement_profile, name='statement_profile'),
+
    # User Authentication (makes login/logout url names available)
    url(r'^authenticate',  include('django.contrib.auth.urls')),
 
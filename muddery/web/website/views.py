@@ -5,15 +5,19 @@ the other applications. Views are django's way of processing e.g. html
 templates on the fly.
 
 """
+import json
 from django.contrib.admin.sites import site
 from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
+from django.http import HttpResponse, HttpResponseNotModified
 
 from evennia import SESSION_HANDLER
 from evennia.objects.models import ObjectDB
 from evennia.accounts.models import AccountDB
 from evennia.utils import logger
+from muddery.utils.world_graph import WORLD_GRAPH
+from muddery.statements.statement_profiler import STATEMENT_PROFILER
 
 from django.contrib.auth import login
 
@@ -133,3 +137,36 @@ def admin_wrapper(request):
     Wrapper that allows us to properly use the base Django admin site, if needed.
     """
     return staff_member_required(site.index)(request)
+
+
+def world_map(request):
+    """
+    The full world map in JSON. Its version is sent as the ETag, so clients
+    can cache it until the world is rebuilt.
+    """
+    graph = WORLD_GRAPH.get_graph()
+    etag = '"%s"' % graph.version
+
+    if request.META.get("HTTP_IF_NONE_MATCH") == etag:
+        return HttpResponseNotModified()
+
+    response = HttpResponse('{"version": "%s", "map": %s}' % (graph.version, graph.json),
+                            content_type="application/json")
+    response["ETag"] = etag
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+@staff_member_required
+def statement_profile(request):
+    """
+    Recorded costs of statement functions and conditions in JSON. Add
+    "?reset=1" to clear recorded data after reading it.
+    """
+    stats = STATEMENT_PROFILER.get_stats()
+    if request.GET.get("reset"):
+        STATEMENT_PROFILER.reset()
+
+    response = HttpResponse(json.dumps(stats), content_type="application/json")
+    response["Cache-Control"] = "no-cache"
+    return response
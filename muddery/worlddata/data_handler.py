@@ -3,16 +3,34 @@ This module defines available model types.
 """
 import os
 import glob
+import time
+import operator
 import traceback
 from django.apps import apps
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction, DatabaseError
+from django.db.models import Q
 from django.core.exceptions import ValidationError
 from evennia.utils import logger
 from muddery.utils import readers
 from muddery.utils.exception import MudderyError
 
 
+class RecordError(Exception):
+    """
+    A validation or database error of a record.
+    """
+    def __init__(self, error, line):
+        """
+        Args:
+            error: (ValidationError or DatabaseError) the error
+            line: (int) record's line number
+        """
+        super(RecordError, self).__init__(error, line)
+        self.error = error
+        self.line = line
+
+
 class DataHandler(object):
     """
 
@@ -124,47 +142,241 @@ class DataHandler(object):
 
     def import_data(self, reader, **kwargs):
         """
-        Import data to the model.
+        Import data to the model. Rows are read and validated in chunks, and
+        each chunk is written with one bulk insert. All data of the file is
+        written in one transaction.
 
         Args:
-            reader:
+            reader: (Reader) data reader
 
         Returns:
             None
         """
+        chunk_size = settings.IMPORT_CHUNK_SIZE
+        begin = time.time()
+        count = 0
+
         line = 1
         try:
-            # read title
-            titles = reader.next()
-            field_types = self.get_field_types(self.model, titles)            
-            line += 1
-
-            # import values
-            for values in reader:
-                # skip blank lines
-                blank_line = True
-                for value in values:
-                    if value:
-                        blank_line = False
-                        break
-                if blank_line:
+            with transaction.atomic():
+                # read title
+                try:
+                    titles = reader.next()
+                except StopIteration:
+                    # empty file
+                    return
+
+                if not self.check_titles(titles, **kwargs):
+                    return
+
+                field_types = self.get_field_types(self.model, titles)
+
+                # a list of (line, record)
+                chunk = []
+                for values in reader:
                     line += 1
-                    continue
 
-                record = self.parse_record(titles, field_types, values)
-                data = self.model(**record)
-                data.full_clean()
-                data.save()
-                line += 1
+                    # skip blank lines
+                    blank_line = True
+                    for value in values:
+                        if value:
+                            blank_line = False
+                            break
+                    if blank_line:
+                        continue
+
+                    chunk.append((line, self.parse_record(titles, field_types, values)))
+                    if len(chunk) >= chunk_size:
+                        count += self.import_chunk(chunk, **kwargs)
+                        chunk = []
+
+                if chunk:
+                    count += self.import_chunk(chunk, **kwargs)
 
-        except StopIteration:
-            # reach the end of file, pass this exception
-            pass
+        except RecordError, e:
+            if isinstance(e.error, ValidationError):
+                raise MudderyError(self.parse_error(e.error, e.line))
+            raise MudderyError("%s (model: %s, line: %s)" % (e.error, self.model_name, e.line))
         except ValidationError, e:
             raise MudderyError(self.parse_error(e, line))
         except Exception, e:
             raise MudderyError("%s (model: %s, line: %s)" % (e, self.model_name, line))
 
+        cost = time.time() - begin
+        print("Imported %d rows to %s in %.2fs, %.0f rows/sec." %
+              (count, self.model_name, cost, count / cost if cost > 0 else 0))
+
+    def check_titles(self, titles, **kwargs):
+        """
+        Check if the data can be imported.
+
+        Args:
+            titles: (list) field names
+
+        Returns:
+            (boolean) can be imported or not
+        """
+        return True
+
+    def merge_records(self, records, **kwargs):
+        """
+        Merge new records with current data.
+
+        Args:
+            records: (list) a list of (line, record)
+
+        Returns:
+            (list) records to import
+        """
+        return records
+
+    def import_chunk(self, records, **kwargs):
+        """
+        Validate and write a chunk of records.
+
+        Args:
+            records: (list) a list of (line, record)
+
+        Returns:
+            (int) the number of imported records
+        """
+        records = self.merge_records(records, **kwargs)
+
+        has_key = "key" in self.unique_fields()
+        count = 0
+
+        # a list of (line, data)
+        pending = []
+        for line, record in records:
+            data = self.model(**record)
+
+            if has_key and not data.key:
+                # The key will be generated from current data, so write
+                # previous records first.
+                count += self.write_records(pending)
+                pending = []
+
+            # Object keys are checked by write_records() in bulk.
+            data.bulk_import = True
+            try:
+                data.full_clean(validate_unique=False)
+            except ValidationError, e:
+                raise RecordError(e, line)
+
+            pending.append((line, data))
+
+        count += self.write_records(pending)
+        return count
+
+    def unique_fields(self):
+        """
+        Get fields which must be unique.
+        """
+        return set(field.name for field in self.model._meta.fields
+                   if field.unique and not field.primary_key)
+
+    def check_object_keys(self, records):
+        """
+        Check if records' keys exist in other object models, with one query
+        per model. Object's key should be unique in all objects. It does
+        validate_object_key()'s work for records marked by it.
+
+        Args:
+            records: (list) a list of (line, data)
+        """
+        # key: line
+        keys = dict((data.key, line) for line, data in records
+                    if data.key and getattr(data, "need_object_key_check", False))
+        if not keys:
+            return
+
+        from muddery.worlddata.data_sets import DATA_SETS
+        for data_settings in DATA_SETS.object_data:
+            model_name = data_settings.model_name
+            model = data_settings.model
+            if model_name == self.model_name or not model:
+                # Models will validate unique values of its own.
+                continue
+
+            existing = list(model.objects.filter(key__in=keys.keys()).values_list("key", flat=True))
+            if existing:
+                # report the first bad line
+                key = min(existing, key=lambda value: keys[value])
+                error = ValidationError("The key '%(value)s' already exists in model %(model)s.",
+                                        code="unique",
+                                        params={"value": key, "model": model_name})
+                raise RecordError(ValidationError({"key": error}), keys[key])
+
+    def write_records(self, records):
+        """
+        Check unique values and write records in one query.
+
+        Args:
+            records: (list) a list of (line, data)
+
+        Returns:
+            (int) the number of written records
+        """
+        if not records:
+            return 0
+
+        self.check_object_keys(records)
+
+        unique_checks, date_checks = records[0][1]._get_unique_checks()
+        for model_class, unique_check in unique_checks:
+            if "id" in unique_check:
+                continue
+
+            # values: line
+            values = {}
+            for line, data in records:
+                value = tuple(getattr(data, field) for field in unique_check)
+                if None in value:
+                    continue
+
+                if value in values:
+                    raise RecordError(data.unique_error_message(model_class, unique_check), line)
+                values[value] = line
+
+            if not values:
+                continue
+
+            # query existing values
+            if len(unique_check) == 1:
+                query = Q(**{unique_check[0] + "__in": [value[0] for value in values]})
+            else:
+                query = reduce(operator.or_, [Q(**dict(zip(unique_check, value))) for value in values])
+
+            for value in model_class._default_manager.filter(query).values_list(*unique_check):
+                value = tuple(value)
+                if value in values:
+                    line = values[value]
+                    data = records[0][1]
+                    raise RecordError(data.unique_error_message(model_class, unique_check), line)
+
+        try:
+            with transaction.atomic():
+                self.model.objects.bulk_create([data for line, data in records])
+        except DatabaseError, e:
+            # Find the bad record.
+            self.write_records_one_by_one(records)
+
+        return len(records)
+
+    def write_records_one_by_one(self, records):
+        """
+        Write records one by one, to find the line of a database error.
+
+        Args:
+            records: (list) a list of (line, data)
+        """
+        for line, data in records:
+            try:
+                with transaction.atomic():
+                    data.save(force_insert=True)
+            except DatabaseError, e:
+                raise RecordError(e, line)
+
     def import_file(self, file_name, file_type=None, clear=True, **kwargs):
         """
         Import data from a data file to the db model
@@ -271,77 +483,47 @@ class SystemDataHandler(DataHandler):
     """
 
     """
-    def import_data(self, reader, **kwargs):
+    def check_titles(self, titles, **kwargs):
         """
-        Import data to the model.
+        Check if the data can be imported.
 
         Args:
-            model_obj:
-            reader:
+            titles: (list) field names
 
         Returns:
-            None
+            (boolean) can be imported or not
         """
-        system_data = kwargs.get('system_data', False)
-        
-        line = 1
-        try:
-            # read title
-            titles = reader.next()
-
-            field_types = self.get_field_types(self.model, titles)
-
-            key_index = -1
-            # get pk's position
-            for index, title in enumerate(titles):
-                if title == "key":
-                    key_index = index
-                    break
-            if key_index == -1:
-                print("Can not found system data's key.")
-                return
-                
-            line += 1
-
-            # import values
-            for values in reader:
-                # skip blank lines
-                blank_line = True
-                for value in values:
-                    if value:
-                        blank_line = False
-                        break
-                if blank_line:
-                    line += 1
-                    continue
+        if "key" not in titles:
+            print("Can not found system data's key.")
+            return False
+        return True
 
-                record = self.parse_record(titles, field_types, values)
-                key = values[key_index]
+    def merge_records(self, records, **kwargs):
+        """
+        Merge system and custom data.
 
-                # Merge system and custom data.
-                if system_data:
-                    # System data can not overwrite custom data.
-                    if self.model.objects.filter(key=key, system_data=False).count() > 0:
-                        continue
+        Args:
+            records: (list) a list of (line, record)
 
-                    # Add system data flag.
-                    record["system_data"] = True
-                else:
-                    # Custom data can not overwrite system data.
-                    self.model.objects.filter(key=key, system_data=True).delete()
+        Returns:
+            (list) records to import
+        """
+        system_data = kwargs.get('system_data', False)
+        keys = [record.get("key") for line, record in records]
 
-                data = self.model(**record)
-                data.full_clean()
-                data.save()
-                line += 1
+        if system_data:
+            # System data can not overwrite custom data.
+            custom_keys = set(self.objects.filter(key__in=keys, system_data=False).values_list("key", flat=True))
+            records = [(line, record) for line, record in records if record.get("key") not in custom_keys]
 
-        except StopIteration:
-            # reach the end of file, pass this exception
-            pass
-        except ValidationError, e:
-            raise MudderyError(self.parse_error(e, line))
-        except Exception, e:
-            raise MudderyError("%s (model: %s, line: %s)" % (e, self.model_name, line))
+            # Add system data flag.
+            for line, record in records:
+                record["system_data"] = True
+        else:
+            # Custom data can not overwrite system data.
+            self.objects.filter(key__in=keys, system_data=True).delete()
+
+        return records
 
     def clear_model_data(self, **kwargs):
         """
@@ -363,81 +545,57 @@ class LocalizedStringsHandler(DataHandler):
     """
 
     """
-    def import_data(self, reader, **kwargs):
+    def check_titles(self, titles, **kwargs):
         """
-        Import data to the model.
+        Check if the data can be imported.
 
         Args:
-            model_obj:
-            reader:
+            titles: (list) field names
 
         Returns:
-            None
+            (boolean) can be imported or not
         """
         system_data = kwargs.get('system_data', False)
+        if system_data and "category" not in titles and "origin" not in titles:
+            print("Can not found data's key.")
+            return False
+        return True
 
-        line = 1
-        try:
-            # read title
-            titles = reader.next()
-
-            field_types = self.get_field_types(self.model, titles)
-
-            category_index = -1
-            origin_index = -1
-            if system_data:
-                # get pk's position
-                for index, title in enumerate(titles):
-                    if title == "category":
-                        category_index = index
-                    elif title == "origin":
-                        origin_index = index
-                if category_index == -1 and origin_index == -1:
-                    print("Can not found data's key.")
-                    return
-                    
-            line += 1
-
-            # import values
-            for values in reader:
-                # skip blank lines
-                blank_line = True
-                for value in values:
-                    if value:
-                        blank_line = False
-                        break
-                if blank_line:
-                    line += 1
-                    continue
+    def merge_records(self, records, **kwargs):
+        """
+        Merge system and custom data.
 
-                record = self.parse_record(titles, field_types, values)
-                category = values[category_index]
-                origin = values[origin_index]
+        Args:
+            records: (list) a list of (line, record)
 
-                # Merge system and custom data.
-                if system_data:
-                    # System data can not overwrite custom data.
-                    if self.model.objects.filter(category=category, origin=origin, system_data=False).count() > 0:
-                        continue
+        Returns:
+            (list) records to import
+        """
+        system_data = kwargs.get('system_data', False)
 
-                    # Add system data flag.
-                    record["system_data"] = True
-                else:
-                    # Custom data can not overwrite system data.
-                    self.model.objects.filter(category=category, origin=origin, system_data=True).delete()
+        keys = set((record.get("category", ""), record.get("origin", "")) for line, record in records)
+        origins = set(key[1] for key in keys)
 
-                data = self.model(**record)
-                data.full_clean()
-                data.save()
-                line += 1
+        if system_data:
+            # System data can not overwrite custom data.
+            custom_keys = set(key for key in self.objects.filter(origin__in=origins, system_data=False)\
+                                                       .values_list("category", "origin")
+                              if key in keys)
+            records = [(line, record) for line, record in records
+                       if (record.get("category", ""), record.get("origin", "")) not in custom_keys]
 
-        except StopIteration:
-            # reach the end of file, pass this exception
-            pass
-        except ValidationError, e:
-            raise MudderyError(self.parse_error(e, line))
-        except Exception, e:
-            raise MudderyError("%s (model: %s, line: %s)" % (e, self.model_name, line))
+            # Add system data flag.
+            for line, record in records:
+                record["system_data"] = True
+        else:
+            # Custom data can not overwrite system data.
+            ids = [id for id, category, origin in self.objects.filter(origin__in=origins, system_data=True)\
+                                                              .values_list("id", "category", "origin")
+                   if (category, origin) in keys]
+            if ids:
+                self.objects.filter(id__in=ids).delete()
+
+        return records
 
     def import_from_path(self, path_name, **kwargs):
         # import data from default position
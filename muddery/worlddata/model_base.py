@@ -39,7 +39,14 @@ def auto_generate_key(model):
 def validate_object_key(model):
     """
     Check if the key exists. Object's key should be unique in all objects.
+
+    Bulk imports set the model's bulk_import, then the key is only marked to
+    be checked and the importer checks keys of a whole chunk at once.
     """
+    if getattr(model, "bulk_import", False):
+        model.need_object_key_check = True
+        return
+
     # Get models.
     from muddery.worlddata.data_sets import DATA_SETS
     for data_settings in DATA_SETS.object_data:
@@ -75,22 +75,17 @@ def export_game_data(request):
     response = http.HttpResponseNotModified()
     file_type = request.GET.get("file_type", None)
 
-    # get data's zip
-    zipfile = None
+    # The zip file is generated while it is being sent. Data is checked
+    # and the first table is exported before the response is returned, so
+    # these errors get the fail page.
     try:
-        zipfile = tempfile.TemporaryFile()
-        exporter.export_zip_all(zipfile, file_type)
-        zipfile.seek(0)
-
         filename = time.strftime("worlddata_%Y%m%d_%H%M%S.zip", time.localtime())
-        response = http.StreamingHttpResponse(utils.file_iterator(zipfile))
+        response = http.StreamingHttpResponse(exporter.iter_zip_all(file_type))
         response['Content-Type'] = 'application/octet-stream'
         response['Content-Disposition'] = 'attachment;filename="%s"' % filename
     except Exception, e:
         message = "Can't export game data: %s" % e
         logger.log_tracemsg(message)
-
-        zipfile.close()
         return render(request, 'fail.html', {"message": message})
 
     return response